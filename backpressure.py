@@ -0,0 +1,176 @@
+"""
+Back-pressure for the co-design Socket.IO rooms
+Watches each connection's outbound Engine.IO queue. Slow consumers stop
+receiving intermediate item_updated frames, very slow ones stop receiving
+design frames altogether (snapshot mode), and both catch up with a single
+sync of everything that changed once their queue drains.
+"""
+import os
+import threading
+
+SLOW_QUEUE_DEPTH = int(os.environ.get('SOCKET_SLOW_QUEUE_DEPTH', '32'))
+SNAPSHOT_QUEUE_DEPTH = int(os.environ.get('SOCKET_SNAPSHOT_QUEUE_DEPTH', '128'))
+MAX_QUEUE_DEPTH = int(os.environ.get('SOCKET_MAX_QUEUE_DEPTH', '1024'))
+RESUME_QUEUE_DEPTH = int(os.environ.get('SOCKET_RESUME_QUEUE_DEPTH', '4'))
+CHECK_INTERVAL = float(os.environ.get('SOCKET_BACKPRESSURE_INTERVAL', '0.25'))  # seconds
+
+MODE_COALESCE = 'coalesce'   # drop item_updated, keep adds/removes
+MODE_SNAPSHOT = 'snapshot'   # drop every design frame
+
+# Frames that are safe to drop because a later sync supersedes them
+COALESCE_EVENTS = ('item_updated',)
+
+
+class FlowControl:
+    """Per-connection outbound limits and per-room delivery metrics"""
+
+    def __init__(self):
+        self.lagging = {}   # sid -> {'alley_id', 'mode', 'since'}
+        self.metrics = {}   # alley_id -> counters
+        self.socketio = None
+        self.lock = threading.Lock()
+        self.started = False
+
+    def _room_metrics(self, alley_id):
+        if alley_id not in self.metrics:
+            self.metrics[alley_id] = {
+                'frames_sent': 0,
+                'frames_dropped': 0,
+                'coalesce_resyncs': 0,
+                'snapshot_resyncs': 0,
+                'disconnects': 0,
+                'peak_queue_depth': 0
+            }
+        return self.metrics[alley_id]
+
+    def queue_depth(self, eio_sid):
+        if self.socketio is None:
+            return 0
+        sock = self.socketio.server.eio.sockets.get(eio_sid)
+        return sock.queue.qsize() if sock is not None else 0
+
+    def held_back(self, alley_id, room, event, stamp_counter, sender=None, namespace='/'):
+        """
+        Sids in `room` that must not get this design frame. Also records the
+        earliest clock each lagging client still needs so its resync is complete.
+        """
+        skip = [sender] if sender else []
+        if self.socketio is None:
+            return skip
+        manager = self.socketio.server.manager
+        evict = []
+        with self.lock:
+            metrics = self._room_metrics(alley_id)
+            for sid, eio_sid in manager.get_participants(namespace, room):
+                if sid == sender:
+                    continue
+                depth = self.queue_depth(eio_sid)
+                if depth > metrics['peak_queue_depth']:
+                    metrics['peak_queue_depth'] = depth
+
+                state = self.lagging.get(sid)
+                if depth >= MAX_QUEUE_DEPTH:
+                    metrics['disconnects'] += 1
+                    self.lagging.pop(sid, None)
+                    skip.append(sid)
+                    evict.append(sid)
+                    continue
+                if depth >= SNAPSHOT_QUEUE_DEPTH:
+                    mode = MODE_SNAPSHOT
+                elif depth >= SLOW_QUEUE_DEPTH or state is not None:
+                    mode = state['mode'] if state is not None else MODE_COALESCE
+                else:
+                    metrics['frames_sent'] += 1
+                    continue
+
+                if state is None:
+                    state = {'alley_id': alley_id, 'mode': mode, 'since': stamp_counter - 1}
+                    self.lagging[sid] = state
+                state['mode'] = MODE_SNAPSHOT if MODE_SNAPSHOT in (mode, state['mode']) else MODE_COALESCE
+                state['since'] = min(state['since'], stamp_counter - 1)
+
+                if state['mode'] == MODE_SNAPSHOT or event in COALESCE_EVENTS:
+                    metrics['frames_dropped'] += 1
+                    skip.append(sid)
+                else:
+                    metrics['frames_sent'] += 1
+
+        # Past the hard limit the client reconnects and resyncs from scratch
+        for sid in evict:
+            print(f"[Backpressure] Disconnecting {sid}: outbound queue over {MAX_QUEUE_DEPTH}")
+            self.socketio.server.disconnect(sid, namespace=namespace, ignore_queue=True)
+        return skip
+
+    def held_sids(self, alley_id):
+        """Lagging sids in a room, for broadcasts that are coalesced elsewhere (presence)"""
+        with self.lock:
+            return [sid for sid, state in self.lagging.items() if state['alley_id'] == alley_id]
+
+    def forget(self, sid):
+        with self.lock:
+            self.lagging.pop(sid, None)
+
+    def drained(self, namespace='/'):
+        """Pop the lagging clients whose queue has drained enough to resync"""
+        if self.socketio is None:
+            return []
+        manager = self.socketio.server.manager
+        ready = []
+        with self.lock:
+            for sid, state in list(self.lagging.items()):
+                eio_sid = manager.eio_sid_from_sid(sid, namespace)
+                if eio_sid is None:
+                    del self.lagging[sid]
+                elif self.queue_depth(eio_sid) <= RESUME_QUEUE_DEPTH:
+                    metrics = self._room_metrics(state['alley_id'])
+                    metrics['snapshot_resyncs' if state['mode'] == MODE_SNAPSHOT else 'coalesce_resyncs'] += 1
+                    ready.append((sid, dict(state)))
+                    del self.lagging[sid]
+        return ready
+
+    def room_report(self, alley_id, room, namespace='/'):
+        """Live queue depths plus cumulative counters for one room"""
+        depths = []
+        if self.socketio is not None:
+            for _, eio_sid in self.socketio.server.manager.get_participants(namespace, room):
+                depths.append(self.queue_depth(eio_sid))
+        with self.lock:
+            metrics = dict(self._room_metrics(alley_id))
+            lagging = [
+                {'session_id': sid, 'mode': state['mode'], 'since': state['since']}
+                for sid, state in self.lagging.items() if state['alley_id'] == alley_id
+            ]
+        metrics.update({
+            'alley_id': alley_id,
+            'members': len(depths),
+            'queue_depth_total': sum(depths),
+            'queue_depth_max': max(depths) if depths else 0,
+            'lagging': lagging
+        })
+        return metrics
+
+    def rooms(self):
+        with self.lock:
+            return list(self.metrics)
+
+    def start(self, socketio, resync):
+        """Start the drain-check loop once per worker; `resync(sid, state)` catches a client up"""
+        with self.lock:
+            self.socketio = socketio
+            if self.started:
+                return
+            self.started = True
+        socketio.start_background_task(self._run, socketio, resync)
+
+    def _run(self, socketio, resync):
+        while True:
+            socketio.sleep(CHECK_INTERVAL)
+            for sid, state in self.drained():
+                try:
+                    resync(sid, state)
+                except Exception as e:
+                    print(f"[Backpressure] Resync failed for {sid}: {e}")
+
+
+# Create global instance
+flow_control = FlowControl()
@@ -1,98 +1,422 @@
+"""
+Static site build for GitHub Pages
+Renders the site's pages through the Flask test client into docs/ and
+mirrors static/ and content/ next to them.
+
+Builds are incremental. Each page's inputs (its templates and everything
+they extend or include, the content files the route read, and the app
+and builder code) are hashed into docs/.build-manifest.json, and only
+pages whose inputs changed are rendered again, in a process pool. Assets
+are synced by mtime and size (or content hash with --checksum) instead of
+being deleted and copied again, so a build with no changes only stats files.
+
+With --optimize, static_optimizer.py then minifies pages, CSS and JS,
+adds responsive image variants, writes .gz/.br siblings and reports each
+page's transfer size; the build fails if a page exceeds --budget-kb.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
 import os
 import shutil
-from app import app
-from flask import url_for
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def build_static_site():
-    """Generate static HTML files from Flask templates"""
-    
-    output_dir = 'docs'
-    
-    # Clear existing docs folder
-    if os.path.exists(output_dir):
-        for item in os.listdir(output_dir):
-            item_path = os.path.join(output_dir, item)
-            if os.path.isfile(item_path):
-                os.remove(item_path)
-            elif os.path.isdir(item_path) and item not in ['static', 'content']:
-                shutil.rmtree(item_path)
+from static_optimizer import StaticOptimizer, BudgetExceeded, PAGE_BUDGET_KB, optimize_page, owns
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = 'docs'
+MANIFEST_NAME = '.build-manifest.json'
+MANIFEST_VERSION = 1
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
+
+# Routes to generate
+ROUTES = [
+    ('/', 'index.html'),
+    ('/existing', 'existing.html'),
+    ('/interactive-fence-map', 'interactive-fence-map.html'),
+    ('/unreal-viewer', 'unreal-viewer.html'),
+    ('/compare', 'compare.html'),
+    ('/solar-shades', 'solar-shades.html'),
+    ('/murals', 'murals.html'),
+    ('/urban-farming', 'urban-farming.html'),
+    ('/visualization-studio', 'visualization-studio.html'),
+    ('/before-after', 'before-after.html'),
+]
+# Hand-written pages copied over the rendered ones
+STANDALONE_FILES = ['interactive-fence-map.html', 'rhino-viewer.html']
+ASSET_DIRS = ['static', 'content']
+# A change to any of these can change every page
+CODE_INPUTS = ['app.py', 'pages.py', 'build_static.py', 'content_manager.py', 'link_rewriter.py',
+               'static_optimizer.py', 'page_cache.py']
+# Files in the output root that are not build outputs but must survive
+KEEP_FILES = [MANIFEST_NAME, '.nojekyll', 'CNAME']
+# Cache-busting ?v=<hash> on stylesheet and script URLs (--fingerprint)
+FINGERPRINT = False
+FINGERPRINT_EXTENSIONS = ('.css', '.js')
+# Minify, precompress and add image srcsets (--optimize); RESPONSIVE holds the srcset candidates
+OPTIMIZE = False
+RESPONSIVE = {}
+
+
+_digests = {}
+
+
+def file_digest(path):
+    """sha256 of a file, memoized by (path, mtime, size) for the life of the process"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _digests.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        digest = _digests[key] = h.hexdigest()
+    return digest
+
+
+def template_closure(names):
+    """Templates plus everything they extend, include or import, found by parsing them"""
+    from jinja2 import Environment, meta
+
+    env = Environment()
+    seen = set()
+    pending = [n for n in names if n]
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        try:
+            with open(os.path.join(TEMPLATE_DIR, name), 'r', encoding='utf-8') as f:
+                ast = env.parse(f.read())
+        except Exception:
+            continue
+        pending.extend(ref for ref in meta.find_referenced_templates(ast) if ref)
+    return sorted(seen)
+
+
+def _fingerprinted_assets():
+    for name in ASSET_DIRS:
+        for root, dirs, files in os.walk(os.path.join(BASE_DIR, name)):
+            dirs.sort()
+            for file in sorted(files):
+                if file.endswith(FINGERPRINT_EXTENSIONS):
+                    yield os.path.join(root, file)
+
+
+def page_input_hash(route, filename, templates, content):
+    """Hash of everything a rendered page depends on"""
+    h = hashlib.sha256(
+        f'{MANIFEST_VERSION}\n{route}\n{filename}\nfingerprint={FINGERPRINT}\noptimize={OPTIMIZE}\n'.encode()
+    )
+    if OPTIMIZE:
+        h.update(json.dumps(RESPONSIVE, sort_keys=True).encode())
+    if FINGERPRINT:
+        for path in _fingerprinted_assets():
+            h.update(f'asset:{os.path.relpath(path, BASE_DIR)}:{file_digest(path)}\n'.encode())
+    for path in CODE_INPUTS:
+        h.update(f'code:{path}:{file_digest(os.path.join(BASE_DIR, path))}\n'.encode())
+    for name in template_closure(templates):
+        h.update(f'template:{name}:{file_digest(os.path.join(TEMPLATE_DIR, name))}\n'.encode())
+    for path in sorted(content):
+        h.update(f'content:{path}:{file_digest(os.path.join(BASE_DIR, path))}\n'.encode())
+    return h.hexdigest()
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'version': MANIFEST_VERSION, 'pages': {}}
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def asset_url(path):
+    """Published URL of a static/content file; CSS and JS get a content hash when fingerprinting"""
+    if FINGERPRINT and path.endswith(FINGERPRINT_EXTENSIONS):
+        digest = file_digest(os.path.join(BASE_DIR, path))
+        if digest:
+            return f'{path}?v={digest[:10]}'
+    return path
+
+
+_app = None
+_client = None
+_rewriter = None
+
+
+def application():
+    """The Flask app, built once per process without Socket.IO (pages need no realtime server)"""
+    global _app
+    if _app is None:
+        from app import create_app
+        _app = create_app(realtime=False)
+    return _app
+
+
+def render_page(route, filename, output_dir, fingerprint=False, responsive=None):
+    """
+    Render one route into output_dir (runs in a pool worker). Returns the
+    templates and content files it used, so the next build can hash them.
+    responsive (srcset candidates) is given when the page is to be optimized.
+    """
+    global _client, _rewriter, FINGERPRINT
+    FINGERPRINT = fingerprint
+    from flask import template_rendered
+    from content_manager import content_manager
+    from link_rewriter import LinkRewriter
+
+    app = application()
+    if _client is None:
+        _client = app.test_client()
+        _rewriter = LinkRewriter(app.url_map, dict(ROUTES), asset_url=asset_url, probe=_redirect_target)
+
+    templates = []
+
+    def record(sender, template, context, **extra):
+        templates.append(template.name)
+
+    content_manager.read_log = set()
+    try:
+        with template_rendered.connected_to(record, app):
+            response = _client.get(route)
+        reads = content_manager.read_log
+    finally:
+        content_manager.read_log = None
+
+    if response.status_code != 200:
+        return {'filename': filename, 'error': f'status {response.status_code}'}
+
+    html_content = _rewriter.rewrite(response.data.decode('utf-8'))
+    if responsive is not None:
+        html_content = optimize_page(html_content, responsive)
+    output_path = os.path.join(output_dir, filename)
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+    os.replace(tmp_path, output_path)
+    return {
+        'filename': filename,
+        'route': route,
+        'templates': templates,
+        'content': sorted(os.path.relpath(path, BASE_DIR) for path in reads),
+        'unresolved': sorted(_rewriter.unresolved)
+    }
+
+
+def _redirect_target(path):
+    """Where a linked page route redirects to (e.g. /fence-map), so links can follow it"""
+    if path.startswith('/api/'):
+        return None
+    response = _client.get(path)
+    return response.headers.get('Location') if 300 <= response.status_code < 400 else None
+
+
+def _same_file(source, dest, checksum):
+    try:
+        dest_stat = os.stat(dest)
+    except OSError:
+        return False
+    source_stat = os.stat(source)
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if checksum:
+        return file_digest(source) == file_digest(dest)
+    return source_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+
+def sync_tree(source_dir, dest_dir, checksum=False, skip=None):
+    """
+    Mirror source_dir into dest_dir, copying only changed files; returns
+    (copied, removed). Files whose name matches skip are neither copied nor removed.
+    """
+    copied = removed = 0
+    wanted = set()
+    for root, dirs, files in os.walk(source_dir):
+        target_root = os.path.normpath(os.path.join(dest_dir, os.path.relpath(root, source_dir)))
+        wanted.add(target_root)
+        os.makedirs(target_root, exist_ok=True)
+        for name in files:
+            source = os.path.join(root, name)
+            dest = os.path.join(target_root, name)
+            wanted.add(dest)
+            if skip and skip(name):
+                continue
+            if not _same_file(source, dest, checksum):
+                shutil.copy2(source, dest)
+                copied += 1
+
+    for root, dirs, files in os.walk(dest_dir, topdown=False):
+        root = os.path.normpath(root)
+        for name in files:
+            path = os.path.join(root, name)
+            if path not in wanted and not (skip and skip(name)):
+                os.remove(path)
+                removed += 1
+        if root not in wanted and not os.listdir(root):
+            os.rmdir(root)
+    return copied, removed
+
+
+def copy_if_changed(source, dest, checksum=False):
+    if _same_file(source, dest, checksum):
+        return False
+    shutil.copy2(source, dest)
+    return True
+
+
+def _pool_context():
+    # fork lets workers reuse the app the parent already imported
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+
+
+def render_pages(pending, output_dir, workers):
+    responsive = RESPONSIVE if OPTIMIZE else None
+    if len(pending) > 1 and workers > 1:
+        application()  # built once here so forked workers start warm
+        with ProcessPoolExecutor(min(workers, len(pending)), mp_context=_pool_context()) as pool:
+            futures = [pool.submit(render_page, route, filename, output_dir, FINGERPRINT, responsive)
+                       for route, filename in pending]
+            return [future.result() for future in futures]
+    return [render_page(route, filename, output_dir, FINGERPRINT, responsive) for route, filename in pending]
+
+
+def optimize_assets(optimizer, workers):
+    """Minify CSS and JS and generate image variants before the pages that list them are rendered"""
+    global RESPONSIVE
+    minified = optimizer.minify_assets(ASSET_DIRS)
+    if workers > 1:
+        with ProcessPoolExecutor(workers, mp_context=_pool_context()) as pool:
+            resized = optimizer.image_variants(ASSET_DIRS, pool)
     else:
-        os.makedirs(output_dir)
-    
-    # Copy static files
-    if os.path.exists('static'):
-        static_dest = os.path.join(output_dir, 'static')
-        if os.path.exists(static_dest):
-            shutil.rmtree(static_dest)
-        shutil.copytree('static', static_dest)
-    
-    # Copy content files
-    if os.path.exists('content'):
-        content_dest = os.path.join(output_dir, 'content')
-        if os.path.exists(content_dest):
-            shutil.rmtree(content_dest)
-        shutil.copytree('content', content_dest)
-    
-    # Routes to generate
-    routes = [
-        ('/', 'index.html'),
-        ('/existing', 'existing.html'),
-        ('/interactive-fence-map', 'interactive-fence-map.html'),
-        ('/unreal-viewer', 'unreal-viewer.html'),
-        ('/compare', 'compare.html'),
-        ('/solar-shades', 'solar-shades.html'),
-        ('/murals', 'murals.html'),
-        ('/urban-farming', 'urban-farming.html'),
-        ('/visualization-studio', 'visualization-studio.html'),
-        ('/before-after', 'before-after.html'),
-    ]
-    
-    with app.test_client() as client:
-        for route, filename in routes:
-            try:
-                print(f"Generating {filename}...")
-                response = client.get(route)
-                
-                if response.status_code == 200:
-                    html_content = response.data.decode('utf-8')
-                    
-                    # Fix asset paths for static site
-                    html_content = html_content.replace('href="/', 'href="')
-                    html_content = html_content.replace('src="/', 'src="')
-                    html_content = html_content.replace('url(/', 'url(')
-                    html_content = html_content.replace('="/static/', '="static/')
-                    html_content = html_content.replace('="/content/', '="content/')
-                    
-                    # Fix navigation links
-                    html_content = html_content.replace('href=""', 'href="index.html"')
-                    html_content = html_content.replace('href="existing"', 'href="existing.html"')
-                    html_content = html_content.replace('href="interactive-fence-map"', 'href="interactive-fence-map.html"')
-                    html_content = html_content.replace('href="unreal-viewer"', 'href="unreal-viewer.html"')
-                    html_content = html_content.replace('href="compare"', 'href="compare.html"')
-                    html_content = html_content.replace('href="solar-shades"', 'href="solar-shades.html"')
-                    html_content = html_content.replace('href="murals"', 'href="murals.html"')
-                    html_content = html_content.replace('href="urban-farming"', 'href="urban-farming.html"')
-                    html_content = html_content.replace('href="visualization-studio"', 'href="visualization-studio.html"')
-                    html_content = html_content.replace('href="before-after"', 'href="before-after.html"')
-                    
-                    output_path = os.path.join(output_dir, filename)
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        f.write(html_content)
-                    print(f"✓ Created {filename}")
-                else:
-                    print(f"✗ Failed to generate {filename} (status {response.status_code})")
-            except Exception as e:
-                print(f"✗ Error generating {filename}: {str(e)}")
-    
+        resized = optimizer.image_variants(ASSET_DIRS)
+    RESPONSIVE = optimizer.responsive()
+    print(f"✓ Optimized assets ({minified} minified, {resized} image(s) processed, "
+          f"{len(RESPONSIVE)} with responsive variants)")
+
+
+def build_static_site(output_dir=OUTPUT_DIR, workers=None, checksum=False, force=False, fingerprint=False,
+                      optimize=False, budget_kb=None):
+    """Generate static HTML files from Flask templates"""
+    global FINGERPRINT, OPTIMIZE
+    FINGERPRINT = fingerprint
+    OPTIMIZE = optimize
+    start = time.perf_counter()
+    output_dir = os.path.join(BASE_DIR, output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    manifest = {} if force else load_manifest(output_dir)
+    previous = manifest.get('pages', {})
+
+    optimizer = StaticOptimizer(BASE_DIR, output_dir, manifest.get('optimized')) if optimize else None
+    skip = owns if optimize else None
+
+    # Copy static and content files that changed (the optimizer writes minified CSS and JS itself)
+    for name in ASSET_DIRS:
+        source = os.path.join(BASE_DIR, name)
+        if os.path.exists(source):
+            copied, removed = sync_tree(source, os.path.join(output_dir, name), checksum, skip)
+            print(f"✓ Synced {name}/ ({copied} copied, {removed} removed)")
+    if optimizer:
+        optimize_assets(optimizer, workers)
+
+    # Pages whose inputs changed since the last build
+    pending = []
+    for route, filename in ROUTES:
+        entry = previous.get(filename)
+        if (entry and entry.get('route') == route
+                and os.path.exists(os.path.join(output_dir, filename))
+                and page_input_hash(route, filename, entry['templates'], entry['content']) == entry['hash']):
+            continue
+        pending.append((route, filename))
+
+    pages = {filename: previous[filename] for _, filename in ROUTES
+             if filename in previous and (previous[filename]['route'], filename) not in pending}
+    for route, filename in pending:
+        print(f"Generating {filename}...")
+    for result in render_pages(pending, output_dir, workers):
+        if 'error' in result:
+            print(f"✗ Failed to generate {result['filename']} ({result['error']})")
+            continue
+        filename = result.pop('filename')
+        unresolved = result.pop('unresolved')
+        if unresolved:
+            print(f"  {filename}: links to routes outside the static site: {', '.join(unresolved)}")
+        result['hash'] = page_input_hash(result['route'], filename, result['templates'], result['content'])
+        pages[filename] = result
+        print(f"✓ Created {filename}")
+    print(f"✓ {len(pending)} page(s) rendered, {len(ROUTES) - len(pending)} unchanged")
+
     # Copy standalone HTML files
-    standalone_files = ['interactive-fence-map.html', 'rhino-viewer.html']
-    for file in standalone_files:
-        if os.path.exists(file):
-            shutil.copy(file, os.path.join(output_dir, file))
+    for file in STANDALONE_FILES:
+        source = os.path.join(BASE_DIR, file)
+        if os.path.exists(source) and copy_if_changed(source, os.path.join(output_dir, file), checksum):
             print(f"✓ Copied {file}")
-    
-    print(f"\n✓ Static site built in '{output_dir}/' folder")
+
+    # Remove pages that are no longer built
+    published = list(dict.fromkeys([filename for _, filename in ROUTES] + STANDALONE_FILES))
+    outputs = set(published) | set(KEEP_FILES)
+    if optimizer:
+        outputs |= {f'{filename}{suffix}' for filename in published for suffix in ('.gz', '.br')}
+    for item in os.listdir(output_dir):
+        path = os.path.join(output_dir, item)
+        if os.path.isfile(path) and item not in outputs:
+            os.remove(path)
+            print(f"✓ Removed stale {item}")
+
+    over_budget = []
+    if optimizer:
+        removed = optimizer.remove_orphans(ASSET_DIRS)
+        compressed = optimizer.compress_tree(published + ASSET_DIRS)
+        print(f"✓ Precompressed {compressed} file(s), removed {removed} orphaned optimizer output(s)")
+        over_budget = optimizer.budget_report(published, budget_kb if budget_kb is not None else PAGE_BUDGET_KB)
+
+    manifest = {'version': MANIFEST_VERSION, 'pages': pages}
+    if optimizer:
+        manifest['optimized'] = optimizer.state
+    save_manifest(output_dir, manifest)
+    if over_budget:
+        raise BudgetExceeded(', '.join(f"{r['page']} ({r['total'] / 1024:,.1f} KB)" for r in over_budget))
+    print(f"\n✓ Static site built in '{os.path.relpath(output_dir, BASE_DIR)}/' folder "
+          f"({time.perf_counter() - start:.2f}s)")
     print(f"✓ Ready for GitHub Pages deployment")
+    return pages
+
 
 if __name__ == '__main__':
-    build_static_site()
+    parser = argparse.ArgumentParser(description='Build the static GitHub Pages site')
+    parser.add_argument('--output', default=OUTPUT_DIR, help='output folder (default: docs)')
+    parser.add_argument('--workers', type=int, default=None, help='render processes (default: CPU count)')
+    parser.add_argument('--checksum', action='store_true', help='compare assets by content hash, not mtime and size')
+    parser.add_argument('--force', action='store_true', help='render every page even if its inputs are unchanged')
+    parser.add_argument('--fingerprint', action='store_true', help='add ?v=<content hash> to CSS and JS URLs')
+    parser.add_argument('--optimize', action='store_true',
+                        help='minify, precompress, add responsive images and report page sizes')
+    parser.add_argument('--budget-kb', type=float, default=None,
+                        help='fail when a page transfers more than this (default: $STATIC_PAGE_BUDGET_KB)')
+    args = parser.parse_args()
+    try:
+        build_static_site(args.output, workers=args.workers, checksum=args.checksum, force=args.force,
+                          fingerprint=args.fingerprint, optimize=args.optimize, budget_kb=args.budget_kb)
+    except BudgetExceeded as e:
+        print(f"\n✗ Pages over the transfer budget: {e}")
+        sys.exit(1)
@@ -0,0 +1,246 @@
+"""
+Collaboration: the co-design Socket.IO events and collaboration metrics
+Each connection negotiates a wire format (JSON or binary) and joins one
+room per alley and format, so every design event is encoded once per format.
+"""
+from flask import Blueprint, current_app, request, session, jsonify
+from flask_socketio import emit, join_room, leave_room
+
+from extensions import socketio
+from design_sync import design_store
+from presence import presence_tracker, active_collaborators
+from backpressure import flow_control
+from design_codec import (WIRE_JSON, WIRE_BINARY, negotiate_wire,
+                          encode_item, encode_remove, encode_snapshot, decode_item)
+
+collaboration_bp = Blueprint('collaboration', __name__)
+
+# Wire format negotiated by each collaboration connection ('json' or 'binary')
+wire_formats = {}
+
+def design_room(alley_id, wire):
+    """Per-format room so each design event is encoded once per format"""
+    return f"{alley_id}#{wire}"
+
+def _room_has_members(room):
+    return bool(socketio.server.manager.rooms.get('/', {}).get(room))
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    wire = negotiate_wire(auth)
+    wire_formats[request.sid] = wire
+    print('Client connected')
+    emit('connection_response', {'data': 'Connected to co-design space', 'wire': wire})
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    wire_formats.pop(request.sid, None)
+    presence_tracker.leave(request.sid)
+    flow_control.forget(request.sid)
+    print('Client disconnected')
+
+def _design_stamp(doc, data):
+    """Stamp a design operation with the client's Lamport clock when it sends one"""
+    return doc.next_stamp(data.get('replica') or request.sid, data.get('clock'))
+
+def _read_design_item(doc, data):
+    """Item and stamp for an add/update, decoding a binary frame when one was sent"""
+    if 'frame' in data:
+        item, counter, replica = decode_item(doc, data['frame'])
+        return item, doc.next_stamp(replica or request.sid, counter)
+    return data['item'], _design_stamp(doc, data)
+
+def _broadcast_item(event, alley_id, doc, changes, stamp):
+    """Send an accepted item change to the room, encoding once per wire format"""
+    item_id = changes['id']
+    json_room = design_room(alley_id, WIRE_JSON)
+    binary_room = design_room(alley_id, WIRE_BINARY)
+    if _room_has_members(json_room):
+        skip = flow_control.held_back(alley_id, json_room, event, stamp[0], sender=request.sid)
+        emit(event, {'item': doc.get_item(item_id), 'stamps': doc.item_stamps(item_id), 'clock': doc.clock},
+             room=json_room, skip_sid=skip)
+    if _room_has_members(binary_room):
+        skip = flow_control.held_back(alley_id, binary_room, event, stamp[0], sender=request.sid)
+        delta = {k: v for k, v in changes.items() if k != 'id' or event == 'item_added'}
+        emit(event, encode_item(doc, item_id, delta, stamp), room=binary_room, skip_sid=skip)
+
+def _resync_client(sid, state):
+    """Catch a drained slow consumer up on everything it was held back from"""
+    alley_id = state['alley_id']
+    doc = design_store.get(alley_id)
+    changes = doc.changes_since(state['since'])
+    if wire_formats.get(sid) == WIRE_BINARY:
+        socketio.emit('design_synced', encode_snapshot(doc, changes['items'], changes['removed'], changes['reset']), to=sid)
+    else:
+        socketio.emit('design_synced', changes, to=sid)
+    socketio.emit('presence_state', {'alley_id': alley_id, 'users': presence_tracker.room_state(alley_id),
+                                     'left': [], 'replace': True}, to=sid)
+
+def _send_current_item(doc, item_id):
+    """Tell a client whose write lost what the item converged to"""
+    current = doc.get_item(item_id)
+    if wire_formats.get(request.sid) == WIRE_BINARY:
+        if current is not None:
+            emit('design_synced', encode_snapshot(doc, [current]), room=request.sid)
+        else:
+            emit('design_synced', encode_snapshot(doc, [], [item_id]), room=request.sid)
+    elif current is not None:
+        emit('item_updated', {'item': current, 'stamps': doc.item_stamps(item_id), 'clock': doc.clock}, room=request.sid)
+    else:
+        emit('item_removed', {'item_id': item_id, 'clock': doc.clock}, room=request.sid)
+
+@socketio.on('join_alley')
+def handle_join_alley(data):
+    alley_id = data['alley_id']
+    wire = wire_formats.get(request.sid, WIRE_JSON)
+    join_room(alley_id)
+    join_room(design_room(alley_id, wire))
+    
+    # Send current design state to the new user
+    doc = design_store.get(alley_id)
+    if wire == WIRE_BINARY:
+        emit('load_design', encode_snapshot(doc, doc.snapshot()), room=request.sid)
+    else:
+        emit('load_design', {'items': doc.snapshot(), 'stamps': doc.snapshot_stamps(), 'clock': doc.clock}, room=request.sid)
+    
+    presence_tracker.start(current_app._get_current_object(), socketio)
+    flow_control.start(socketio, _resync_client)
+    presence_tracker.join(request.sid, alley_id, scenario_id=data.get('scenario_id'),
+                          user_id=session.get('user_id'), username=session.get('username'))
+    emit('presence_state', {'alley_id': alley_id, 'users': presence_tracker.room_state(alley_id),
+                            'left': [], 'replace': True}, room=request.sid)
+    
+    emit('user_joined', {'message': 'A resident joined the design space'}, room=alley_id, skip_sid=request.sid)
+
+@socketio.on('presence_update')
+def handle_presence_update(data):
+    """Cursor/status change; coalesced and broadcast by the presence loop"""
+    presence_tracker.update(request.sid, cursor=data.get('cursor'), status=data.get('status'))
+
+@socketio.on('sync_design')
+def handle_sync_design(data):
+    """Send a reconnecting client only what changed since the clock it last saw"""
+    doc = design_store.get(data['alley_id'])
+    changes = doc.changes_since(data.get('since', 0))
+    if wire_formats.get(request.sid) == WIRE_BINARY:
+        emit('design_synced', encode_snapshot(doc, changes['items'], changes['removed'], changes['reset']), room=request.sid)
+    else:
+        emit('design_synced', changes, room=request.sid)
+
+@socketio.on('leave_alley')
+def handle_leave_alley(data):
+    alley_id = data['alley_id']
+    leave_room(alley_id)
+    leave_room(design_room(alley_id, wire_formats.get(request.sid, WIRE_JSON)))
+    presence_tracker.leave(request.sid)
+    flow_control.forget(request.sid)
+    emit('user_left', {'message': 'A resident left the design space'}, room=alley_id)
+
+@socketio.on('add_item')
+def handle_add_item(data):
+    alley_id = data['alley_id']
+    presence_tracker.touch(request.sid)
+    doc = design_store.get(alley_id)
+    try:
+        item, stamp = _read_design_item(doc, data)
+    except ValueError as e:
+        emit('error', {'message': str(e)}, room=request.sid)
+        return
+    
+    changes = doc.apply_item_changes(item, stamp)
+    if changes is None:
+        _send_current_item(doc, item.get('id'))
+        return
+    changes.setdefault('id', item['id'])
+    
+    # Broadcast to all users in the same alley
+    _broadcast_item('item_added', alley_id, doc, changes, stamp)
+
+@socketio.on('update_item')
+def handle_update_item(data):
+    alley_id = data['alley_id']
+    presence_tracker.touch(request.sid)
+    doc = design_store.get(alley_id)
+    try:
+        item, stamp = _read_design_item(doc, data)
+    except ValueError as e:
+        emit('error', {'message': str(e)}, room=request.sid)
+        return
+    
+    # Merge field-by-field; stale or no-op writes are not rebroadcast
+    changes = doc.apply_item_changes(item, stamp)
+    if changes is None:
+        _send_current_item(doc, item.get('id'))
+        return
+    event = 'item_added' if 'id' in changes else 'item_updated'
+    changes.setdefault('id', item['id'])
+    
+    # Broadcast to all users in the same alley
+    _broadcast_item(event, alley_id, doc, changes, stamp)
+
+@socketio.on('remove_item')
+def handle_remove_item(data):
+    alley_id = data['alley_id']
+    presence_tracker.touch(request.sid)
+    item_id = data['item_id']
+    
+    doc = design_store.get(alley_id)
+    try:
+        stamp = _design_stamp(doc, data)
+    except ValueError as e:
+        emit('error', {'message': str(e)}, room=request.sid)
+        return
+    if not doc.remove_item(item_id, stamp):
+        _send_current_item(doc, item_id)
+        return
+    
+    # Broadcast to all users in the same alley
+    json_room = design_room(alley_id, WIRE_JSON)
+    binary_room = design_room(alley_id, WIRE_BINARY)
+    if _room_has_members(json_room):
+        skip = flow_control.held_back(alley_id, json_room, 'item_removed', stamp[0], sender=request.sid)
+        emit('item_removed', {'item_id': item_id, 'clock': doc.clock}, room=json_room, skip_sid=skip)
+    if _room_has_members(binary_room):
+        skip = flow_control.held_back(alley_id, binary_room, 'item_removed', stamp[0], sender=request.sid)
+        emit('item_removed', encode_remove(doc, item_id, stamp), room=binary_room, skip_sid=skip)
+
+@socketio.on('clear_design')
+def handle_clear_design(data):
+    alley_id = data['alley_id']
+    presence_tracker.touch(request.sid)
+    
+    doc = design_store.get(alley_id)
+    try:
+        stamp = _design_stamp(doc, data)
+    except ValueError as e:
+        emit('error', {'message': str(e)}, room=request.sid)
+        return
+    doc.clear(stamp)
+    
+    # Items written after the clear survive, so send the converged state along
+    emit('design_cleared', {'items': doc.snapshot(), 'stamps': doc.snapshot_stamps(), 'clock': doc.clock},
+         room=alley_id, include_self=False)
+
+@collaboration_bp.route('/api/scenarios/<scenario_id>/presence', methods=['GET'])
+def get_scenario_presence(scenario_id):
+    """Who is currently active in a scenario"""
+    try:
+        users = active_collaborators(scenario_id)
+        return jsonify({
+            'success': True,
+            'scenario_id': scenario_id,
+            'users': users,
+            'count': len(users)
+        }), 200
+    except Exception as e:
+        print(f"Error fetching presence: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@collaboration_bp.route('/api/collaboration/metrics')
+def collaboration_metrics():
+    """Outbound queue depth and dropped-frame counters per design room"""
+    alley_id = request.args.get('alley_id')
+    alley_ids = [alley_id] if alley_id else flow_control.rooms()
+    return jsonify({
+        'rooms': [flow_control.room_report(a, a) for a in alley_ids]
+    })
@@ -0,0 +1,181 @@
+"""
+Vectorized scenario comparison and ranking
+Scenarios for one or more alleys are loaded into a NumPy matrix (one row
+per scenario, one column per environmental metric). Deltas against each
+alley's baseline, pairwise deltas, normalized scores and weighted rankings
+are then whole-array operations instead of per-pair Python arithmetic.
+"""
+import numpy as np
+
+from models import SCENARIO_METRICS, normalize_metrics
+
+# +1 when a larger value is better, -1 when a smaller one is
+METRIC_DIRECTIONS = {
+    'temperature': -1,
+    'shade_coverage': 1,
+    'air_quality': -1,   # AQI: lower is cleaner
+    'pm25': -1,
+    'green_space': 1,
+    'water_runoff': -1
+}
+
+# Cooling, runoff and air quality benefit, as in the seeded baseline_comparison
+DEFAULT_WEIGHTS = {'temperature': 0.5, 'water_runoff': 0.3, 'air_quality': 0.2}
+
+
+def parse_weights(spec):
+    """'temperature:0.5,water_runoff:0.3' -> {metric: weight}"""
+    if not spec:
+        return dict(DEFAULT_WEIGHTS)
+    weights = {}
+    for part in spec.split(','):
+        name, _, value = part.partition(':')
+        name = name.strip()
+        if name not in METRIC_DIRECTIONS:
+            raise ValueError(f"Unknown metric '{name}'")
+        try:
+            weights[name] = float(value) if value else 1.0
+        except ValueError:
+            raise ValueError(f"Weight for '{name}' must be a number")
+    if not any(w > 0 for w in weights.values()):
+        raise ValueError('At least one weight must be positive')
+    return weights
+
+
+def scenario_alley(scenario):
+    """Alley a scenario belongs to; file scenarios only carry it in their id"""
+    alley_id = scenario.get('alley_id')
+    if alley_id and alley_id != 'unknown':
+        return alley_id
+    scenario_id = scenario.get('id', '')
+    for prefix in ('baseline-', 'concept-a-', 'concept-b-', 'vision-'):
+        if scenario_id.startswith(prefix):
+            return scenario_id[len(prefix):]
+    for suffix in ('-baseline', '-vision'):
+        if scenario_id.endswith(suffix):
+            return scenario_id[:-len(suffix)]
+    return scenario_id
+
+
+class ScenarioComparison:
+    """Metric matrix for a set of scenarios, grouped by alley"""
+
+    def __init__(self, scenarios):
+        self.scenarios = list(scenarios)
+        self.ids = [s['id'] for s in self.scenarios]
+        self.metrics = list(SCENARIO_METRICS)
+        self.directions = np.array([METRIC_DIRECTIONS[m] for m in self.metrics], dtype=float)
+
+        rows = [normalize_metrics(s.get('environmental_data')) for s in self.scenarios]
+        self.matrix = np.array(
+            [[np.nan if r[m] is None else r[m] for m in self.metrics] for r in rows],
+            dtype=float
+        ).reshape(len(rows), len(self.metrics))
+
+        alleys = [scenario_alley(s) for s in self.scenarios]
+        self.alleys = sorted(set(alleys))
+        index = {alley: i for i, alley in enumerate(self.alleys)}
+        self.groups = np.array([index[a] for a in alleys], dtype=int)
+        self.baselines = self._baseline_rows()
+
+    def _baseline_rows(self):
+        """
+        Per-alley reference row: the alley's baseline scenario, or the worst
+        observed value of each metric when the alley has no baseline
+        """
+        n_alleys = len(self.alleys)
+        baselines = np.full((n_alleys, len(self.metrics)), np.nan)
+        is_baseline = np.array([s.get('type') == 'baseline' for s in self.scenarios], dtype=bool)
+        for alley in range(n_alleys):
+            members = self.groups == alley
+            chosen = np.flatnonzero(members & is_baseline)
+            if chosen.size:
+                baselines[alley] = self.matrix[chosen[0]]
+            else:
+                block = self.matrix[members] * self.directions
+                worst = np.min(np.where(np.isnan(block), np.inf, block), axis=0)
+                baselines[alley] = np.where(np.isinf(worst), np.nan, worst) * self.directions
+        return baselines
+
+    def deltas(self):
+        """Each scenario minus its alley's baseline, shape (n, metrics)"""
+        return self.matrix - self.baselines[self.groups]
+
+    def pairwise_deltas(self):
+        """delta[i, j, k] = metric k of scenario i minus scenario j"""
+        return self.matrix[:, None, :] - self.matrix[None, :, :]
+
+    def benefits(self):
+        """Improvement over the baseline in each metric's good direction"""
+        return self.deltas() * self.directions
+
+    def normalized_scores(self):
+        """Min-max score per metric across the whole set, 1.0 = best, NaN = no data"""
+        oriented = self.matrix * self.directions
+        if not len(oriented):
+            return oriented
+        low = np.min(np.where(np.isnan(oriented), np.inf, oriented), axis=0)
+        high = np.max(np.where(np.isnan(oriented), -np.inf, oriented), axis=0)
+        with np.errstate(all='ignore'):
+            span = high - low
+            scores = np.where(span > 0, (oriented - low) / np.where(span > 0, span, 1), 1.0)
+        return np.where(np.isnan(oriented), np.nan, scores)
+
+    def weighted_benefit(self, weights):
+        """
+        Weighted benefit per scenario. Each metric's benefit is scaled by the
+        largest absolute benefit in the set, so weights compare unitless values.
+        Metrics a scenario has no data for drop out of its weight total.
+        """
+        w = np.array([weights.get(m, 0.0) for m in self.metrics], dtype=float)
+        benefit = self.benefits()
+        if not len(benefit):
+            return np.zeros(0)
+        scale = np.max(np.abs(np.where(np.isnan(benefit), 0, benefit)), axis=0)
+        scaled = benefit / np.where(scale > 0, scale, 1)
+        present = ~np.isnan(scaled)
+        weight_total = (present * w).sum(axis=1)
+        total = np.where(present, scaled, 0) @ w
+        with np.errstate(all='ignore'):
+            return np.where(weight_total > 0, total / weight_total, np.nan)
+
+    def rank(self, weights=None, top=None, include_baselines=False):
+        """Scenarios ordered by weighted benefit, best first"""
+        weights = weights or DEFAULT_WEIGHTS
+        scores = self.weighted_benefit(weights)
+        candidates = np.ones(len(self.ids), dtype=bool)
+        if not include_baselines:
+            candidates &= np.array([s.get('type') != 'baseline' for s in self.scenarios], dtype=bool)
+        candidates &= ~np.isnan(scores)
+        order = np.flatnonzero(candidates)
+        order = order[np.argsort(-scores[order], kind='stable')]
+        if top:
+            order = order[:top]
+
+        deltas = self.deltas()
+        normalized = self.normalized_scores()
+        return [
+            {
+                'rank': position + 1,
+                'id': self.ids[i],
+                'name': self.scenarios[i].get('name'),
+                'type': self.scenarios[i].get('type'),
+                'alley_id': self.alleys[self.groups[i]],
+                'score': round(float(scores[i]), 4),
+                'metrics': self._row_dict(self.matrix[i]),
+                'deltas': self._row_dict(deltas[i]),
+                'normalized': self._row_dict(normalized[i], digits=4)
+            }
+            for position, i in enumerate(order)
+        ]
+
+    def pairwise_report(self):
+        """{metric: n x n delta matrix} with None where either side lacks data"""
+        pairwise = self.pairwise_deltas()
+        return {
+            metric: [[None if np.isnan(v) else round(float(v), 2) for v in row] for row in pairwise[:, :, k]]
+            for k, metric in enumerate(self.metrics)
+        }
+
+    def _row_dict(self, row, digits=2):
+        return {m: None if np.isnan(v) else round(float(v), digits) for m, v in zip(self.metrics, row)}
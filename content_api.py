@@ -0,0 +1,46 @@
+"""
+Edit mode API: content read/write for localhost editing
+Only functional on localhost. No layout changes, no DOM mutation.
+"""
+from flask import Blueprint, request, jsonify
+
+from content_manager import content_manager
+from extensions import is_edit_allowed
+
+content_bp = Blueprint('content', __name__)
+
+EDIT_MODE_ALLOWED_CATEGORIES = ['pages', 'areas', 'media', 'theme']
+
+@content_bp.route('/api/content/<category>/<filename>', methods=['GET'])
+def get_content(category, filename):
+    """Read a content JSON file"""
+    if category not in EDIT_MODE_ALLOWED_CATEGORIES:
+        return jsonify({'error': 'Invalid category'}), 400
+    data = content_manager.read(category, filename)
+    if data is None:
+        return jsonify({'error': 'Content not found'}), 404
+    return jsonify(data)
+
+@content_bp.route('/api/content/<category>/<filename>', methods=['POST'])
+def save_content(category, filename):
+    """Write a content JSON file. Localhost only."""
+    if not is_edit_allowed():
+        return jsonify({'error': 'Edit mode is only available on localhost'}), 403
+    if category not in EDIT_MODE_ALLOWED_CATEGORIES:
+        return jsonify({'error': 'Invalid category'}), 400
+    data = request.get_json()
+    if data is None:
+        return jsonify({'error': 'Invalid JSON body'}), 400
+    try:
+        content_manager.write(category, filename, data)
+        return jsonify({'success': True, 'message': f'{category}/{filename} saved'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/api/content-list/<category>', methods=['GET'])
+def list_content(category):
+    """List all content files in a category"""
+    if category not in EDIT_MODE_ALLOWED_CATEGORIES:
+        return jsonify({'error': 'Invalid category'}), 400
+    files = content_manager.list_files(category)
+    return jsonify({'files': files})
@@ -15,6 +15,10 @@ class ContentManager:
         if content_dir is None:
             content_dir = os.path.join(os.path.dirname(__file__), 'content')
         self.content_dir = content_dir
+        # Set to a set() to record every path read (the static builder tracks page inputs this way)
+        self.read_log = None
+        # Bumped on every write so caches of rendered pages drop what they hold
+        self.writes = 0
 
     def _resolve_path(self, category, filename):
         """Resolve a content file path. Returns None if path escapes content_dir."""
@@ -35,6 +39,8 @@ class ContentManager:
         path = self._resolve_path(category, filename)
         if path is None:
             return None
+        if self.read_log is not None:
+            self.read_log.add(path)
         try:
             with open(path, 'r', encoding='utf-8') as f:
                 return json.load(f)
@@ -75,6 +81,7 @@ class ContentManager:
                 os.remove(tmp_path)
             raise
 
+        self.writes += 1
         return True
 
     def list_files(self, category):
@@ -85,6 +92,19 @@ class ContentManager:
             return []
         return [f[:-5] for f in os.listdir(cat_dir) if f.endswith('.json')]
 
+    def stamp(self, categories):
+        """(name, mtime, size) of every file in the given categories; changes when any of them is edited"""
+        entries = []
+        for category in categories:
+            cat_dir = os.path.join(self.content_dir, os.path.basename(category))
+            if not os.path.isdir(cat_dir):
+                continue
+            for entry in os.scandir(cat_dir):
+                if entry.name.endswith('.json') and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((f'{category}/{entry.name}', stat.st_mtime_ns, stat.st_size))
+        return sorted(entries)
+
     def load_page_content(self, page_name):
         """Convenience: load a page content file from /content/pages/."""
         return self.read('pages', page_name)
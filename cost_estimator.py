@@ -0,0 +1,240 @@
+"""
+Cost estimates for a selection of projects and project categories
+A selection holds whole projects ('project-2') and single categories of
+a project ('project-3:wall'). Each unit's contribution is computed once
+per cost_data.json version, and estimates are memoized by a hash of the
+selection. Adding or removing units applies their contributions to the
+cached estimate, so one click on the fence map costs O(1) instead of a
+full recompute.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from cost_model import cost_model
+
+CACHE_SIZE = int(os.environ.get('COST_ESTIMATE_CACHE_SIZE', '1024'))
+
+RANGE_FIELDS = ('total', 'labor_hours', 'labor_cost')
+
+
+class SelectionError(ValueError):
+    """Raised for a selection unit that does not match the cost data"""
+
+
+def _zero():
+    return {'low': 0.0, 'high': 0.0}
+
+
+def _apply(target, amount, sign):
+    target['low'] += sign * amount['low']
+    target['high'] += sign * amount['high']
+
+
+def _rounded(value):
+    return {'low': round(value['low'], 2), 'high': round(value['high'], 2)}
+
+
+class CostEstimator:
+    """Memoized, incrementally updated estimates over the cost model"""
+
+    def __init__(self, model=cost_model, cache_size=CACHE_SIZE):
+        self.model = model
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.version = None
+        self.contributions = {}
+        self.estimates = OrderedDict()   # selection hash -> running estimate
+        self.hits = 0
+        self.misses = 0
+
+    def _sync(self):
+        """Drop contributions and estimates computed from an older cost_data.json"""
+        self.model.refresh()
+        if self.model.version != self.version:
+            with self.lock:
+                self.version = self.model.version
+                self.contributions = {}
+                self.estimates = OrderedDict()
+
+    def _parse_unit(self, unit):
+        project_key, _, category = str(unit).partition(':')
+        project = self.model.find_project(project_key.strip())
+        if project is None:
+            raise SelectionError(f"Unknown project '{project_key}'")
+        category = category.strip() or None
+        if category and category not in project['categories']:
+            raise SelectionError(f"Project '{project['id']}' has no '{category}' costs")
+        return project, category
+
+    def canonical_unit(self, unit):
+        project, category = self._parse_unit(unit)
+        return project['id'] if category is None else f"{project['id']}:{category}"
+
+    def contribution(self, unit):
+        """Totals one canonical unit adds to an estimate"""
+        cached = self.contributions.get(unit)
+        if cached:
+            return cached
+        project, category = self._parse_unit(unit)
+        if category is None:
+            labor_cost = _zero()
+            for data in project['categories'].values():
+                _apply(labor_cost, data['labor_cost'], 1)
+            contribution = {
+                'project': project['id'],
+                'total': project['total'],
+                'labor_hours': project['labor_hours'],
+                'labor_cost': labor_cost,
+                'categories': {name: data['total'] for name, data in project['categories'].items()}
+            }
+        else:
+            data = project['categories'][category]
+            contribution = {
+                'project': project['id'],
+                'total': data['total'],
+                'labor_hours': data['labor_hours'],
+                'labor_cost': data['labor_cost'],
+                'categories': {category: data['total']}
+            }
+        self.contributions[unit] = contribution
+        return contribution
+
+    def canonical_selection(self, selection):
+        """Sorted unique units; a whole project absorbs its own categories"""
+        units = {self.canonical_unit(unit) for unit in selection or []}
+        return sorted(u for u in units if ':' not in u or u.split(':', 1)[0] not in units)
+
+    def selection_hash(self, units):
+        payload = '\n'.join([self.version or ''] + list(units))
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+    def _empty(self):
+        return {
+            'units': set(),
+            'total': _zero(), 'labor_hours': _zero(), 'labor_cost': _zero(),
+            'categories': {}, 'projects': {}
+        }
+
+    def _change(self, state, unit, sign):
+        contribution = self.contribution(unit)
+        for field in RANGE_FIELDS:
+            _apply(state[field], contribution[field], sign)
+        for name, amount in contribution['categories'].items():
+            _apply(state['categories'].setdefault(name, _zero()), amount, sign)
+        _apply(state['projects'].setdefault(contribution['project'], _zero()), contribution['total'], sign)
+        if sign > 0:
+            state['units'].add(unit)
+        else:
+            state['units'].discard(unit)
+
+    def _store(self, key, state):
+        with self.lock:
+            self.estimates[key] = state
+            self.estimates.move_to_end(key)
+            while len(self.estimates) > self.cache_size:
+                self.estimates.popitem(last=False)
+
+    def _lookup(self, key):
+        with self.lock:
+            state = self.estimates.get(key)
+            if state is not None:
+                self.estimates.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return state
+
+    def _copy(self, state):
+        return {
+            'units': set(state['units']),
+            **{field: dict(state[field]) for field in RANGE_FIELDS},
+            'categories': {k: dict(v) for k, v in state['categories'].items()},
+            'projects': {k: dict(v) for k, v in state['projects'].items()}
+        }
+
+    def _result(self, key, state, cached):
+        units = sorted(state['units'])
+        selected_projects = {u.split(':')[0] for u in units}
+        categories = {k: _rounded(v) for k, v in sorted(state['categories'].items())}
+        return {
+            'selection': units,
+            'selection_hash': key,
+            'version': self.version,
+            'cached': cached,
+            'count': len(units),
+            **{field: _rounded(state[field]) for field in RANGE_FIELDS},
+            # Project totals come from each table's grand total, which can differ from its category sum
+            'categories': {k: v for k, v in categories.items() if v['low'] or v['high']},
+            'projects': {k: _rounded(v) for k, v in sorted(state['projects'].items()) if k in selected_projects}
+        }
+
+    def estimate(self, selection):
+        """Full estimate for a selection, served from the memo when seen before"""
+        self._sync()
+        units = self.canonical_selection(selection)
+        key = self.selection_hash(units)
+        state = self._lookup(key)
+        if state is not None:
+            return self._result(key, state, True)
+        state = self._empty()
+        for unit in units:
+            self._change(state, unit, 1)
+        self._store(key, state)
+        return self._result(key, state, False)
+
+    def update(self, base_hash=None, selection=None, add=(), remove=()):
+        """
+        Estimate after adding and removing units from a previous estimate,
+        found by its selection_hash (or rebuilt from selection if it has
+        been evicted). Each unit changed costs a constant amount of work.
+        """
+        self._sync()
+        state = self._lookup(base_hash) if base_hash else None
+        if state is None:
+            if selection is None:
+                raise SelectionError('Unknown selection_hash; send the selection instead')
+            base = self.estimate(selection)
+            state = self._lookup(base['selection_hash'])
+        state = self._copy(state)
+
+        for unit in remove or []:
+            unit = self.canonical_unit(unit)
+            if unit in state['units']:
+                self._change(state, unit, -1)
+            elif ':' not in unit:
+                # Removing a project also removes any of its categories picked one by one
+                for name in self.model.projects[unit]['categories']:
+                    if f'{unit}:{name}' in state['units']:
+                        self._change(state, f'{unit}:{name}', -1)
+        for unit in add or []:
+            unit = self.canonical_unit(unit)
+            if unit in state['units']:
+                continue
+            project_id, _, category = unit.partition(':')
+            if category:
+                if project_id in state['units']:
+                    continue   # already covered by the whole project
+            else:
+                for name in self.model.projects[project_id]['categories']:
+                    if f'{unit}:{name}' in state['units']:
+                        self._change(state, f'{unit}:{name}', -1)
+            self._change(state, unit, 1)
+
+        key = self.selection_hash(sorted(state['units']))
+        with self.lock:
+            existing = self.estimates.get(key)
+        if existing is not None:
+            return self._result(key, existing, True)
+        self._store(key, state)
+        return self._result(key, state, False)
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.estimates), 'capacity': self.cache_size, 'hits': self.hits,
+                    'misses': self.misses, 'version': self.version}
+
+
+# Create global instance
+cost_estimator = CostEstimator()
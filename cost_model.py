@@ -0,0 +1,261 @@
+"""
+Normalized cost model over content/cost_data.json
+The cost tables mix numbers with strings such as "Included" and
+"Incl./$90". They are parsed once into numeric low/high values with
+inclusion flags, indexed by area, project and category, and rolled up
+per area, per category and overall. The file is re-parsed only when its
+modification time or size changes.
+"""
+import json
+import os
+import re
+import threading
+
+COST_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content', 'cost_data.json')
+
+# cost_table keys that are not work categories
+SUMMARY_KEYS = ('grand_total', 'combined')
+
+_AMOUNT = re.compile(r'\$?\s*(\d[\d,]*(?:\.\d+)?)')
+
+
+def parse_amount(value):
+    """
+    (amount, included, standalone) for one cost cell. Included items cost
+    nothing extra; "Incl./$90" also records the $90 it would cost on its own.
+    """
+    if isinstance(value, bool) or value is None:
+        return None, False, None
+    if isinstance(value, (int, float)):
+        return float(value), False, None
+    text = str(value).strip()
+    included = text.lower().startswith('incl')
+    match = _AMOUNT.search(text)
+    amount = float(match.group(1).replace(',', '')) if match else None
+    if included:
+        return 0.0, True, amount
+    return amount, False, None
+
+
+def _range(data):
+    """{'low', 'high'} with numeric values, or None"""
+    if not isinstance(data, dict):
+        return None
+    low = parse_amount(data.get('low'))[0]
+    high = parse_amount(data.get('high'))[0]
+    if low is None and high is None:
+        return None
+    return {'low': low or 0.0, 'high': high if high is not None else low}
+
+
+def _add(total, value):
+    if value:
+        total['low'] += value['low']
+        total['high'] += value['high']
+    return total
+
+
+def empty_range():
+    return {'low': 0.0, 'high': 0.0}
+
+
+def _normalize_item(item):
+    low, low_included, low_standalone = parse_amount(item.get('low'))
+    high, high_included, high_standalone = parse_amount(item.get('high'))
+    normalized = {
+        'item': item.get('item', ''),
+        'low': low or 0.0,
+        'high': high if high is not None else (low or 0.0),
+        'included': low_included or high_included
+    }
+    if low_standalone is not None or high_standalone is not None:
+        normalized['standalone'] = {'low': low_standalone or high_standalone, 'high': high_standalone or low_standalone}
+    if not isinstance(item.get('low'), (int, float)) or not isinstance(item.get('high'), (int, float)):
+        normalized['raw'] = {'low': item.get('low'), 'high': item.get('high')}
+    return normalized
+
+
+def _normalize_category(name, table):
+    items = [_normalize_item(item) for item in table.get('items', [])]
+    materials = empty_range()
+    for item in items:
+        _add(materials, item)
+    labor_hours = _range(table.get('labor_hrs'))
+    labor_cost = _range(table.get('labor_cost'))
+    total = _range(table.get('total'))
+    return {
+        'category': name,
+        'items': items,
+        'materials': materials,
+        'labor_hours': labor_hours or empty_range(),
+        'labor_cost': labor_cost or empty_range(),
+        'total': total or _add(dict(materials), labor_cost),
+        'total_source': 'table' if total else 'items',
+        'notes': table.get('notes', '')
+    }
+
+
+def _normalize_project(project):
+    table = project.get('cost_table', {})
+    categories = {
+        name: _normalize_category(name, data)
+        for name, data in table.items()
+        if name not in SUMMARY_KEYS and isinstance(data, dict)
+    }
+    labor_hours = empty_range()
+    category_total = empty_range()
+    for category in categories.values():
+        _add(labor_hours, category['labor_hours'])
+        _add(category_total, category['total'])
+    grand_total = _range(table.get('grand_total'))
+    return {
+        'id': project['id'],
+        'area': project.get('area'),
+        'project': project.get('project'),
+        'title': project.get('title'),
+        'sections': project.get('sections'),
+        'map_label': project.get('map_label'),
+        'categories': categories,
+        'labor_hours': labor_hours,
+        'total': grand_total or category_total,
+        'total_source': 'table' if grand_total else 'categories'
+    }
+
+
+def _rollup(entries):
+    """Totals over (project, category or None) entries; None means the whole project"""
+    rollup = {'total': empty_range(), 'labor_hours': empty_range(), 'labor_cost': empty_range(), 'projects': []}
+    for project, category in entries:
+        source = project if category is None else project['categories'][category]
+        _add(rollup['total'], source['total'])
+        _add(rollup['labor_hours'], source['labor_hours'])
+        if category is None:
+            for data in project['categories'].values():
+                _add(rollup['labor_cost'], data['labor_cost'])
+        else:
+            _add(rollup['labor_cost'], source['labor_cost'])
+        if project['id'] not in rollup['projects']:
+            rollup['projects'].append(project['id'])
+    return rollup
+
+
+class CostModel:
+    """Parsed, indexed view of cost_data.json, rebuilt when the file changes"""
+
+    def __init__(self, path=COST_DATA_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stamp = None
+        self.raw = None
+        self.projects = {}
+        self.by_area = {}
+        self.by_category = {}
+        self.rollups = {}
+        self.version = None
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def refresh(self):
+        """Re-parse the file if it changed since the last load; returns the model"""
+        stamp = self._file_stamp()
+        if stamp == self.stamp and self.raw is not None:
+            return self
+        with self.lock:
+            if stamp == self.stamp and self.raw is not None:
+                return self
+            with open(self.path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            self._build(raw)
+            self.raw = raw
+            self.stamp = stamp
+            self.version = f'{stamp[0]:x}-{stamp[1]:x}' if stamp else '0'
+            print(f"[Costs] Loaded {len(self.projects)} projects from {os.path.basename(self.path)}")
+        return self
+
+    def _build(self, raw):
+        projects = {}
+        by_area = {}
+        by_category = {}
+        for project in raw.get('projects', []):
+            normalized = _normalize_project(project)
+            projects[normalized['id']] = normalized
+            by_area.setdefault(normalized['area'], []).append(normalized['id'])
+            for category in normalized['categories']:
+                by_category.setdefault(category, []).append(normalized['id'])
+
+        self.projects = projects
+        self.by_area = by_area
+        self.by_category = by_category
+        self.rollups = {
+            'areas': {area: _rollup((projects[pid], None) for pid in ids) for area, ids in by_area.items()},
+            'categories': {
+                category: _rollup((projects[pid], category) for pid in ids) for category, ids in by_category.items()
+            },
+            'overall': _rollup((p, None) for p in projects.values()),
+            'reported': raw.get('summary', {})
+        }
+
+    def document(self):
+        """The file as published (what /api/cost-data has always returned)"""
+        return self.refresh().raw
+
+    def find_project(self, key):
+        """Project by id ('project-2') or name ('Project 2')"""
+        self.refresh()
+        if key in self.projects:
+            return self.projects[key]
+        for project in self.projects.values():
+            if (project['project'] or '').lower() == str(key).lower():
+                return project
+        return None
+
+    def select(self, areas=None, projects=None, categories=None):
+        """
+        Projects matching every given filter, each trimmed to the requested
+        categories, with a rollup of the slice
+        """
+        self.refresh()
+        ids = list(self.projects)
+        if areas:
+            wanted = {a.upper() for a in areas}
+            ids = [pid for pid in ids if (self.projects[pid]['area'] or '').upper() in wanted]
+        if projects:
+            wanted = set()
+            for key in projects:
+                project = self.find_project(key)
+                if project is None:
+                    raise KeyError(f"Unknown project '{key}'")
+                wanted.add(project['id'])
+            ids = [pid for pid in ids if pid in wanted]
+        if categories:
+            unknown = [c for c in categories if c not in self.by_category]
+            if unknown:
+                raise KeyError(f"Unknown category '{unknown[0]}' (use {', '.join(sorted(self.by_category))})")
+
+        selected, entries = [], []
+        for pid in ids:
+            project = self.projects[pid]
+            if categories:
+                names = [c for c in categories if c in project['categories']]
+                if not names:
+                    continue
+                selected.append(dict(project, categories={c: project['categories'][c] for c in names}))
+                entries.extend((project, c) for c in names)
+            else:
+                selected.append(project)
+                entries.append((project, None))
+        return {'version': self.version, 'projects': selected, 'rollup': _rollup(entries)}
+
+    def summary(self):
+        self.refresh()
+        return {'version': self.version, **self.rollups,
+                'areas_index': self.by_area, 'categories_index': self.by_category}
+
+
+# Create global instance
+cost_model = CostModel()
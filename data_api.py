@@ -0,0 +1,1780 @@
+"""
+Data APIs: environmental data, scenarios, costs, simulation, exports and auth
+Pillow and the NumPy models are imported inside the routes that use them,
+so importing this blueprint stays cheap. requests is imported here:
+flask_socketio already loads it through the Engine.IO client.
+"""
+import json
+import io
+import os
+import time
+from datetime import datetime
+
+import requests
+from flask import Blueprint, current_app, request, jsonify, send_file, session, Response, stream_with_context
+from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.utils import secure_filename
+
+from extensions import GOOGLE_API_KEY, UNSPLASH_KEY, OPENWEATHER_KEY, is_edit_allowed, login_required
+from scenario_listing import list_scenarios, filter_scenarios, ListingError
+from scenario_history import scenario_history, diff_states
+from scenario_bulk import BulkImport, export_ndjson, export_csv, EXPORT_FORMATS
+from scenario_repository import scenario_repository
+from scenario_metrics import query_by_metrics
+from cost_model import cost_model
+from cost_estimator import cost_estimator, SelectionError
+from models import db, User, Scenario, metric_value
+from db_profile import pool_metrics
+
+data_bp = Blueprint('data', __name__)
+
+# Pico-Union coordinates - 12 Innovation Alleys (CORRECT COORDINATES)
+PICO_UNION_COORDS = {
+    'alley1': {'lat': 34.05029712004266, 'lng': -118.28298209970326},  # Energy
+    'alley2': {'lat': 34.0483347119334, 'lng': -118.28278909472274},  # Sun
+    'alley3': {'lat': 34.04982619528969, 'lng': -118.2818586747943},  # Water (primary prototype)
+    'alley4': {'lat': 34.051573754452384, 'lng': -118.28210289757493},  # Universe
+    'alley5': {'lat': 34.0512482767413, 'lng': -118.2809130897754},  # Air
+    'alley6': {'lat': 34.05069899513361, 'lng': -118.27979221364627},  # Earth
+    'alley7': {'lat': 34.05021760023289, 'lng': -118.27868110207845},  # Humanity
+    'alley8': {'lat': 34.049753910675584, 'lng': -118.27759968651065},  # Animals
+    'alley9': {'lat': 34.049217918459284, 'lng': -118.2764975596723},  # Plants
+    'alley10': {'lat': 34.04311380244757, 'lng': -118.27473862298159}, # Minerals
+    'alley11': {'lat': 34.04390854936556, 'lng': -118.27670128625326}, # Insects
+    'alley12': {'lat': 34.04434271351046, 'lng': -118.27771370076478}, # Prosperity
+    'default': {'lat': 34.04982619528969, 'lng': -118.2818586747943}
+}
+
+# ============================================================================
+# GOOGLE CLOUD API FUNCTIONS - REAL DATA
+# ============================================================================
+
+def get_google_air_quality(lat, lng):
+    """
+    Get real air quality data from Google Air Quality API
+    Returns: temperature, AQI, PM2.5, pollutants
+    """
+    try:
+        url = "https://airquality.googleapis.com/v1/currentConditions:lookup"
+        headers = {
+            'Content-Type': 'application/json',
+        }
+        params = {
+            'key': GOOGLE_API_KEY
+        }
+        payload = {
+            "location": {
+                "latitude": lat,
+                "longitude": lng
+            },
+            "extraComputations": [
+                "HEALTH_RECOMMENDATIONS",
+                "DOMINANT_POLLUTANT_CONCENTRATION",
+                "POLLUTANT_CONCENTRATION"
+            ]
+        }
+        
+        response = requests.post(url, headers=headers, params=params, json=payload, timeout=5)
+        
+        if response.status_code == 200:
+            data = response.json()
+            
+            # Extract air quality index
+            aqi = 'N/A'
+            pm25 = 'N/A'
+            
+            if 'indexes' in data and len(data['indexes']) > 0:
+                aqi = data['indexes'][0].get('aqi', 'N/A')
+            
+            # Extract PM2.5 if available
+            if 'pollutants' in data:
+                for pollutant in data['pollutants']:
+                    if pollutant.get('code') == 'pm25':
+                        pm25 = pollutant.get('concentration', {}).get('value', 'N/A')
+            
+            return {
+                'aqi': aqi,
+                'pm25': pm25,
+                'temperature': None,  # Air Quality API doesn't provide temp
+                'data_available': True
+            }
+        else:
+            print(f"Air Quality API error: {response.status_code}")
+            return {'aqi': 'N/A', 'pm25': 'N/A', 'temperature': None, 'data_available': False}
+            
+    except Exception as e:
+        print(f"Error fetching air quality: {e}")
+        return {'aqi': 'N/A', 'pm25': 'N/A', 'temperature': None, 'data_available': False}
+
+
+def get_google_places_activity(lat, lng):
+    """
+    Get community activity data from Google Places API
+    Returns: nearby businesses, activity level estimate
+    """
+    try:
+        url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+        params = {
+            'location': f'{lat},{lng}',
+            'radius': 500,  # 500 meters around alley
+            'key': GOOGLE_API_KEY
+        }
+        
+        response = requests.get(url, params=params, timeout=5)
+        
+        if response.status_code == 200:
+            data = response.json()
+            results = data.get('results', [])
+            
+            # Count different types of places
+            business_count = len(results)
+            
+            # Estimate activity level based on number of places
+            # More places = more foot traffic
+            if business_count > 50:
+                activity_level = 10
+            elif business_count > 30:
+                activity_level = 7
+            elif business_count > 15:
+                activity_level = 5
+            else:
+                activity_level = 3
+            
+            # Get types of places
+            place_types = {}
+            for place in results:
+                for place_type in place.get('types', []):
+                    place_types[place_type] = place_types.get(place_type, 0) + 1
+            
+            return {
+                'business_count': business_count,
+                'activity_level': activity_level,
+                'place_types': place_types,
+                'data_available': True
+            }
+        else:
+            print(f"Places API error: {response.status_code}")
+            return {'business_count': 0, 'activity_level': 0, 'data_available': False}
+            
+    except Exception as e:
+        print(f"Error fetching places data: {e}")
+        return {'business_count': 0, 'activity_level': 0, 'data_available': False}
+
+
+def get_google_elevation(lat, lng):
+    """
+    Get elevation data for water runoff calculations
+    Returns: elevation in meters, slope estimate
+    """
+    try:
+        url = "https://maps.googleapis.com/maps/api/elevation/json"
+        
+        # Get elevation at multiple points to calculate slope
+        points = [
+            f'{lat},{lng}',
+            f'{lat + 0.0005},{lng}',  # ~50m north
+            f'{lat},{lng + 0.0005}'   # ~50m east
+        ]
+        
+        params = {
+            'locations': '|'.join(points),
+            'key': GOOGLE_API_KEY
+        }
+        
+        response = requests.get(url, params=params, timeout=5)
+        
+        if response.status_code == 200:
+            data = response.json()
+            results = data.get('results', [])
+            
+            if len(results) >= 3:
+                elevations = [r['elevation'] for r in results]
+                avg_elevation = sum(elevations) / len(elevations)
+                
+                # Calculate rough slope
+                elevation_diff = max(elevations) - min(elevations)
+                slope_percent = (elevation_diff / 50) * 100  # Rough estimate
+                
+                return {
+                    'elevation': avg_elevation,
+                    'slope_percent': slope_percent,
+                    'data_available': True
+                }
+        
+        return {'elevation': 0, 'slope_percent': 0, 'data_available': False}
+        
+    except Exception as e:
+        print(f"Error fetching elevation: {e}")
+        return {'elevation': 0, 'slope_percent': 0, 'data_available': False}
+
+@data_bp.route('/api/cost-data')
+def api_cost_data():
+    # Serve structured cost data JSON for fence map and other dynamic pages
+    try:
+        return jsonify(cost_model.document())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _list_arg(name):
+    return [v.strip() for v in request.args.get(name, '').split(',') if v.strip()]
+
+@data_bp.route('/api/costs')
+def api_costs():
+    """
+    Normalized cost tables with numeric low/high values
+    Query args (comma-separated): area=A,B  project=project-2  category=wall,pavement
+    """
+    try:
+        return jsonify(cost_model.select(
+            areas=_list_arg('area'), projects=_list_arg('project'), categories=_list_arg('category')
+        ))
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 400
+    except Exception as e:
+        print(f"Error selecting costs: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/costs/rollups')
+def api_cost_rollups():
+    """Precomputed totals per area, per category and overall"""
+    try:
+        return jsonify(cost_model.summary())
+    except Exception as e:
+        print(f"Error loading cost rollups: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/costs/estimate', methods=['POST'])
+def api_cost_estimate():
+    """
+    Low/high totals, labor and per-category breakdown for a selection
+    Body: {"selection": ["project-2", "project-3:wall", ...]} for a full estimate, or
+    {"selection_hash": ..., "add": [...], "remove": [...]} to change a previous one
+    (include "selection" as well in case the cached estimate has been evicted)
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get('add') or data.get('remove') or data.get('selection_hash'):
+            return jsonify(cost_estimator.update(
+                base_hash=data.get('selection_hash'),
+                selection=data.get('selection'),
+                add=data.get('add') or [],
+                remove=data.get('remove') or []
+            ))
+        return jsonify(cost_estimator.estimate(data.get('selection') or []))
+    except SelectionError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error estimating costs: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/nasa-temperature')
+def get_nasa_temperature():
+    """Fetch real surface temperature from NASA POWER API for the alley location"""
+    try:
+        # NASA POWER API - Free, no key needed!
+        url = "https://power.larc.nasa.gov/api/temporal/daily/point"
+        
+        # Alley coordinates: W 11th & W 12th St, Pico-Union
+        params = {
+            'parameters': 'T2M,T2M_MAX,T2M_MIN',  # Temperature at 2 meters (air temp near surface)
+            'community': 'RE',  # Renewable Energy community
+            'longitude': -118.28129,
+            'latitude': 34.04927,
+            'start': '20241101',  # Last 30 days
+            'end': '20241130',
+            'format': 'JSON'
+        }
+        
+        response = requests.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        
+        # Get the most recent temperature data
+        if 'properties' in data and 'parameter' in data['properties']:
+            temps = data['properties']['parameter']
+            
+            # Get latest values
+            t2m_data = temps.get('T2M', {})
+            latest_date = max(t2m_data.keys()) if t2m_data else None
+            
+            if latest_date:
+                current_temp = t2m_data[latest_date]
+                
+                return jsonify({
+                    'success': True,
+                    'temperature': round(current_temp * 9/5 + 32, 1),  # Convert C to F
+                    'date': latest_date,
+                    'location': 'Alley corridor between W 11th & W 12th St, Pico-Union',
+                    'coordinates': {'lat': 34.04927, 'lng': -118.28129},
+                    'source': 'NASA POWER',
+                    'source_full': 'NASA Prediction Of Worldwide Energy Resources',
+                    'description': 'Satellite-derived surface temperature data',
+                    'url': 'https://power.larc.nasa.gov/'
+                })
+        
+        raise Exception('No temperature data available')
+        
+    except Exception as e:
+        print(f"Error fetching NASA temperature: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Using estimated temperature data'
+        }), 500
+
+@data_bp.route('/api/plants')
+def get_plants():
+    """Fetch California native plants from iNaturalist API"""
+    try:
+        # iNaturalist API - Get iconic taxa (plants) native to California
+        # Place ID 14 = California
+        url = "https://api.inaturalist.org/v1/taxa"
+        params = {
+            'iconic_taxa': 'Plantae',  # Plants only
+            'place_id': 14,  # California
+            'native': 'true',  # Native species only
+            'rank': 'species',  # Species level
+            'per_page': 50,  # Get 50 plants
+            'order': 'desc',
+            'order_by': 'observations_count',  # Most observed first
+            'q': 'native california drought tolerant'  # Search query
+        }
+        
+        response = requests.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        
+        # Format the data for our plant library
+        plants = []
+        for taxon in data.get('results', []):
+            plant = {
+                'id': taxon.get('id'),
+                'name': taxon.get('name'),
+                'common_name': taxon.get('preferred_common_name', taxon.get('name')),
+                'scientific_name': taxon.get('name'),
+                'photo': taxon.get('default_photo', {}).get('medium_url', ''),
+                'wikipedia_url': taxon.get('wikipedia_url', ''),
+                'observations_count': taxon.get('observations_count', 0),
+                'native': True,
+                'drought_tolerant': True,  # Filtered by query
+                'type': 'Native California'
+            }
+            plants.append(plant)
+        
+        return jsonify({
+            'success': True,
+            'plants': plants,
+            'count': len(plants),
+            'source': 'iNaturalist API'
+        })
+        
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching plants from iNaturalist: {e}")
+        # Return fallback data if API fails
+        fallback_plants = [
+            {
+                'id': 1,
+                'name': 'California Poppy',
+                'common_name': 'California Poppy',
+                'scientific_name': 'Eschscholzia californica',
+                'photo': '',
+                'wikipedia_url': 'https://en.wikipedia.org/wiki/Eschscholzia_californica',
+                'observations_count': 5000,
+                'native': True,
+                'drought_tolerant': True,
+                'type': 'Native California'
+            },
+            {
+                'id': 2,
+                'name': 'Desert Marigold',
+                'common_name': 'Desert Marigold',
+                'scientific_name': 'Baileya multiradiata',
+                'photo': '',
+                'wikipedia_url': 'https://en.wikipedia.org/wiki/Baileya_multiradiata',
+                'observations_count': 3000,
+                'native': True,
+                'drought_tolerant': True,
+                'type': 'Native California'
+            },
+            {
+                'id': 3,
+                'name': 'Toyon',
+                'common_name': 'Toyon',
+                'scientific_name': 'Heteromeles arbutifolia',
+                'photo': '',
+                'wikipedia_url': 'https://en.wikipedia.org/wiki/Heteromeles_arbutifolia',
+                'observations_count': 4000,
+                'native': True,
+                'drought_tolerant': True,
+                'type': 'Native California'
+            },
+            {
+                'id': 4,
+                'name': 'Coyote Brush',
+                'common_name': 'Coyote Brush',
+                'scientific_name': 'Baccharis pilularis',
+                'photo': '',
+                'wikipedia_url': 'https://en.wikipedia.org/wiki/Baccharis_pilularis',
+                'observations_count': 3500,
+                'native': True,
+                'drought_tolerant': True,
+                'type': 'Native California'
+            },
+            {
+                'id': 5,
+                'name': 'California Buckwheat',
+                'common_name': 'California Buckwheat',
+                'scientific_name': 'Eriogonum fasciculatum',
+                'photo': '',
+                'wikipedia_url': 'https://en.wikipedia.org/wiki/Eriogonum_fasciculatum',
+                'observations_count': 2800,
+                'native': True,
+                'drought_tolerant': True,
+                'type': 'Native California'
+            }
+        ]
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'plants': fallback_plants,
+            'message': 'Using cached plant data'
+        }), 200
+
+@data_bp.route('/api/images/<query>', methods=['GET'])
+def get_images(query):
+    """Search for images from Unsplash API"""
+    try:
+        if not UNSPLASH_KEY or UNSPLASH_KEY == '':
+            return jsonify({'error': 'Unsplash API key not configured', 'results': []}), 200
+        
+        url = "https://api.unsplash.com/search/photos"
+        params = {
+            'query': query,
+            'per_page': 10,
+            'client_id': UNSPLASH_KEY
+        }
+        
+        response = requests.get(url, params=params, timeout=5)
+        if response.status_code == 200:
+            return jsonify(response.json())
+        return jsonify({'error': 'Failed to fetch images', 'results': []}), 200
+    except Exception as e:
+        print(f"Error fetching images: {e}")
+        return jsonify({'error': str(e), 'results': []}), 200
+
+@data_bp.route('/api/weather/<lat>/<lng>', methods=['GET'])
+def get_weather(lat, lng):
+    """Get weather data from OpenWeatherMap"""
+    try:
+        if not OPENWEATHER_KEY or OPENWEATHER_KEY == '':
+            return jsonify({'error': 'OpenWeatherMap API key not configured', 'main': {'temp': 75, 'humidity': 50}, 'weather': [{'description': 'unavailable'}]}), 200
+        
+        url = "https://api.openweathermap.org/data/2.5/weather"
+        params = {
+            'lat': lat,
+            'lon': lng,
+            'units': 'imperial',
+            'appid': OPENWEATHER_KEY
+        }
+        
+        response = requests.get(url, params=params, timeout=5)
+        if response.status_code == 200:
+            return jsonify(response.json())
+        return jsonify({'error': 'Failed to fetch weather', 'main': {'temp': 75, 'humidity': 50}, 'weather': [{'description': 'unavailable'}]}), 200
+    except Exception as e:
+        print(f"Error fetching weather: {e}")
+        return jsonify({'error': str(e), 'main': {'temp': 75, 'humidity': 50}, 'weather': [{'description': 'unavailable'}]}), 200
+
+@data_bp.route('/api/solar/<lat>/<lng>', methods=['GET'])
+def get_solar(lat, lng):
+    """Get solar radiation data from NASA POWER API"""
+    try:
+        url = "https://power.larc.nasa.gov/api/temporal/daily/point"
+        params = {
+            'parameters': 'ALLSKY_SFC_SW_DWN',
+            'community': 'RE',
+            'longitude': lng,
+            'latitude': lat,
+            'start': '20241101',
+            'end': '20241130',
+            'format': 'JSON'
+        }
+        
+        response = requests.get(url, params=params, timeout=10)
+        if response.status_code == 200:
+            return jsonify(response.json())
+        return jsonify({'error': 'Failed to fetch solar data', 'parameters': {}}), 200
+    except Exception as e:
+        print(f"Error fetching solar data: {e}")
+        return jsonify({'error': str(e), 'parameters': {}}), 200
+
+@data_bp.route('/api/solar/shade', methods=['POST'])
+def get_solar_shade():
+    """
+    Shade coverage from sun position for a year at an alley's coordinates
+    Body: scenario_id or alley_id (or lat/lng, dimensions, layers), plus
+    optional orientation (degrees of the alley axis from north), wall_height (ft),
+    year, date (YYYY-MM-DD for the hourly series), step_minutes and maps=true
+    """
+    from solar_shading import solar_shade_engine, normalize_geometry
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        scenario = {}
+        if data.get('scenario_id'):
+            scenario = scenario_repository.get(data['scenario_id'])
+            if scenario is None:
+                return jsonify({'error': 'Scenario not found'}), 404
+        
+        alley_id = data.get('alley_id') or scenario.get('alley_id')
+        coords = (scenario.get('location') or {}).get('coordinates') or PICO_UNION_COORDS.get(alley_id, PICO_UNION_COORDS['default'])
+        step_minutes = int(data.get('step_minutes', 60))
+        if step_minutes < 5 or 1440 % step_minutes:
+            return jsonify({'error': 'step_minutes must divide a day and be at least 5'}), 400
+        date = datetime.strptime(data['date'], '%Y-%m-%d').date() if data.get('date') else None
+        
+        geometry = normalize_geometry(
+            data.get('lat', coords['lat']),
+            data.get('lng', coords['lng']),
+            data.get('dimensions') or scenario.get('dimensions'),
+            data.get('layers', scenario.get('layers', [])),
+            orientation=data.get('orientation', 0),
+            wall_height=data.get('wall_height', 0)
+        )
+        year = int(data['year']) if data.get('year') else None
+        return jsonify(solar_shade_engine.report(
+            geometry, year=year, date=date, step_minutes=step_minutes, maps=bool(data.get('maps'))
+        ))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid shade request: {e}'}), 400
+    except Exception as e:
+        print(f"Error computing solar shade: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/species/<lat>/<lng>', methods=['GET'])
+def get_species(lat, lng):
+    """Get species observations from iNaturalist API"""
+    try:
+        url = "https://api.inaturalist.org/v1/observations"
+        params = {
+            'lat': lat,
+            'lng': lng,
+            'radius': 1000,
+            'per_page': 50,
+            'order_by': 'created_at',
+            'order': 'desc'
+        }
+        
+        response = requests.get(url, params=params, timeout=10)
+        if response.status_code == 200:
+            return jsonify(response.json())
+        return jsonify({'error': 'Failed to fetch species data', 'results': [], 'total_results': 0}), 200
+    except Exception as e:
+        print(f"Error fetching species data: {e}")
+        return jsonify({'error': str(e), 'results': [], 'total_results': 0}), 200
+
+@data_bp.route('/api/water/<site_id>', methods=['GET'])
+def get_water(site_id):
+    """Get water data from USGS Water Services"""
+    try:
+        url = "https://waterservices.usgs.gov/nwis/iv/"
+        params = {
+            'sites': site_id,
+            'format': 'json',
+            'parameterCd': '00060,00065'
+        }
+        
+        response = requests.get(url, params=params, timeout=10)
+        if response.status_code == 200:
+            return jsonify(response.json())
+        return jsonify({'error': 'Failed to fetch water data', 'value': {'timeSeries': []}}), 200
+    except Exception as e:
+        print(f"Error fetching water data: {e}")
+        return jsonify({'error': str(e), 'value': {'timeSeries': []}}), 200
+
+@data_bp.route('/api/scenarios', methods=['GET'])
+def get_scenarios():
+    """Get all scenarios (database and data file)"""
+    scenarios = scenario_repository.list()
+    return jsonify({'scenarios': scenarios})
+
+@data_bp.route('/api/scenarios/<scenario_id>', methods=['GET'])
+def get_scenario(scenario_id):
+    """Get a specific scenario by ID"""
+    scenario = scenario_repository.get(scenario_id)
+    if scenario:
+        return jsonify(scenario)
+    return jsonify({'error': 'Scenario not found'}), 404
+
+@data_bp.route('/api/scenarios', methods=['POST'])
+def create_scenario():
+    """Create or update a scenario"""
+    scenario_data = request.get_json()
+    success = scenario_repository.save(scenario_data)
+    if success:
+        return jsonify({'success': True, 'message': 'Scenario saved'})
+    return jsonify({'success': False, 'error': 'Failed to save scenario'}), 500
+
+@data_bp.route('/api/scenarios/<scenario_id>', methods=['DELETE'])
+def delete_scenario(scenario_id):
+    """Delete a scenario"""
+    success = scenario_repository.delete(scenario_id)
+    if success:
+        return jsonify({'success': True, 'message': 'Scenario deleted'})
+    return jsonify({'success': False, 'error': 'Failed to delete scenario'}), 500
+
+@data_bp.route('/api/scenarios/seed', methods=['POST'])
+def seed_scenarios():
+    """
+    Efficiently seed demo scenarios with real Google + NASA data
+    Creates baseline & vision scenarios for Alley 3 using live APIs
+    """
+    from impact_model import simulate as simulate_impact
+    import datetime
+    import concurrent.futures
+    
+    try:
+        alley_id = 'alley3'
+        coords = PICO_UNION_COORDS.get(alley_id, PICO_UNION_COORDS['default'])
+        
+        # Fetch all real data in parallel for efficiency (1 network round-trip)
+        real_data = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            # Submit all API calls simultaneously
+            future_air = executor.submit(get_google_air_quality, coords['lat'], coords['lng'])
+            future_places = executor.submit(get_google_places_activity, coords['lat'], coords['lng'])
+            future_elevation = executor.submit(get_google_elevation, coords['lat'], coords['lng'])
+            
+            # NASA temperature needs different params, call separately
+            try:
+                nasa_url = "https://power.larc.nasa.gov/api/temporal/daily/point"
+                nasa_params = {
+                    'parameters': 'T2M',
+                    'community': 'RE',
+                    'longitude': coords['lng'],
+                    'latitude': coords['lat'],
+                    'start': '20241101',
+                    'end': '20241130',
+                    'format': 'JSON'
+                }
+                nasa_response = requests.get(nasa_url, params=nasa_params, timeout=10)
+                if nasa_response.status_code == 200:
+                    nasa_data = nasa_response.json()
+                    if 'properties' in nasa_data and 'parameter' in nasa_data['properties']:
+                        t2m_data = nasa_data['properties']['parameter'].get('T2M', {})
+                        latest_date = max(t2m_data.keys()) if t2m_data else None
+                        if latest_date:
+                            real_data['temperature_c'] = t2m_data[latest_date]
+                            real_data['temperature_f'] = round(real_data['temperature_c'] * 9/5 + 32, 1)
+            except:
+                real_data['temperature_f'] = 96  # Fallback
+            
+            # Collect results
+            real_data['air_quality'] = future_air.result()
+            real_data['places'] = future_places.result()
+            real_data['elevation'] = future_elevation.result()
+        
+        # Extract key metrics (with fallbacks)
+        baseline_temp = real_data.get('temperature_f', 96)
+        aqi = real_data['air_quality'].get('aqi', 92)
+        pm25 = real_data['air_quality'].get('pm25', 35)
+        
+        # Create BASELINE scenario using real data
+        baseline = {
+            'id': f'{alley_id}-baseline',
+            'name': 'Baseline: Current Conditions',
+            'type': 'baseline',
+            'location': {
+                'name': 'Alley corridor between W 11th & W 12th St, Pico-Union',
+                'address': 'Pico-Union, Los Angeles, CA',
+                'coordinates': coords
+            },
+            'dimensions': {
+                'length': 150,
+                'width': 12,
+                'unit': 'ft'
+            },
+            'phase': 'Planning',
+            'last_updated': datetime.datetime.now().isoformat().split('T')[0],
+            'layers': [],
+            'environmental_data': {
+                'temperature': baseline_temp,
+                'shade_coverage': 0,
+                'air_quality': aqi if isinstance(aqi, (int, float)) else 92,
+                'green_space': 0,
+                'pm25': pm25 if isinstance(pm25, (int, float)) else 35,
+                'water_runoff': 95,
+                'data_source': 'Google Cloud + NASA POWER APIs',
+                'last_sync': datetime.datetime.now().isoformat()
+            },
+            'notes': f'Current alley state with real data from Google Air Quality (AQI: {aqi}, PM2.5: {pm25}) and NASA temperature ({baseline_temp}°F). No green infrastructure, concrete surfaces, poor drainage.'
+        }
+        
+        # Create VISION scenario; its climate and runoff numbers come from the impact simulator
+        vision_layers = ['bioswales', 'rain_gardens', 'native_plants', 'permeable_pavement', 'community_murals']
+        impact = simulate_impact(baseline['dimensions'], vision_layers, baseline['environmental_data'])
+        projected = impact['metrics']
+        vision_aqi = max(50, aqi - 30) if isinstance(aqi, (int, float)) else 62  # Plants improve AQI
+        
+        vision = {
+            'id': f'{alley_id}-vision',
+            'name': 'Vision: Full Green Transformation',
+            'type': 'vision',
+            'location': baseline['location'].copy(),
+            'dimensions': baseline['dimensions'].copy(),
+            'phase': 'Planning',
+            'last_updated': datetime.datetime.now().isoformat().split('T')[0],
+            'layers': vision_layers,
+            'environmental_data': {
+                'temperature': projected['temperature'],
+                'shade_coverage': projected['shade_coverage'],
+                'air_quality': vision_aqi,
+                'green_space': projected['green_space'],
+                'pm25': max(10, pm25 - 20) if isinstance(pm25, (int, float)) else 15,
+                'water_capture': projected['water_capture'],  # gallons/month
+                'water_runoff': projected['water_runoff'],
+                'data_source': 'Green infrastructure impact simulation',
+                'baseline_comparison': {
+                    'temperature_change': impact['deltas']['temperature'],
+                    'shade_increase': impact['deltas']['shade_coverage'],
+                    'aqi_improvement': baseline['environmental_data']['air_quality'] - vision_aqi,
+                    'runoff_reduction': -impact['deltas']['water_runoff']
+                }
+            },
+            'notes': (
+                'Complete transformation: bioswales, rain gardens, native plants, permeable pavement, community murals. '
+                f"Simulated temperature change {impact['deltas']['temperature']}°F, "
+                f"{projected['shade_coverage']}% shade coverage, runoff down to {projected['water_runoff']}%, "
+                f"{projected['water_capture']} gallons of rainwater captured monthly."
+            )
+        }
+        
+        # Save both scenarios efficiently (single write operation per scenario)
+        success_baseline = scenario_repository.save(baseline)
+        success_vision = scenario_repository.save(vision)
+        
+        if success_baseline and success_vision:
+            return jsonify({
+                'success': True,
+                'message': 'Demo scenarios seeded with real data',
+                'scenarios_created': 2,
+                'data_sources': {
+                    'google_air_quality': real_data['air_quality'].get('data_available', False),
+                    'google_places': real_data['places'].get('data_available', False),
+                    'google_elevation': real_data['elevation'].get('data_available', False),
+                    'nasa_temperature': 'temperature_f' in real_data
+                },
+                'scenarios': [baseline['id'], vision['id']]
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'Failed to save scenarios'
+            }), 500
+            
+    except Exception as e:
+        print(f"Error seeding scenarios: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to seed scenarios with real data'
+        }), 500
+
+@data_bp.route('/api/live-data/<alley_id>', methods=['GET'])
+def get_live_data(alley_id):
+    """Get live data for specific alley - NOW WITH REAL GOOGLE DATA"""
+    import random
+    import datetime
+    
+    # Get coordinates for the alley
+    coords = PICO_UNION_COORDS.get(alley_id, PICO_UNION_COORDS['default'])
+    
+    # Get real air quality from Google
+    air_quality = get_google_air_quality(coords['lat'], coords['lng'])
+    
+    # Get real community activity from Google Places
+    activity_data = get_google_places_activity(coords['lat'], coords['lng'])
+    
+    # Combine real and calculated data
+    if alley_id == 'all':
+        data = {
+            'temperature': air_quality.get('temperature', 75),
+            'air_quality_index': air_quality.get('aqi', 'N/A'),
+            'pm25': air_quality.get('pm25', 'N/A'),
+            'water_captured_today': random.randint(10, 20),  # TODO: Calculate from real rainfall
+            'shade_coverage': 45 + random.uniform(-3, 3),
+            'active_users': activity_data.get('activity_level', 5),
+            'nearby_businesses': activity_data.get('business_count', 0),
+            'timestamp': datetime.datetime.now().isoformat(),
+            'data_source': 'Google Cloud APIs'
+        }
+    else:
+        scenario = scenario_repository.get(f"{alley_id}-baseline")
+        if scenario and scenario.get('environmental_data'):
+            env = scenario['environmental_data']
+            
+            # Values may be plain numbers or {value, unit} objects
+            temperature = metric_value(env.get('temperature'), 95)
+            shade_coverage = metric_value(env.get('shade_coverage'), 10)
+            
+            data = {
+                'temperature': temperature,
+                'air_quality_index': air_quality.get('aqi', 'N/A'),
+                'pm25': air_quality.get('pm25', 'N/A'),
+                'water_captured_today': random.randint(5, 15),
+                'shade_coverage': shade_coverage + random.uniform(-2, 2),
+                'active_users': activity_data.get('activity_level', 3),
+                'nearby_businesses': activity_data.get('business_count', 0),
+                'timestamp': datetime.datetime.now().isoformat(),
+                'data_source': 'Google Cloud APIs'
+            }
+        else:
+            data = {'error': 'Alley not found'}
+    
+    return jsonify(data)
+
+@data_bp.route('/api/google-data/<alley_id>', methods=['GET'])
+def get_google_data(alley_id):
+    """
+    NEW ENDPOINT: Get comprehensive Google Cloud data for an alley
+    Demonstrates real API integration
+    """
+    import datetime
+    
+    # Get coordinates
+    coords = PICO_UNION_COORDS.get(alley_id, PICO_UNION_COORDS['default'])
+    
+    # Fetch all Google data
+    air_quality = get_google_air_quality(coords['lat'], coords['lng'])
+    places = get_google_places_activity(coords['lat'], coords['lng'])
+    elevation = get_google_elevation(coords['lat'], coords['lng'])
+    
+    # Compile comprehensive data
+    response = {
+        'alley_id': alley_id,
+        'location': {
+            'latitude': coords['lat'],
+            'longitude': coords['lng'],
+            'neighborhood': 'Pico-Union, Los Angeles'
+        },
+        'air_quality': {
+            'aqi': air_quality.get('aqi', 'N/A'),
+            'pm25': air_quality.get('pm25', 'N/A'),
+            'source': 'Google Air Quality API',
+            'available': air_quality.get('data_available', False)
+        },
+        'community_activity': {
+            'nearby_businesses': places.get('business_count', 0),
+            'activity_level': places.get('activity_level', 0),
+            'place_types': places.get('place_types', {}),
+            'source': 'Google Places API',
+            'available': places.get('data_available', False)
+        },
+        'terrain': {
+            'elevation_meters': elevation.get('elevation', 0),
+            'slope_percent': elevation.get('slope_percent', 0),
+            'source': 'Google Elevation API',
+            'available': elevation.get('data_available', False)
+        },
+        'timestamp': datetime.datetime.now().isoformat(),
+        'data_sources': 'Google Cloud Platform APIs'
+    }
+    
+    return jsonify(response)
+
+# NEW: Export to Unreal - File-Based Integration
+@data_bp.route('/api/update-digital-twin', methods=['POST'])
+@data_bp.route('/api/export-to-unreal', methods=['POST'])  # Legacy endpoint
+def update_digital_twin():
+    """
+    Update Digital Twin - Export design to Unreal Engine via shared folder.
+    Saves JSON with mural data + PNG files.
+    """
+    try:
+        data = request.get_json()
+        
+        # Extract design data
+        project_name = data.get('project_name', 'alley_design')
+        alley_id = data.get('alley_id', 'unknown')
+        murals = data.get('murals', [])
+        
+        # Create export folder (cross-platform)
+        export_base = os.environ.get('PUHC_EXPORT_PATH', os.path.join(os.path.expanduser('~'), 'PUHC_Exports'))
+        export_folder = export_base
+        os.makedirs(export_folder, exist_ok=True)
+        
+        # Generate timestamp for unique export
+        from datetime import datetime
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        export_name = f"{project_name}_{timestamp}"
+        
+        # Process murals and save images
+        processed_murals = []
+        for idx, mural in enumerate(murals):
+            mural_id = f"mural_{idx+1:03d}"
+            
+            # Save image if base64 data provided
+            if 'imageData' in mural:
+                image_data = mural['imageData']
+                # Remove data URL prefix if present
+                if ',' in image_data:
+                    image_data = image_data.split(',')[1]
+                
+                # Decode and save image
+                import base64
+                image_bytes = base64.b64decode(image_data)
+                image_path = os.path.join(export_folder, f"{export_name}_{mural_id}.png")
+                
+                with open(image_path, 'wb') as f:
+                    f.write(image_bytes)
+            
+            # Build mural metadata for Unreal
+            processed_mural = {
+                'id': mural_id,
+                'filename': f"{export_name}_{mural_id}.png",
+                'position': {
+                    'x': float(mural.get('x', 0)) / 10,  # Convert pixels to Unreal units
+                    'y': float(mural.get('y', 0)) / 10,
+                    'z': 0.0
+                },
+                'rotation': {
+                    'pitch': 0.0,
+                    'yaw': float(mural.get('rotation', 0)),
+                    'roll': 0.0
+                },
+                'scale': {
+                    'width': float(mural.get('width', 100)) / 100,  # Convert to meters
+                    'height': float(mural.get('height', 100)) / 100,
+                    'depth': 0.1
+                },
+                'material_properties': {
+                    'opacity': float(mural.get('opacity', 1.0)),
+                    'blend_mode': 'translucent' if mural.get('opacity', 1.0) < 1.0 else 'opaque',
+                    'emissive': False
+                }
+            }
+            processed_murals.append(processed_mural)
+        
+        # Create JSON export
+        export_data = {
+            'project_info': {
+                'name': project_name,
+                'export_date': datetime.now().isoformat(),
+                'designer': 'Community Member',
+                'alley_id': alley_id
+            },
+            'scenario': 'vision',
+            'murals': processed_murals,
+            'metadata': {
+                'total_murals': len(processed_murals),
+                'export_version': '1.0',
+                'coordinate_system': 'unreal_units'
+            }
+        }
+        
+        # Save JSON file
+        json_path = os.path.join(export_folder, f"{export_name}.json")
+        with open(json_path, 'w') as f:
+            json.dump(export_data, f, indent=2)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Exported {len(processed_murals)} murals to Unreal',
+            'export_folder': export_folder,
+            'json_file': f"{export_name}.json",
+            'files_created': len(processed_murals) + 1
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Export failed: {str(e)}'
+        }), 500
+
+# NEW: PNG Conversion API for Unreal Integration
+@data_bp.route('/api/convert-to-png', methods=['POST'])
+def convert_to_png():
+    """
+    Convert uploaded image to PNG with transparency support.
+    Accepts: JPG, JPEG, PNG, WebP
+    Returns: PNG file with preserved/added transparency
+    """
+    from PIL import Image
+    try:
+        # Check if file was uploaded
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file uploaded'}), 400
+        
+        file = request.files['file']
+        
+        # Check if filename is empty
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        # Check file extension
+        allowed_extensions = {'png', 'jpg', 'jpeg', 'webp'}
+        file_ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
+        
+        if file_ext not in allowed_extensions:
+            return jsonify({'error': f'File type not supported. Allowed: {", ".join(allowed_extensions)}'}), 400
+        
+        # Open image with PIL
+        image = Image.open(file.stream)
+        
+        # Convert to RGBA (supports transparency)
+        if image.mode != 'RGBA':
+            # If image has transparency info, preserve it
+            if image.mode == 'P' and 'transparency' in image.info:
+                image = image.convert('RGBA')
+            else:
+                # Convert to RGBA and add white background
+                rgba_image = Image.new('RGBA', image.size, (255, 255, 255, 255))
+                if image.mode == 'RGB':
+                    rgba_image.paste(image, (0, 0))
+                else:
+                    rgba_image.paste(image.convert('RGB'), (0, 0))
+                image = rgba_image
+        
+        # Save to bytes buffer
+        img_io = io.BytesIO()
+        image.save(img_io, 'PNG', optimize=True)
+        img_io.seek(0)
+        
+        # Generate output filename
+        original_name = secure_filename(file.filename.rsplit('.', 1)[0])
+        output_filename = f'{original_name}.png'
+        
+        return send_file(
+            img_io,
+            mimetype='image/png',
+            as_attachment=True,
+            download_name=output_filename
+        )
+    
+    except Exception as e:
+        return jsonify({'error': f'Image conversion failed: {str(e)}'}), 500
+
+# ============================================================================
+# AUTHENTICATION ENDPOINTS - Phase 3
+# ============================================================================
+
+@data_bp.route('/api/auth/register', methods=['POST'])
+def register():
+    """Register a new user"""
+    try:
+        data = request.get_json()
+        username = data.get('username', '').strip()
+        email = data.get('email', '').strip()
+        password = data.get('password', '')
+        full_name = data.get('full_name', '')
+        
+        # Validation
+        if not username or not email or not password:
+            return jsonify({'error': 'Missing required fields'}), 400
+        
+        if len(password) < 6:
+            return jsonify({'error': 'Password must be at least 6 characters'}), 400
+        
+        # Check if user exists
+        if User.query.filter_by(username=username).first():
+            return jsonify({'error': 'Username already exists'}), 409
+        
+        if User.query.filter_by(email=email).first():
+            return jsonify({'error': 'Email already exists'}), 409
+        
+        # Create user
+        user = User(
+            username=username,
+            email=email,
+            password_hash=generate_password_hash(password),
+            full_name=full_name,
+            role='user'
+        )
+        db.session.add(user)
+        db.session.commit()
+        
+        session['user_id'] = user.id
+        session['username'] = user.username
+        
+        return jsonify({
+            'success': True,
+            'message': 'Registration successful',
+            'user': user.to_dict()
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        print(f"Registration error: {e}")
+        return jsonify({'error': 'Registration failed'}), 500
+
+@data_bp.route('/api/auth/login', methods=['POST'])
+def login():
+    """Login user"""
+    try:
+        data = request.get_json()
+        username = data.get('username', '').strip()
+        password = data.get('password', '')
+        
+        if not username or not password:
+            return jsonify({'error': 'Missing username or password'}), 400
+        
+        user = User.query.filter_by(username=username).first()
+        
+        if not user or not check_password_hash(user.password_hash, password):
+            return jsonify({'error': 'Invalid username or password'}), 401
+        
+        if not user.is_active:
+            return jsonify({'error': 'Account is disabled'}), 403
+        
+        session['user_id'] = user.id
+        session['username'] = user.username
+        
+        return jsonify({
+            'success': True,
+            'message': 'Login successful',
+            'user': user.to_dict()
+        }), 200
+    
+    except Exception as e:
+        print(f"Login error: {e}")
+        return jsonify({'error': 'Login failed'}), 500
+
+@data_bp.route('/api/auth/logout', methods=['POST'])
+def logout():
+    """Logout user"""
+    session.clear()
+    return jsonify({'success': True, 'message': 'Logged out'}), 200
+
+@data_bp.route('/api/auth/me', methods=['GET'])
+@login_required
+def get_current_user():
+    """Get current user info"""
+    user = User.query.get(session.get('user_id'))
+    if user:
+        return jsonify(user.to_dict()), 200
+    return jsonify({'error': 'User not found'}), 404
+
+# ============================================================================
+# DATABASE PERSISTENCE ENDPOINTS - Phase 3
+# ============================================================================
+
+@data_bp.route('/api/scenarios/db', methods=['GET'])
+def get_scenarios_db():
+    """
+    Get scenarios from database, one page at a time
+    Query args: limit, cursor, view=summary|full or fields=a,b,c,
+    and filters alley_id, type, phase, is_public, created_by.
+    """
+    try:
+        page = list_scenarios(request.args)
+        return jsonify({'success': True, **page}), 200
+    except ListingError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error fetching scenarios: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/db', methods=['POST'])
+def create_scenario_db():
+    """Create or update scenario in database"""
+    try:
+        data = request.get_json()
+        scenario_id = data.get('id')
+        
+        if not scenario_id:
+            return jsonify({'error': 'Scenario ID required'}), 400
+        
+        # Check if exists
+        scenario = Scenario.query.get(scenario_id)
+        
+        if scenario:
+            # Update existing
+            before = scenario_history.state_of(scenario)
+            scenario.name = data.get('name', scenario.name)
+            scenario.description = data.get('description', scenario.description)
+            scenario.type = data.get('type', scenario.type)
+            scenario.location = data.get('location', scenario.location)
+            scenario.dimensions = data.get('dimensions', scenario.dimensions)
+            scenario.phase = data.get('phase', scenario.phase)
+            scenario.layers = data.get('layers', scenario.layers)
+            scenario.environmental_data = data.get('environmental_data', scenario.environmental_data)
+            scenario.notes = data.get('notes', scenario.notes)
+            scenario_history.record_edit(scenario, before, data.get('change_description'), session.get('user_id'))
+        else:
+            # Create new
+            scenario = Scenario(
+                id=scenario_id,
+                name=data.get('name', 'Untitled Scenario'),
+                description=data.get('description', ''),
+                type=data.get('type', 'baseline'),
+                alley_id=data.get('alley_id', 'unknown'),
+                location=data.get('location'),
+                dimensions=data.get('dimensions'),
+                phase=data.get('phase', 'Planning'),
+                layers=data.get('layers', []),
+                environmental_data=data.get('environmental_data'),
+                notes=data.get('notes', ''),
+                created_by=session.get('user_id'),
+                is_public=data.get('is_public', False),
+                version=1
+            )
+            scenario_history.record_initial(scenario, user_id=session.get('user_id'))
+        
+        db.session.add(scenario)
+        db.session.commit()
+        scenario_repository.invalidate(scenario.id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Scenario saved',
+            'scenario': scenario.to_dict()
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saving scenario: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/metrics', methods=['GET'])
+def get_scenarios_by_metrics():
+    """
+    Filter and sort scenarios on environmental metrics in SQL
+    Query args: <metric>_min, <metric>_max, sort=<metric> or -<metric>, limit, offset,
+    plus the /api/scenarios/db filters. Metrics: temperature, shade_coverage,
+    air_quality, pm25, green_space, water_runoff.
+    """
+    try:
+        return jsonify({'success': True, **query_by_metrics(request.args)}), 200
+    except ListingError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error querying scenario metrics: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/db/<scenario_id>/versions', methods=['GET'])
+def get_scenario_versions(scenario_id):
+    """List a scenario's stored versions"""
+    try:
+        scenario = Scenario.query.get(scenario_id)
+        if not scenario:
+            return jsonify({'error': 'Scenario not found'}), 404
+        return jsonify({
+            'success': True,
+            'current_version': scenario.version,
+            'versions': scenario_history.versions(scenario_id)
+        }), 200
+    except Exception as e:
+        print(f"Error fetching versions: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/db/<scenario_id>/versions/<int:version_number>', methods=['GET'])
+def get_scenario_version(scenario_id, version_number):
+    """Rebuild one version of a scenario"""
+    try:
+        state = scenario_history.state_at(scenario_id, version_number)
+        if state is None:
+            return jsonify({'error': 'Version not found'}), 404
+        return jsonify({
+            'success': True,
+            'scenario_id': scenario_id,
+            'version_number': version_number,
+            'scenario': state
+        }), 200
+    except Exception as e:
+        print(f"Error rebuilding version: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/db/<scenario_id>/diff', methods=['GET'])
+def diff_scenario_versions(scenario_id):
+    """Diff two versions (?from=&to=, defaulting to the previous and current version)"""
+    try:
+        scenario = Scenario.query.get(scenario_id)
+        if not scenario:
+            return jsonify({'error': 'Scenario not found'}), 404
+        to_version = request.args.get('to', scenario.version, type=int)
+        from_version = request.args.get('from', to_version - 1, type=int)
+        old = scenario_history.state_at(scenario_id, from_version)
+        new = scenario_history.state_at(scenario_id, to_version)
+        if old is None or new is None:
+            return jsonify({'error': 'Version not found'}), 404
+        return jsonify({
+            'success': True,
+            'from': from_version,
+            'to': to_version,
+            'ops': diff_states(old, new)
+        }), 200
+    except Exception as e:
+        print(f"Error diffing versions: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/db/<scenario_id>/undo', methods=['POST'])
+def undo_scenario(scenario_id):
+    """Restore the previous version"""
+    return _step_scenario_history(scenario_id, scenario_history.undo, 'Nothing to undo')
+
+@data_bp.route('/api/scenarios/db/<scenario_id>/redo', methods=['POST'])
+def redo_scenario(scenario_id):
+    """Re-apply a version removed by undo"""
+    return _step_scenario_history(scenario_id, scenario_history.redo, 'Nothing to redo')
+
+def _step_scenario_history(scenario_id, step, empty_message):
+    try:
+        scenario = Scenario.query.get(scenario_id)
+        if not scenario:
+            return jsonify({'error': 'Scenario not found'}), 404
+        if not step(scenario):
+            return jsonify({'error': empty_message}), 409
+        db.session.commit()
+        scenario_repository.invalidate(scenario_id)
+        return jsonify({
+            'success': True,
+            'scenario': scenario.to_dict()
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error moving through history: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/migrate-json', methods=['POST'])
+def migrate_json_scenarios():
+    """Copy data/scenarios.json into the database (once; existing rows are skipped). Localhost only."""
+    if not is_edit_allowed():
+        return jsonify({'error': 'Migration is only available on localhost'}), 403
+    try:
+        report = scenario_repository.migrate_json_to_db(user_id=session.get('user_id'))
+        print(f"[Scenarios] Migrated {report['inserted']} JSON scenarios to the database "
+              f"({report['skipped']} already there)")
+        return jsonify({'success': report['error_count'] == 0, **report}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Migration error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/db/<scenario_id>', methods=['DELETE'])
+def delete_scenario_db(scenario_id):
+    """Delete scenario from database"""
+    try:
+        scenario = Scenario.query.get(scenario_id)
+        
+        if not scenario:
+            return jsonify({'error': 'Scenario not found'}), 404
+        
+        db.session.delete(scenario)
+        db.session.commit()
+        scenario_repository.invalidate(scenario_id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Scenario deleted'
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error deleting scenario: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# ============================================================================
+# EXPORT/IMPORT ENDPOINTS - Phase 3
+# ============================================================================
+
+@data_bp.route('/api/scenarios/export/<scenario_id>/<export_type>', methods=['GET'])
+def export_scenario(scenario_id, export_type):
+    """Export scenario in various formats"""
+    try:
+        scenario = Scenario.query.get(scenario_id)
+        
+        if not scenario:
+            return jsonify({'error': 'Scenario not found'}), 404
+        
+        if export_type == 'json':
+            # Export as JSON
+            return jsonify(scenario.to_dict()), 200
+        
+        elif export_type == 'csv':
+            # Export environmental data as CSV
+            import csv
+            from io import StringIO
+            
+            output = StringIO()
+            writer = csv.writer(output)
+            
+            # Write headers
+            writer.writerow(['Metric', 'Value', 'Unit'])
+            
+            # Write data
+            env_data = scenario.environmental_data or {}
+            for key, value in env_data.items():
+                if isinstance(value, dict):
+                    writer.writerow([key, value.get('value', ''), value.get('unit', '')])
+                else:
+                    writer.writerow([key, value, ''])
+            
+            output.seek(0)
+            return output.getvalue(), 200, {'Content-Type': 'text/csv'}
+        
+        else:
+            return jsonify({'error': 'Unsupported export format'}), 400
+    
+    except Exception as e:
+        print(f"Export error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/export/bulk', methods=['GET'])
+def export_scenarios_bulk():
+    """
+    Stream every matching scenario as NDJSON (default) or CSV (?format=csv)
+    Accepts the same filters as /api/scenarios/db.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unsupported export format'}), 400
+    try:
+        # Validate filters before the response starts streaming
+        filter_scenarios(Scenario.query, request.args)
+    except ListingError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    args = request.args.to_dict()
+    if export_format == 'csv':
+        body, mimetype = export_csv(args), 'text/csv'
+    else:
+        body, mimetype = export_ndjson(args), 'application/x-ndjson'
+    filename = f"scenarios_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}'
+    })
+
+@data_bp.route('/api/scenarios/import/bulk', methods=['POST'])
+def import_scenarios_bulk():
+    """Upsert scenarios from an NDJSON body (one scenario per line) in batches"""
+    try:
+        report = BulkImport(user_id=session.get('user_id')).run(request.stream)
+        scenario_repository.invalidate()
+        print(f"[Bulk Import] {report['inserted']} inserted, {report['updated']} updated, "
+              f"{report['error_count']} errors")
+        return jsonify({'success': report['error_count'] == 0, **report}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Bulk import error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/import', methods=['POST'])
+def import_scenario():
+    """Import scenario from JSON"""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        # Create scenario from imported data
+        scenario = Scenario(
+            id=data.get('id', f"imported_{datetime.utcnow().timestamp()}"),
+            name=data.get('name', 'Imported Scenario'),
+            description=data.get('description', ''),
+            type=data.get('type', 'baseline'),
+            alley_id=data.get('alley_id', 'unknown'),
+            location=data.get('location'),
+            dimensions=data.get('dimensions'),
+            phase=data.get('phase', 'Planning'),
+            layers=data.get('layers', []),
+            environmental_data=data.get('environmental_data'),
+            notes=data.get('notes', ''),
+            created_by=session.get('user_id'),
+            is_public=data.get('is_public', False),
+            version=1
+        )
+        scenario_history.record_initial(scenario, 'Imported', session.get('user_id'))
+        
+        db.session.add(scenario)
+        db.session.commit()
+        scenario_repository.invalidate(scenario.id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Scenario imported',
+            'scenario': scenario.to_dict()
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        print(f"Import error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/save-design', methods=['POST'])
+def save_design():
+    """Save mural design to backend"""
+    try:
+        data = request.json
+        alley = data.get('alley', 'unknown')
+        murals = data.get('murals', [])
+        timestamp = data.get('timestamp', datetime.utcnow().isoformat())
+        
+        # Save design data
+        design_data = {
+            'alley': alley,
+            'murals': murals,
+            'timestamp': timestamp,
+            'count': len(murals)
+        }
+        
+        # Store in data folder
+        import os
+        data_folder = os.path.join(os.path.dirname(__file__), 'data')
+        os.makedirs(data_folder, exist_ok=True)
+        
+        designs_file = os.path.join(data_folder, 'designs.json')
+        designs = []
+        
+        if os.path.exists(designs_file):
+            with open(designs_file, 'r') as f:
+                designs = json.load(f)
+        
+        designs.append(design_data)
+        
+        with open(designs_file, 'w') as f:
+            json.dump(designs, f, indent=2)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Design saved with {len(murals)} murals',
+            'design': design_data
+        })
+    except Exception as e:
+        print(f"Error saving design: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@data_bp.route('/api/scenario-detail/<scenario_id>')
+def get_scenario_detail(scenario_id):
+    """Get scenario data by ID for visualization studio"""
+    try:
+        # Database first, then the JSON file, through the shared cache
+        scenario_data = scenario_repository.get(scenario_id)
+        if scenario_data:
+            return jsonify(scenario_data)
+        
+        return jsonify({'error': 'Scenario not found'}), 404
+    except Exception as e:
+        print(f"Error fetching scenario: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/save-view', methods=['POST'])
+def save_view():
+    """Save Street View visualization state"""
+    try:
+        data = request.json
+        scenario_id = data.get('scenario_id', 'default')
+        alley_id = data.get('alley_id')
+        viewpoint_id = data.get('viewpoint_id', 'start')
+        camera = data.get('camera', {})
+        overlays = data.get('overlays', {})
+        timestamp = data.get('timestamp', datetime.utcnow().isoformat())
+        
+        # Create view data structure
+        view_data = {
+            'scenario_id': scenario_id,
+            'alley_id': alley_id,
+            'viewpoint_id': viewpoint_id,
+            'camera': {
+                'heading': camera.get('heading', 0),
+                'pitch': camera.get('pitch', 0),
+                'zoom': camera.get('zoom', 1)
+            },
+            'overlays': {
+                'murals': overlays.get('murals', True),
+                'greenery': overlays.get('greenery', True),
+                'lighting': overlays.get('lighting', True),
+                'street_furniture': overlays.get('street_furniture', True),
+                'opacity': overlays.get('opacity', 1)
+            },
+            'timestamp': timestamp
+        }
+        
+        # Store in data folder
+        import os
+        data_folder = os.path.join(os.path.dirname(__file__), 'data')
+        os.makedirs(data_folder, exist_ok=True)
+        
+        views_file = os.path.join(data_folder, 'views.json')
+        views = []
+        
+        if os.path.exists(views_file):
+            with open(views_file, 'r') as f:
+                views = json.load(f)
+        
+        views.append(view_data)
+        
+        with open(views_file, 'w') as f:
+            json.dump(views, f, indent=2)
+        
+        return jsonify({
+            'success': True,
+            'message': 'View saved successfully',
+            'view': view_data
+        })
+    except Exception as e:
+        print(f"Error saving view: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/comparison')
+def get_scenario_comparison():
+    """Get comparison data for Before & After page"""
+    try:
+        alley_id = request.args.get('alley_id', 'alley3')
+        
+        # Get baseline and concept scenarios
+        baseline = scenario_repository.get(f'baseline-{alley_id}')
+        concepts = [
+            scenario_repository.get(f'concept-a-{alley_id}'),
+            scenario_repository.get(f'concept-b-{alley_id}')
+        ]
+        
+        return jsonify({
+            'alley_id': alley_id,
+            'baseline': baseline or {},
+            'concepts': [c for c in concepts if c]
+        })
+    except Exception as e:
+        print(f"Error fetching comparison: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/ranking')
+def rank_scenarios():
+    """
+    Rank scenarios for one or more alleys by weighted benefit over each alley's baseline
+    Query args: alley_id (comma-separated, default all), weights=metric:weight,...
+    (default cooling 0.5, runoff 0.3, AQI 0.2), top=N, include=pairwise,baselines
+    """
+    from comparison_engine import ScenarioComparison, parse_weights, scenario_alley
+    try:
+        weights = parse_weights(request.args.get('weights'))
+        top = request.args.get('top', type=int)
+        if top is not None and top < 1:
+            raise ValueError('top must be at least 1')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    include = set(request.args.get('include', '').split(','))
+    alley_ids = {a for a in request.args.get('alley_id', '').split(',') if a}
+    
+    try:
+        scenarios = [
+            s for s in scenario_repository.list()
+            if not alley_ids or scenario_alley(s) in alley_ids
+        ]
+        comparison = ScenarioComparison(scenarios)
+        result = {
+            'alley_ids': list(comparison.alleys),
+            'weights': weights,
+            'count': len(comparison.ids),
+            'ranking': comparison.rank(weights, top=top, include_baselines='baselines' in include)
+        }
+        if 'pairwise' in include:
+            result['scenario_ids'] = comparison.ids
+            result['pairwise_deltas'] = comparison.pairwise_report()
+        return jsonify(result)
+    except Exception as e:
+        print(f"Error ranking scenarios: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/simulate', methods=['POST'])
+def simulate_scenario_impact():
+    """
+    Simulate shade, surface temperature and runoff for an alley design
+    Body: scenario_id and/or dimensions, layers, environmental_data (the
+    scenario's values are used for anything not given); fields=true adds
+    the per-cell grids.
+    """
+    from impact_model import simulate as simulate_impact
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        scenario = {}
+        if data.get('scenario_id'):
+            scenario = scenario_repository.get(data['scenario_id'])
+            if scenario is None:
+                return jsonify({'error': 'Scenario not found'}), 404
+        
+        start = time.perf_counter()
+        result = simulate_impact(
+            data.get('dimensions') or scenario.get('dimensions'),
+            data.get('layers', scenario.get('layers', [])),
+            data.get('environmental_data') or scenario.get('environmental_data'),
+            include_fields=bool(data.get('fields'))
+        )
+        result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        if scenario:
+            result['scenario_id'] = scenario['id']
+        return jsonify(result)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid design: {e}'}), 400
+    except Exception as e:
+        print(f"Error simulating scenario impact: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@data_bp.route('/api/scenarios/sweep', methods=['POST'])
+def sweep_scenario_parameters():
+    """
+    Run the impact model over every combination of parameter values and stream NDJSON results
+    Body: scenario_id (or alley_id, dimensions, layers, environmental_data),
+    parameters {name: [values] | {start, stop, step}}, objectives (default
+    temperature, water_runoff, shade_coverage), persist (default true) to save
+    the Pareto-optimal designs as scenarios
+    """
+    from comparison_engine import scenario_alley
+    from parameter_sweep import (parameter_sweep, SweepError, parse_parameters as parse_sweep_parameters,
+                                 parse_objectives as parse_sweep_objectives)
+    from impact_model import check_design
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        scenario = {}
+        if data.get('scenario_id'):
+            scenario = scenario_repository.get(data['scenario_id'])
+            if scenario is None:
+                return jsonify({'error': 'Scenario not found'}), 404
+        parameters = parse_sweep_parameters(data.get('parameters'))
+        objectives = parse_sweep_objectives(data.get('objectives'))
+    except SweepError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error preparing sweep: {e}")
+        return jsonify({'error': str(e)}), 500
+    
+    base = {
+        'name': scenario.get('name', 'Sweep design'),
+        'alley_id': data.get('alley_id') or (scenario_alley(scenario) if scenario else 'unknown'),
+        'location': scenario.get('location'),
+        'dimensions': data.get('dimensions') or scenario.get('dimensions'),
+        'layers': data.get('layers', scenario.get('layers', [])),
+        'environmental_data': data.get('environmental_data') or scenario.get('environmental_data')
+    }
+    try:
+        check_design(base['dimensions'], base['layers'])
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid design: {e}'}), 400
+    # The sweep streams for seconds; don't hold a pooled connection (SQLite has one under eventlet)
+    db.session.close()
+    
+    def generate():
+        yield from parameter_sweep.stream(
+            base, parameters, objectives,
+            persist=data.get('persist', True) is not False,
+            user_id=session.get('user_id')
+        )
+        scenario_repository.invalidate()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@data_bp.route('/api/db/metrics')
+def database_metrics():
+    """Connection pool checkout waits and usage for this worker"""
+    return jsonify({
+        'success': True,
+        'backend': db.engine.url.get_backend_name(),
+        'pool': pool_metrics.report()
+    })
+
+@data_bp.route('/api/startup/metrics')
+def startup_metrics():
+    """Import cost per package and create_app time of this worker's cold start"""
+    return jsonify(current_app.extensions.get('startup_report', {}))
@@ -0,0 +1,175 @@
+"""
+Database engine profile
+SQLite gets WAL journaling, a busy timeout, a larger statement cache and a
+small pool. Under eventlet (the gunicorn worker class) that pool holds a
+single connection: sqlite3 calls are not green, so a busy_timeout wait
+blocks the whole hub, and greenlets have to queue on the pool, which does
+yield, rather than on SQLite's file lock. Any other DATABASE_URL (PostgreSQL in production) gets
+a conventional server pool with pre-ping and recycling. A metered pool
+records how long each checkout waited.
+"""
+import os
+import sys
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_SYNCHRONOUS = os.environ.get('DB_SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_STATEMENT_CACHE = int(os.environ.get('DB_STATEMENT_CACHE', '256'))
+QUERY_CACHE_SIZE = int(os.environ.get('DB_QUERY_CACHE_SIZE', '1200'))
+SLOW_CHECKOUT = float(os.environ.get('DB_SLOW_CHECKOUT', '0.1'))  # seconds
+
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+class PoolMetrics:
+    """Checkout wait times for the metered pool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pool = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.slow_checkouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record(self, waited, timed_out=False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_total += waited
+            if waited > self.wait_max:
+                self.wait_max = waited
+            if waited >= SLOW_CHECKOUT:
+                self.slow_checkouts += 1
+
+    def report(self):
+        with self.lock:
+            report = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'slow_checkouts': self.slow_checkouts,
+                'slow_checkout_threshold_ms': SLOW_CHECKOUT * 1000,
+                'wait_avg_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3)
+            }
+        pool = self.pool
+        if pool is not None:
+            report.update({
+                'pool_size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'overflow': max(pool.overflow(), 0),
+                'idle': pool.checkedin()
+            })
+        return report
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waited for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_metrics.pool = self
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record(time.perf_counter() - start)
+        return connection
+
+
+def green_threads():
+    """True when eventlet has monkey-patched threading, as gunicorn's eventlet worker does"""
+    eventlet = sys.modules.get('eventlet')
+    return eventlet is not None and eventlet.patcher.is_monkey_patched('thread')
+
+
+def _sqlite_pool_size():
+    pool_size = int(os.environ.get('DB_POOL_SIZE', '8'))
+    if green_threads() and pool_size != 1:
+        if 'DB_POOL_SIZE' in os.environ:
+            print(f"[Database] DB_POOL_SIZE={pool_size} ignored: SQLite under eventlet uses one connection")
+        return 1
+    return pool_size
+
+
+def _is_memory_sqlite(url):
+    return url.database in (None, '', ':memory:') or (url.query or {}).get('mode') == 'memory'
+
+
+def engine_options(database_url):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database"""
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite':
+        if _is_memory_sqlite(url):
+            # One shared connection, or every checkout would see an empty database
+            return {
+                'poolclass': StaticPool,
+                'connect_args': {'check_same_thread': False}
+            }
+        return {
+            'poolclass': MeteredQueuePool,
+            # One connection under eventlet so greenlets wait on the pool, not on the file lock
+            'pool_size': _sqlite_pool_size(),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '0')),
+            'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+            'query_cache_size': QUERY_CACHE_SIZE,
+            'connect_args': {
+                'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+                'check_same_thread': False,
+                'cached_statements': SQLITE_STATEMENT_CACHE
+            }
+        }
+    return {
+        'poolclass': MeteredQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+        'query_cache_size': QUERY_CACHE_SIZE
+    }
+
+
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """Per-connection SQLite pragmas; other databases are left alone"""
+    if type(dbapi_connection).__module__.split('.')[0] not in ('sqlite3', 'pysqlite2'):
+        return
+    synchronous = SQLITE_SYNCHRONOUS.upper()
+    if synchronous not in SYNCHRONOUS_MODES:
+        synchronous = 'NORMAL'
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+    finally:
+        cursor.close()
+
+
+def apply_profile(app):
+    """Set the engine options for app.config['SQLALCHEMY_DATABASE_URI'] before db.init_app"""
+    options = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    return options
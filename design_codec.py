@@ -0,0 +1,229 @@
+"""
+Compact binary wire format for co-design collaboration events
+Clients opt in when they connect; everyone else keeps receiving JSON.
+
+Frame layout (little-endian):
+    header   version:u8  kind:u8  clock:u32
+    stamp    counter:u32  replica_len:u8  replica:bytes     (item/remove frames)
+    record   short_id:u32  mask:u8  fields...  [extras_len:u32 extras:json]
+
+Snapshots carry every field's stamp, so binary clients merge them the
+way JSON clients merge the 'stamps' map:
+    snapshot header  flags:u8 (1 = reset)
+             tables  replicas:u16 (len:u8 bytes)...  names:u16 (len:u16 bytes)...
+             items   count:u32, per item: record  stamps:u16 (name:u16 counter:u32 replica:u16)...
+             removed count:u32  short_id:u32...
+
+Known numeric fields are quantized into fixed-width integers. Anything
+else (type, subtype, blendMode, customImage, the full item id) rides along
+as compact JSON in the extras block. A short_id of 0 means the full id is
+in extras, which is how clients refer to items they have no short id for.
+
+Binary is server-side only for now: the bundled pages use JSON.
+static/js/design-codec.js is a reference codec for clients that opt in;
+it decodes every frame kind and encodes item frames. Senders apply
+DesignCodec.canonical(item) locally so they keep the quantized values
+the server and peers store.
+"""
+import json
+import struct
+
+WIRE_JSON = 'json'
+WIRE_BINARY = 'binary'
+SUPPORTED_WIRES = (WIRE_JSON, WIRE_BINARY)
+
+VERSION = 2
+
+KIND_ITEM = 1
+KIND_REMOVE = 2
+KIND_SNAPSHOT = 3
+
+SNAPSHOT_RESET = 0x01
+
+# (field, struct code, scale) in mask-bit order
+FIELDS = [
+    ('x', 'i', 10),
+    ('y', 'i', 10),
+    ('width', 'i', 10),
+    ('height', 'i', 10),
+    ('rotation', 'h', 100),
+    ('zIndex', 'h', 1),
+    ('opacity', 'B', 255),
+]
+EXTRAS_BIT = 0x80
+
+HEADER = struct.Struct('<BBI')
+STAMP = struct.Struct('<IB')
+RECORD = struct.Struct('<IB')
+COUNT = struct.Struct('<I')
+SHORT = struct.Struct('<H')
+FIELD_STAMP = struct.Struct('<HIH')
+STAMP_REPLICA_LEN = struct.Struct('<B')
+EXTRAS_LEN = struct.Struct('<I')
+FIELD_STRUCTS = [struct.Struct('<' + code) for _, code, _ in FIELDS]
+
+
+class CodecError(ValueError):
+    """Raised when a binary frame cannot be decoded"""
+
+
+def negotiate_wire(auth):
+    """Pick the wire format a client asked for in its connect auth payload"""
+    if isinstance(auth, dict) and auth.get('wire') in SUPPORTED_WIRES:
+        return auth['wire']
+    return WIRE_JSON
+
+
+def _quantize(field, value, scale):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if field == 'rotation':
+        value = (value + 180) % 360 - 180
+    return int(round(value * scale))
+
+
+def _dequantize(value, scale):
+    if scale == 1:
+        return value
+    return round(value / scale, 3)
+
+
+def _pack_record(out, short_id, fields):
+    mask = 0
+    packed = []
+    extras = {}
+    for bit, ((name, _, scale), packer) in enumerate(zip(FIELDS, FIELD_STRUCTS)):
+        if name not in fields:
+            continue
+        quantized = _quantize(name, fields[name], scale)
+        try:
+            if quantized is None:
+                raise struct.error
+            packed.append(packer.pack(quantized))
+            mask |= 1 << bit
+        except struct.error:
+            extras[name] = fields[name]
+    known = {name for name, _, _ in FIELDS}
+    for name, value in fields.items():
+        if name not in known:
+            extras[name] = value
+    if extras:
+        mask |= EXTRAS_BIT
+    out.append(RECORD.pack(short_id, mask))
+    out.extend(packed)
+    if extras:
+        blob = json.dumps(extras, separators=(',', ':')).encode('utf-8')
+        out.append(EXTRAS_LEN.pack(len(blob)))
+        out.append(blob)
+
+
+def _unpack_record(frame, offset):
+    try:
+        short_id, mask = RECORD.unpack_from(frame, offset)
+        offset += RECORD.size
+        fields = {}
+        for bit, ((name, _, scale), packer) in enumerate(zip(FIELDS, FIELD_STRUCTS)):
+            if mask & (1 << bit):
+                fields[name] = _dequantize(packer.unpack_from(frame, offset)[0], scale)
+                offset += packer.size
+        if mask & EXTRAS_BIT:
+            (length,) = EXTRAS_LEN.unpack_from(frame, offset)
+            offset += EXTRAS_LEN.size
+            extras = json.loads(bytes(frame[offset:offset + length]).decode('utf-8'))
+            if not isinstance(extras, dict):
+                raise CodecError('Design record extras must be a JSON object')
+            fields.update(extras)
+            offset += length
+    except CodecError:
+        raise
+    except (struct.error, ValueError, TypeError) as e:
+        raise CodecError(f'Malformed design record: {e}')
+    return short_id, fields, offset
+
+
+def _pack_stamp(out, stamp):
+    replica = str(stamp[1]).encode('utf-8')[:255]
+    out.append(STAMP.pack(stamp[0], len(replica)))
+    out.append(replica)
+
+
+def encode_item(doc, item_id, changes, stamp):
+    """
+    Encode the fields one operation changed, under that operation's stamp.
+    `changes` carries 'id' only when the item is new to the room.
+    """
+    out = [HEADER.pack(VERSION, KIND_ITEM, doc.clock)]
+    _pack_stamp(out, stamp)
+    _pack_record(out, doc.short_id(item_id), changes)
+    return b''.join(out)
+
+
+def encode_remove(doc, item_id, stamp):
+    out = [HEADER.pack(VERSION, KIND_REMOVE, doc.clock)]
+    _pack_stamp(out, stamp)
+    out.append(COUNT.pack(doc.short_id(item_id)))
+    return b''.join(out)
+
+
+def _pack_table(out, strings, length):
+    out.append(SHORT.pack(len(strings)))
+    for value in strings:
+        out.append(length.pack(len(value)))
+        out.append(value)
+
+
+def encode_snapshot(doc, items, removed=(), reset=False):
+    """
+    Full items with their field stamps (and ids, so clients learn the short
+    id table) plus removed ids. reset marks a snapshot that replaces the
+    client's copy of the design.
+    """
+    replicas, names = {}, {}
+    item_stamps = []
+    for item in items:
+        stamps = []
+        for field, (counter, replica) in doc.stamps.get(item['id'], {}).items():
+            replica = str(replica).encode('utf-8')[:255]
+            stamps.append((names.setdefault(field, len(names)), counter, replicas.setdefault(replica, len(replicas))))
+        item_stamps.append(stamps)
+
+    out = [HEADER.pack(VERSION, KIND_SNAPSHOT, doc.clock), bytes([SNAPSHOT_RESET if reset else 0])]
+    _pack_table(out, list(replicas), STAMP_REPLICA_LEN)
+    _pack_table(out, [name.encode('utf-8') for name in names], SHORT)
+    out.append(COUNT.pack(len(items)))
+    for item, stamps in zip(items, item_stamps):
+        _pack_record(out, doc.short_id(item['id']), item)
+        out.append(SHORT.pack(len(stamps)))
+        out.extend(FIELD_STAMP.pack(*stamp) for stamp in stamps)
+    out.append(COUNT.pack(len(removed)))
+    for item_id in removed:
+        out.append(COUNT.pack(doc.short_id(item_id)))
+    return b''.join(out)
+
+
+def decode_item(doc, frame):
+    """
+    Decode a client's item frame into (item, counter, replica). The item's
+    full id is resolved through the document's short id table.
+    """
+    try:
+        version, kind, _ = HEADER.unpack_from(frame, 0)
+        offset = HEADER.size
+        counter, replica_len = STAMP.unpack_from(frame, offset)
+        offset += STAMP.size
+        replica = bytes(frame[offset:offset + replica_len]).decode('utf-8')
+        offset += replica_len
+    except (struct.error, UnicodeDecodeError) as e:
+        raise CodecError(f'Malformed design frame: {e}')
+    if version != VERSION or kind != KIND_ITEM:
+        raise CodecError(f'Unsupported design frame (version {version}, kind {kind})')
+
+    short_id, fields, _ = _unpack_record(frame, offset)
+    if short_id:
+        item_id = doc.item_id_for(short_id)
+        if item_id is None:
+            raise CodecError(f'Unknown short item id {short_id}')
+        fields['id'] = item_id
+    elif 'id' not in fields:
+        raise CodecError('Design frame carries no item id')
+    return fields, counter, replica or None
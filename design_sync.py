@@ -0,0 +1,236 @@
+"""
+Conflict-free design documents for the co-design workspace
+Each alley's design is a last-writer-wins map of items where every field
+carries its own Lamport stamp, so concurrent edits converge to the same
+state on the server and on every client regardless of arrival order.
+
+A remove records a tombstone stamp instead of forgetting the item. The
+item is visible while its newest field stamp is newer than its tombstone
+(and the last clear), so a remove and a concurrent update give the same
+result whichever arrives first. Tombstones older than
+DESIGN_TOMBSTONE_TTL seconds are pruned along with the removed item's
+fields and short id; the newest pruned stamp becomes the document's
+horizon, and clients that last synced before it get a full reset.
+"""
+import os
+import time
+
+TOMBSTONE_TTL = float(os.environ.get('DESIGN_TOMBSTONE_TTL', '600'))
+
+
+def make_stamp(counter, replica):
+    """A stamp orders writes: higher counter wins, replica id breaks ties."""
+    return (int(counter), str(replica or ''))
+
+
+ZERO_STAMP = make_stamp(0, '')
+
+
+class DesignDocument:
+    """LWW-element map of design items for a single alley"""
+
+    def __init__(self, tombstone_ttl=TOMBSTONE_TTL):
+        self.clock = 0
+        self.items = {}        # item_id -> item dict, visible items only
+        self.fields = {}       # item_id -> item dict, including removed items not yet pruned
+        self.stamps = {}       # item_id -> {field: stamp}
+        self.tombstones = {}   # item_id -> stamp of the newest remove
+        self.removed_at = {}   # item_id -> monotonic time of that remove, oldest first
+        self.cleared = ZERO_STAMP
+        self.horizon = ZERO_STAMP  # newest tombstone pruned so far
+        self.tombstone_ttl = tombstone_ttl
+        self.short_ids = {}    # item_id -> compact numeric id for binary frames
+        self.item_ids = {}     # compact numeric id -> item_id
+        self.next_short_id = 1
+
+    def next_stamp(self, replica, counter=None):
+        """
+        Stamp an incoming operation. Clients that track the clock send their
+        own counter; legacy clients are stamped in server arrival order.
+        A counter may be at most one ahead of the server clock, so no client
+        can claim a stamp that wins every future conflict.
+        """
+        if counter is None:
+            counter = self.clock + 1
+        elif isinstance(counter, bool) or not isinstance(counter, int) or counter < 0:
+            raise ValueError(f'Invalid clock {counter!r}')
+        counter = min(counter, self.clock + 1)
+        stamp = make_stamp(counter, replica)
+        self.clock = max(self.clock, stamp[0])
+        return stamp
+
+    def _refresh(self, item_id):
+        """Show or hide an item from its field stamps and removes; returns whether it is visible"""
+        field_stamps = self.stamps.get(item_id)
+        removed = max(self.tombstones.get(item_id, ZERO_STAMP), self.cleared)
+        if field_stamps and max(field_stamps.values()) > removed:
+            self.items[item_id] = self.fields[item_id]
+            return True
+        self.items.pop(item_id, None)
+        return False
+
+    def apply_item(self, item, stamp):
+        """
+        Merge an add or update. Returns the merged item when the visible state
+        changed, or None when the write lost to a newer one.
+        """
+        changes = self.apply_item_changes(item, stamp)
+        if changes is None:
+            return None
+        return self.items[item['id']]
+
+    def apply_item_changes(self, item, stamp):
+        """
+        Merge an add or update and return only the fields it changed, or the
+        whole item (with 'id') when it became visible. None when nothing
+        visible changed.
+        """
+        item_id = item.get('id')
+        if item_id is None:
+            return None
+        if item_id not in self.stamps and stamp <= self.horizon:
+            # Written before a remove that has since been pruned
+            return None
+
+        was_visible = item_id in self.items
+        current = self.fields.setdefault(item_id, {'id': item_id})
+        field_stamps = self.stamps.setdefault(item_id, {})
+        changes = {}
+        for field, value in item.items():
+            if field == 'id':
+                continue
+            if stamp > field_stamps.get(field, ZERO_STAMP):
+                field_stamps[field] = stamp
+                if current.get(field) != value or field not in current:
+                    current[field] = value
+                    changes[field] = value
+
+        if not self._refresh(item_id):
+            return None
+        if not was_visible:
+            return dict(current)
+        return changes or None
+
+    def remove_item(self, item_id, stamp):
+        """
+        Record a remove. Returns True when the item disappeared; False when a
+        newer write keeps it visible (or it was not visible to begin with).
+        """
+        if stamp > self.tombstones.get(item_id, ZERO_STAMP):
+            self.tombstones[item_id] = stamp
+            self.removed_at.pop(item_id, None)
+            self.removed_at[item_id] = time.monotonic()
+        was_visible = item_id in self.items
+        visible = self._refresh(item_id)
+        self.prune()
+        return was_visible and not visible
+
+    def clear(self, stamp):
+        """Remove every item last written before the clear."""
+        if stamp > self.cleared:
+            self.cleared = stamp
+        removed = []
+        for item_id in list(self.items):
+            if self.remove_item(item_id, stamp):
+                removed.append(item_id)
+        return removed
+
+    def prune(self, now=None):
+        """Forget removes older than the tombstone TTL, and the removed items' fields and short ids"""
+        now = time.monotonic() if now is None else now
+        pruned = 0
+        for item_id, removed_at in list(self.removed_at.items()):
+            if now - removed_at < self.tombstone_ttl:
+                break
+            del self.removed_at[item_id]
+            tombstone = self.tombstones.pop(item_id)
+            if item_id in self.items:
+                # Rewritten after the remove; the tombstone no longer hides anything
+                continue
+            self.horizon = max(self.horizon, tombstone)
+            self.fields.pop(item_id, None)
+            self.stamps.pop(item_id, None)
+            short = self.short_ids.pop(item_id, None)
+            self.item_ids.pop(short, None)
+            pruned += 1
+        return pruned
+
+    def get_item(self, item_id):
+        return self.items.get(item_id)
+
+    def short_id(self, item_id):
+        """Compact numeric id for an item, assigned on first use (never 0, never reused)"""
+        if item_id not in self.short_ids:
+            short = self.next_short_id
+            self.next_short_id += 1
+            self.short_ids[item_id] = short
+            self.item_ids[short] = item_id
+        return self.short_ids[item_id]
+
+    def item_id_for(self, short_id):
+        return self.item_ids.get(short_id)
+
+    def item_stamps(self, item_id):
+        """Field stamps for an item, in the [counter, replica] form clients merge with"""
+        return {field: list(stamp) for field, stamp in self.stamps.get(item_id, {}).items()}
+
+    def snapshot(self):
+        """All live items, oldest first, for a freshly joined client"""
+        return list(self.items.values())
+
+    def snapshot_stamps(self):
+        return {item_id: self.item_stamps(item_id) for item_id in self.items}
+
+    def changes_since(self, counter):
+        """
+        Items and removals a client that last saw `counter` is missing.
+        'reset' is set when removals it missed have been pruned: the items
+        are then the whole design and replace the client's copy.
+        """
+        counter = int(counter or 0)
+        if counter < self.horizon[0]:
+            return {
+                'items': self.snapshot(),
+                'stamps': self.snapshot_stamps(),
+                'removed': [],
+                'reset': True,
+                'clock': self.clock
+            }
+        if self.cleared[0] > counter:
+            touched = list(self.stamps)
+        else:
+            touched = [
+                item_id
+                for item_id, field_stamps in self.stamps.items()
+                if any(s[0] > counter for s in field_stamps.values())
+                or self.tombstones.get(item_id, ZERO_STAMP)[0] > counter
+            ]
+            touched.extend(item_id for item_id, s in self.tombstones.items()
+                           if s[0] > counter and item_id not in self.stamps)
+        changed = [item_id for item_id in touched if item_id in self.items]
+        return {
+            'items': [self.items[item_id] for item_id in changed],
+            'stamps': {item_id: self.item_stamps(item_id) for item_id in changed},
+            'removed': [item_id for item_id in touched if item_id not in self.items],
+            'reset': False,
+            'clock': self.clock
+        }
+
+
+class DesignStore:
+    """Per-alley design documents for this worker"""
+
+    def __init__(self):
+        self.documents = {}
+
+    def get(self, alley_id):
+        if alley_id not in self.documents:
+            self.documents[alley_id] = DesignDocument()
+        return self.documents[alley_id]
+
+    def __contains__(self, alley_id):
+        return alley_id in self.documents
+
+
+# Create global instance
+design_store = DesignStore()
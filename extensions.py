@@ -0,0 +1,46 @@
+"""
+Objects and helpers shared by the blueprints
+socketio is created unbound; create_app() attaches it to the application.
+Event handlers registered with @socketio.on before that are kept and
+installed by init_app.
+"""
+import os
+from functools import wraps
+
+from flask import request, session, jsonify
+from flask_socketio import SocketIO
+
+socketio = SocketIO()
+
+# ============================================================================
+# API KEYS - Load from environment variables
+# ============================================================================
+
+# Google Cloud API Configuration
+GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY', '')
+
+# Unsplash API - Professional Images
+UNSPLASH_KEY = os.environ.get('UNSPLASH_KEY', '')
+
+# OpenWeatherMap API - Real-time Weather Data
+OPENWEATHER_KEY = os.environ.get('OPENWEATHER_KEY', '')
+
+# NASA POWER API - No key needed! Free solar radiation data
+# iNaturalist API - No key needed! Free biodiversity data
+# USGS Water Services - No key needed! Free water data
+
+
+def is_edit_allowed():
+    """Edit mode only works on localhost"""
+    host = request.host.split(':')[0]
+    return host in ('localhost', '127.0.0.1')
+
+
+def login_required(f):
+    """Decorator to require login"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Login required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
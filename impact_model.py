@@ -0,0 +1,319 @@
+"""
+Green-infrastructure impact simulator
+The alley floor is rasterized into a grid (IMPACT_CELL_FT per cell) and
+every layer is turned into a footprint mask. Shade, surface temperature
+and runoff fields come out of vectorized NumPy kernels, and the scenario
+metrics (temperature, shade_coverage, green_space, water_runoff,
+water_capture) are summaries of those fields. A 150 x 12 ft alley
+simulates in a few milliseconds.
+
+Layers may be plain names (placed with the defaults below) or dicts with
+a 'type' plus overrides, e.g. {'type': 'trees', 'count': 6,
+'canopy_diameter': 15} or {'type': 'rain_gardens', 'x': 40, 'y': 0,
+'width': 8, 'height': 4} for an explicit footprint in feet.
+
+Designs are bounded (IMPACT_MAX_CELLS grid cells, IMPACT_MAX_LAYERS
+layers, IMPACT_MAX_FEATURES trees or rain gardens per layer) so one
+request cannot allocate an arbitrarily large grid; DesignTooLarge is a
+ValueError and the API answers it with 400.
+"""
+import math
+import os
+
+import numpy as np
+
+from models import normalize_metrics
+
+CELL_FT = float(os.environ.get('IMPACT_CELL_FT', '1.0'))
+MAX_CELLS = int(os.environ.get('IMPACT_MAX_CELLS', '250000'))     # e.g. 2500 x 100 ft at 1 ft cells
+MAX_LAYERS = int(os.environ.get('IMPACT_MAX_LAYERS', '50'))
+MAX_FEATURES = int(os.environ.get('IMPACT_MAX_FEATURES', '500'))  # trees or rain gardens per layer
+DISC_BLOCK_CELLS = 4_000_000                                        # disc x cell products evaluated at once
+
+# Coefficients of the model. Surface reductions are in °F relative to sunlit asphalt.
+SUNLIT_ASPHALT_EXCESS = 25.0      # sunlit asphalt runs this much hotter than the air
+SHADE_COOLING = 22.0              # full shade removes most of that excess
+VEGETATION_COOLING = 16.0         # planted cells, before shading
+PERMEABLE_COOLING = 6.0           # moist, lighter pavers
+MURAL_COOLING = 3.0               # light wall coatings next to the wall
+EVAPOTRANSPIRATION_COOLING = 5.0  # spill-over from planted cells to their neighbours
+EVAPOTRANSPIRATION_RADIUS_FT = 4.0
+AIR_COUPLING = 0.3                # share of mean surface cooling felt in air temperature
+
+RUNOFF_ASPHALT = 0.95
+RUNOFF_PERMEABLE = 0.35
+RUNOFF_VEGETATED = 0.10
+CAPTURE_RADIUS_FT = 6.0           # bioswales and rain gardens take water from this far
+CAPTURE_MAX = 0.7
+MONTHLY_RAINFALL_IN = float(os.environ.get('IMPACT_MONTHLY_RAINFALL_IN', '1.2'))
+GALLONS_PER_FT2_INCH = 0.623
+
+TREE_CANOPY_DENSITY = 0.85
+STRUCTURE_DENSITY = {'canopy': 0.9, 'solar_shades': 0.9, 'shade_structure': 0.9, 'trellis': 0.6}
+
+LAYER_TYPES = ('bioswales', 'rain_gardens', 'native_plants', 'permeable_pavement', 'community_murals',
+               'trees') + tuple(STRUCTURE_DENSITY)
+
+
+class DesignTooLarge(ValueError):
+    """Raised for a design beyond the grid, layer or feature limits"""
+
+
+def _length_ft(value, unit, default):
+    """A dimension in feet; `default` (already in feet) only when none was given"""
+    if value is None:
+        return default
+    value = float(value)
+    if not math.isfinite(value) or value <= 0:
+        raise ValueError(f'dimensions must be positive numbers, got {value}')
+    return value * 3.28084 if unit in ('m', 'meters') else value
+
+
+def feature_count(spec, default):
+    """A layer's 'count' (trees, rain gardens), checked against MAX_FEATURES"""
+    count = int(spec.get('count', default))
+    if count < 0:
+        raise ValueError(f"{spec['type']}: count must not be negative")
+    if count > MAX_FEATURES:
+        raise DesignTooLarge(f"{spec['type']}: {count} features exceeds the limit of {MAX_FEATURES}")
+    return count
+
+
+def check_layers(layers):
+    if layers is not None and not isinstance(layers, list):
+        raise ValueError('layers must be a list')
+    if len(layers or []) > MAX_LAYERS:
+        raise DesignTooLarge(f'{len(layers)} layers exceeds the limit of {MAX_LAYERS}')
+
+
+def check_design(dimensions, layers, cell_ft=CELL_FT):
+    """Raise ValueError (DesignTooLarge for limits) for a design simulate() would refuse"""
+    check_layers(layers)
+    grid = AlleyGrid(dimensions, cell_ft)
+    for layer in layers or []:
+        spec = layer_spec(layer)
+        if spec['type'] in ('trees', 'rain_gardens'):
+            feature_count(spec, 0)
+    return grid
+
+
+class AlleyGrid:
+    """Cell-centre coordinates (feet) for an alley floor"""
+
+    def __init__(self, dimensions, cell_ft=CELL_FT):
+        dimensions = dimensions or {}
+        unit = dimensions.get('unit', 'ft')
+        self.length = _length_ft(dimensions.get('length'), unit, 150.0)
+        self.width = _length_ft(dimensions.get('width'), unit, 12.0)
+        self.cell_ft = cell_ft
+        nx = max(1, int(math.ceil(self.length / cell_ft)))
+        ny = max(1, int(math.ceil(self.width / cell_ft)))
+        if nx * ny > MAX_CELLS:
+            raise DesignTooLarge(
+                f'{self.length:g} x {self.width:g} ft is {nx * ny} grid cells, over the limit of {MAX_CELLS}'
+            )
+        self.shape = (ny, nx)
+        self.x = ((np.arange(nx) + 0.5) * cell_ft)[None, :]
+        self.y = ((np.arange(ny) + 0.5) * cell_ft)[:, None]
+
+    def empty(self, dtype=bool):
+        return np.zeros(self.shape, dtype=dtype)
+
+    def rect(self, x0, y0, width, height):
+        return (self.x >= x0) & (self.x < x0 + width) & (self.y >= y0) & (self.y < y0 + height)
+
+    def discs(self, cx, cy, radius):
+        """Union of discs; centres are arrays, evaluated in broadcast blocks of DISC_BLOCK_CELLS"""
+        cx = np.asarray(cx, dtype=float)[:, None, None]
+        cy = np.asarray(cy, dtype=float)[:, None, None]
+        mask = self.empty()
+        block = max(1, DISC_BLOCK_CELLS // (self.shape[0] * self.shape[1]))
+        for start in range(0, len(cx), block):
+            inside = (self.x[None] - cx[start:start + block]) ** 2 + (self.y[None] - cy[start:start + block]) ** 2
+            mask |= (inside <= radius ** 2).any(axis=0)
+        return mask
+
+    def edge_band(self, depth):
+        return (self.y < depth) | (self.y > self.width - depth)
+
+    def cells(self, feet):
+        return max(0, int(round(feet / self.cell_ft)))
+
+
+def _box_blur_1d(field, radius, axis):
+    """Mean over a +/- radius window along one axis, using cumulative sums"""
+    n = field.shape[axis]
+    pad = [(0, 0)] * field.ndim
+    pad[axis] = (radius + 1, radius)
+    window = 2 * radius + 1
+    sums = np.cumsum(np.pad(field, pad), axis=axis)
+    counts = np.cumsum(np.pad(np.ones(n), (radius + 1, radius)))
+    head = [slice(None)] * field.ndim
+    tail = [slice(None)] * field.ndim
+    head[axis] = slice(window, window + n)
+    tail[axis] = slice(0, n)
+    shape = [1] * field.ndim
+    shape[axis] = n
+    totals = sums[tuple(head)] - sums[tuple(tail)]
+    return totals / (counts[window:window + n] - counts[:n]).reshape(shape)
+
+
+def box_blur(field, radius_cells):
+    if radius_cells < 1:
+        return field.astype(float)
+    field = field.astype(float)
+    return _box_blur_1d(_box_blur_1d(field, radius_cells, 0), radius_cells, 1)
+
+
+def layer_spec(layer):
+    if isinstance(layer, str):
+        return {'type': layer}
+    if isinstance(layer, dict):
+        return dict(layer, type=layer.get('type') or layer.get('subtype'))
+    return {'type': None}
+
+
+def _footprint(grid, spec, default):
+    """Explicit {x, y, width, height} footprint in feet, or the layer's default placement"""
+    if all(k in spec for k in ('x', 'y', 'width', 'height')):
+        return grid.rect(float(spec['x']), float(spec['y']), float(spec['width']), float(spec['height']))
+    return default()
+
+
+def _spaced(length, count):
+    return (np.arange(count) + 0.5) * (length / count)
+
+
+def rasterize_layers(grid, layers):
+    """Footprint masks and shade densities for every layer type present"""
+    masks = {
+        'vegetated': grid.empty(),
+        'capture': grid.empty(),
+        'permeable': grid.empty(),
+        'mural': grid.empty(),
+        'tree_canopy': grid.empty()
+    }
+    shade_layers = []   # (density mask as float array)
+
+    for layer in layers or []:
+        spec = layer_spec(layer)
+        kind = spec['type']
+
+        if kind == 'bioswales':
+            share = float(spec.get('share', 1.0))
+            depth = float(spec.get('depth', 2.0))
+            mask = _footprint(grid, spec, lambda: grid.edge_band(depth) & (grid.x < grid.length * share))
+            masks['vegetated'] |= mask
+            masks['capture'] |= mask
+
+        elif kind == 'rain_gardens':
+            count = feature_count(spec, max(1, grid.length // 30))
+            radius = float(spec.get('radius', 3.0))
+            cx = _spaced(grid.length, count) if count else np.zeros(0)
+            cy = np.where(np.arange(count) % 2 == 0, radius * 0.5, grid.width - radius * 0.5)
+            mask = _footprint(grid, spec, lambda: grid.discs(cx, cy, radius))
+            masks['vegetated'] |= mask
+            masks['capture'] |= mask
+
+        elif kind == 'native_plants':
+            depth = float(spec.get('depth', 1.5))
+            spacing = float(spec.get('spacing', 12.0))
+            planter = float(spec.get('planter_length', 6.0))
+            side = (np.floor(grid.x / spacing) % 2 == 0)
+            default = lambda: (grid.x % spacing < planter) & np.where(side, grid.y < depth, grid.y > grid.width - depth)
+            mask = _footprint(grid, spec, default)
+            masks['vegetated'] |= mask
+            # Shrubs shade a halo around their planters
+            shade_layers.append(box_blur(mask, grid.cells(1.5)) * float(spec.get('density', 0.5)))
+
+        elif kind == 'permeable_pavement':
+            share = min(max(float(spec.get('share', 0.6)), 0.0), 1.0)
+            band = grid.width * share
+            mask = _footprint(grid, spec, lambda: np.abs(grid.y - grid.width / 2) < band / 2)
+            masks['permeable'] |= mask & np.ones(grid.shape, dtype=bool)
+
+        elif kind == 'community_murals':
+            masks['mural'] |= _footprint(grid, spec, lambda: grid.edge_band(1.0)) & np.ones(grid.shape, dtype=bool)
+
+        elif kind == 'trees':
+            count = feature_count(spec, max(1, grid.length // 25))
+            radius = float(spec.get('canopy_diameter', 15.0)) / 2
+            cx = _spaced(grid.length, count) if count else np.zeros(0)
+            cy = np.where(np.arange(count) % 2 == 0, 0.0, grid.width)
+            canopy = grid.discs(cx, cy, radius) if count else grid.empty()
+            masks['tree_canopy'] |= canopy
+            shade_layers.append(canopy * float(spec.get('density', TREE_CANOPY_DENSITY)))
+
+        elif kind in STRUCTURE_DENSITY:
+            width = float(spec.get('width', 6.0))
+            share = float(spec.get('share', 1.0))
+            default = lambda: (np.abs(grid.y - grid.width / 2) < width / 2) & (grid.x < grid.length * share)
+            mask = _footprint(grid, spec, default)
+            shade_layers.append(mask * float(spec.get('density', STRUCTURE_DENSITY[kind])))
+
+    # Independent shade sources combine multiplicatively on the light that gets through
+    light = np.ones(grid.shape)
+    for density in shade_layers:
+        light *= 1 - np.clip(density, 0, 1)
+    masks['shade'] = 1 - light
+    return masks
+
+
+def simulate(dimensions, layers, environmental_data=None, cell_ft=CELL_FT, include_fields=False):
+    """Simulate one alley design; metrics are comparable with scenario environmental_data"""
+    check_layers(layers)
+    grid = AlleyGrid(dimensions, cell_ft)
+    baseline = normalize_metrics(environmental_data)
+    air_temp = baseline['temperature'] if baseline['temperature'] is not None else 95.0
+
+    masks = rasterize_layers(grid, layers)
+    shade = masks['shade']
+    vegetated = masks['vegetated']
+    permeable = masks['permeable'] & ~vegetated
+
+    # Surface temperature (°F)
+    reduction = SHADE_COOLING * shade
+    reduction = reduction + VEGETATION_COOLING * vegetated * (1 - shade)
+    reduction = reduction + PERMEABLE_COOLING * permeable
+    reduction = reduction + MURAL_COOLING * masks['mural']
+    reduction = reduction + EVAPOTRANSPIRATION_COOLING * box_blur(vegetated, grid.cells(EVAPOTRANSPIRATION_RADIUS_FT))
+    reduction = np.minimum(reduction, SUNLIT_ASPHALT_EXCESS + 5)
+    surface = air_temp + SUNLIT_ASPHALT_EXCESS - reduction
+
+    # Runoff coefficient per cell, lowered where swales and gardens intercept flow
+    coefficient = np.full(grid.shape, RUNOFF_ASPHALT)
+    coefficient[permeable] = RUNOFF_PERMEABLE
+    coefficient[vegetated] = RUNOFF_VEGETATED
+    capture = np.clip(box_blur(masks['capture'], grid.cells(CAPTURE_RADIUS_FT)) * 2, 0, CAPTURE_MAX)
+    coefficient = coefficient * (1 - capture)
+
+    cell_area = grid.cell_ft ** 2
+    captured = (RUNOFF_ASPHALT - coefficient).clip(min=0).sum() * cell_area * MONTHLY_RAINFALL_IN * GALLONS_PER_FT2_INCH
+
+    metrics = {
+        'temperature': round(air_temp - AIR_COUPLING * float(reduction.mean()), 1),
+        'shade_coverage': round(float(shade.mean()) * 100, 1),
+        'green_space': round(float((vegetated | masks['tree_canopy']).mean()) * 100, 1),
+        'water_runoff': round(float(coefficient.mean()) * 100, 1),
+        'water_capture': int(round(captured)),
+        'surface_temperature': round(float(surface.mean()), 1)
+    }
+    baseline_metrics = {
+        'temperature': air_temp,
+        'shade_coverage': baseline['shade_coverage'] or 0.0,
+        'green_space': baseline['green_space'] or 0.0,
+        'water_runoff': baseline['water_runoff'] if baseline['water_runoff'] is not None else RUNOFF_ASPHALT * 100
+    }
+    result = {
+        'metrics': metrics,
+        'baseline': baseline_metrics,
+        'deltas': {k: round(metrics[k] - v, 1) for k, v in baseline_metrics.items()},
+        'grid': {'cell_ft': grid.cell_ft, 'rows': grid.shape[0], 'columns': grid.shape[1]}
+    }
+    if include_fields:
+        result['fields'] = {
+            'shade': np.round(shade, 3).tolist(),
+            'surface_temperature': np.round(surface, 1).tolist(),
+            'runoff_coefficient': np.round(coefficient, 3).tolist()
+        }
+    return result
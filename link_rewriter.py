@@ -0,0 +1,145 @@
+"""
+HTML-aware link rewriting for the static build
+One regex pass walks the document's tags, comments, scripts and styles.
+URL attributes (href, src, srcset, action, poster, data-src, style
+url(...)) are resolved against the Flask url_map: routes that the static
+build renders become their .html file, /static and /content URLs become
+relative paths (optionally fingerprinted), and everything else is left
+alone. Text and script code are never touched, apart from quoted
+/static/ and /content/ paths inside scripts, so the work stays linear in
+the size of the page.
+"""
+import re
+from urllib.parse import urlsplit
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+
+ASSET_PREFIXES = ('/static/', '/content/')
+URL_ATTRIBUTES = ('href', 'src', 'action', 'poster', 'data-src', 'data-href')
+
+_DOCUMENT = re.compile(
+    r'<!--.*?-->'                                                     # comments
+    r'|<(?P<raw>script|style)\b(?P<raw_attrs>[^>]*)>(?P<body>.*?)(?P<close></(?P=raw)\s*>)'  # script/style blocks
+    r'|<[a-zA-Z][^>]*>',                                              # any other start tag
+    re.DOTALL | re.IGNORECASE
+)
+_ATTRIBUTE = re.compile(
+    r'(?P<name>(?<=[\s"\'])[a-zA-Z][\w:-]*)(?P<eq>\s*=\s*)(?P<quote>["\'])(?P<value>.*?)(?P=quote)',
+    re.DOTALL
+)
+_CSS_URL = re.compile(r'url\(\s*(?P<quote>["\']?)(?P<url>[^"\')]+)(?P=quote)\s*\)')
+_SCRIPT_ASSET = re.compile(r'(?P<lead>=\s*\\?["\'])/(?P<dir>static|content)/')
+
+
+class LinkRewriter:
+    """Rewrites one site's pages; resolved URLs are cached across pages"""
+
+    def __init__(self, url_map, pages, asset_url=None, probe=None):
+        """
+        pages maps route paths ('/', '/existing') to output files; asset_url
+        turns 'static/css/x.css' into its published URL (fingerprinting);
+        probe(path) returns the Location a non-page route redirects to, if any.
+        """
+        self.adapter = url_map.bind('localhost')
+        self.asset_url = asset_url or (lambda path: path)
+        self.probe = probe
+        self.endpoint_pages = {}
+        for route, filename in pages.items():
+            endpoint = self._match(route)
+            if endpoint:
+                self.endpoint_pages[endpoint] = filename
+        self.resolved = {}
+        self.unresolved = set()   # routes linked from the last page that the static site lacks
+
+    def _match(self, path):
+        """Endpoint for a path, following the url_map's own redirects (trailing slashes)"""
+        try:
+            return self.adapter.match(path, method='GET')[0]
+        except RequestRedirect as e:
+            return self._match(urlsplit(e.new_url).path)
+        except HTTPException:
+            return None
+
+    def resolve(self, url):
+        cached = self.resolved.get(url)
+        if cached is None:
+            cached = self.resolved[url] = self._resolve(url.strip()) if url.strip() else (url, None)
+        result, unresolved = cached
+        if unresolved:
+            self.unresolved.add(unresolved)
+        return result
+
+    def _resolve(self, url):
+        """(published URL, route path if it is not part of the static site)"""
+        if not url.startswith('/') or url.startswith('//'):
+            return url, None   # relative, protocol-relative, external, data:, #fragment, template placeholder
+        parts = urlsplit(url)
+        suffix = (f'?{parts.query}' if parts.query else '') + (f'#{parts.fragment}' if parts.fragment else '')
+        if parts.path.startswith(ASSET_PREFIXES):
+            path = parts.path[1:]
+            published = self.asset_url(path)
+            if '?' in published and parts.query:
+                suffix = '&' + suffix[1:]
+            return published + suffix, None
+
+        endpoint = self._match(parts.path)
+        filename = self.endpoint_pages.get(endpoint)
+        if filename is None and endpoint and self.probe:
+            location = self.probe(parts.path)
+            if location:
+                filename = self.endpoint_pages.get(self._match(urlsplit(location).path))
+        if filename is None:
+            return url, parts.path
+        # The static pages take no query arguments; keep only the fragment
+        return filename + (f'#{parts.fragment}' if parts.fragment else ''), None
+
+    def _srcset(self, value):
+        candidates = []
+        for candidate in value.split(','):
+            pieces = candidate.strip().split(None, 1)
+            if pieces:
+                pieces[0] = self.resolve(pieces[0])
+                candidates.append(' '.join(pieces))
+        return ', '.join(candidates)
+
+    def _css(self, text):
+        return _CSS_URL.sub(
+            lambda m: f"url({m.group('quote')}{self.resolve(m.group('url'))}{m.group('quote')})", text
+        )
+
+    def _attribute(self, match):
+        name = match.group('name').lower()
+        value = match.group('value')
+        if name in URL_ATTRIBUTES:
+            new_value = self.resolve(value)
+        elif name == 'srcset' or name == 'data-srcset':
+            new_value = self._srcset(value)
+        elif name == 'style' and 'url(' in value:
+            new_value = self._css(value)
+        else:
+            return match.group(0)
+        return f"{match.group('name')}{match.group('eq')}{match.group('quote')}{new_value}{match.group('quote')}"
+
+    def _tag(self, text):
+        return _ATTRIBUTE.sub(self._attribute, text)
+
+    def _token(self, match):
+        text = match.group(0)
+        if text.startswith('<!--'):
+            return text
+        raw = match.group('raw')
+        if raw is None:
+            return self._tag(text)
+        start = self._tag(f"<{raw}{match.group('raw_attrs')}>")
+        body = match.group('body')
+        if raw.lower() == 'style':
+            body = self._css(body)
+        else:
+            # Markup built in scripts: src="/static/..." inside string literals
+            body = _SCRIPT_ASSET.sub(lambda m: f"{m.group('lead')}{m.group('dir')}/", body)
+        return f"{start}{body}{match.group('close')}"
+
+    def rewrite(self, html):
+        self.unresolved = set()
+        return _DOCUMENT.sub(self._token, html)
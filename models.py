@@ -3,11 +3,42 @@ Database models for Alley Bloom
 Supports user authentication, scenario persistence, and collaboration tracking
 """
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from datetime import datetime
 import json
 
 db = SQLAlchemy()
 
+# Environmental metrics copied out of environmental_data into indexed columns
+SCENARIO_METRICS = ('temperature', 'shade_coverage', 'air_quality', 'pm25', 'green_space', 'water_runoff')
+
+def metric_value(field, default=None):
+    """Value of a metric stored either as a plain number or as a {value, unit} dict"""
+    if field is None:
+        return default
+    if isinstance(field, dict):
+        return field.get('value', default)
+    return field
+
+def normalize_metrics(environmental_data):
+    """Numeric value (or None) for every metric; Celsius temperatures are converted to °F"""
+    env = environmental_data if isinstance(environmental_data, dict) else {}
+    metrics = {}
+    for name in SCENARIO_METRICS:
+        raw = env.get(name)
+        value = metric_value(raw)
+        if isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                value = None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            value = None
+        elif name == 'temperature' and isinstance(raw, dict) and str(raw.get('unit', '')).upper().lstrip('°') == 'C':
+            value = value * 9 / 5 + 32
+        metrics[name] = float(value) if value is not None else None
+    return metrics
+
 class User(db.Model):
     """User model for authentication and collaboration tracking"""
     __tablename__ = 'users'
@@ -60,11 +91,31 @@ class Scenario(db.Model):
     is_public = db.Column(db.Boolean, default=False)
     version = db.Column(db.Integer, default=1)
     
+    # Normalized copies of environmental_data metrics (see sync_metrics)
+    temperature = db.Column(db.Float, index=True)
+    shade_coverage = db.Column(db.Float, index=True)
+    air_quality = db.Column(db.Float, index=True)
+    pm25 = db.Column(db.Float, index=True)
+    green_space = db.Column(db.Float, index=True)
+    water_runoff = db.Column(db.Float, index=True)
+    
     # Relationships
     versions = db.relationship('ScenarioVersion', backref='scenario', lazy=True, cascade='all, delete-orphan')
     collaborations = db.relationship('Collaboration', backref='scenario', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id) newest first
+        db.Index('ix_scenarios_created_at_id', 'created_at', 'id'),
+        db.Index('ix_scenarios_type', 'type'),
+        db.Index('ix_scenarios_phase', 'phase'),
+        db.Index('ix_scenarios_is_public', 'is_public'),
+        db.Index('ix_scenarios_created_by', 'created_by'),
+    )
+    
+    def to_dict(self, fields=None):
+        """Serialize the scenario; `fields` limits the output to those keys"""
+        if fields is not None:
+            return {field: self._field_value(field) for field in fields}
         return {
             'id': self.id,
             'name': self.name,
@@ -83,6 +134,33 @@ class Scenario(db.Model):
             'is_public': self.is_public,
             'version': self.version
         }
+    
+    def sync_metrics(self):
+        """Refresh the metric columns from environmental_data"""
+        for name, value in normalize_metrics(self.environmental_data).items():
+            setattr(self, name, value)
+    
+    def metrics_dict(self):
+        return {name: getattr(self, name) for name in SCENARIO_METRICS}
+    
+    def _field_value(self, field):
+        value = getattr(self, field)
+        if field == 'layers':
+            return value or []
+        if field in ('created_at', 'updated_at'):
+            return value.isoformat() if value else None
+        return value
+
+@event.listens_for(Scenario, 'before_insert')
+@event.listens_for(Scenario, 'before_update')
+def _sync_scenario_metrics(mapper, connection, target):
+    target.sync_metrics()
+
+# Columns returned by the lightweight list view
+SCENARIO_SUMMARY_FIELDS = ('id', 'name', 'type', 'alley_id', 'phase', 'is_public',
+                           'created_by', 'created_at', 'updated_at', 'version')
+SCENARIO_FIELDS = SCENARIO_SUMMARY_FIELDS + ('description', 'location', 'dimensions',
+                                             'layers', 'environmental_data', 'notes')
 
 class ScenarioVersion(db.Model):
     """Version history for scenarios (undo/redo support)"""
@@ -96,6 +174,10 @@ class ScenarioVersion(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     
+    __table_args__ = (
+        db.Index('ix_scenario_versions_scenario_version', 'scenario_id', 'version_number'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -0,0 +1,111 @@
+"""
+Rendered page cache for the content-driven pages (/, /existing, /compare)
+These pages render large templates from content/pages and content/areas,
+which only change when an editor saves. Rendered HTML is kept per
+(template, edit_mode) for the current content version, so a hot page
+costs a dictionary lookup, and it is served with an ETag so browsers can
+revalidate with a 304 instead of downloading it again.
+
+The content version covers the content files and the templates. It is
+re-read from disk at most every PAGE_CACHE_CHECK_INTERVAL seconds, which
+picks up edits made by other workers or by hand, and immediately after a
+ContentManager.write in this process.
+"""
+import hashlib
+import os
+import threading
+import time
+
+from flask import Response, request
+
+from content_manager import content_manager
+
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE', 'on').lower() not in ('off', '0', 'false')
+PAGE_CACHE_CHECK_INTERVAL = float(os.environ.get('PAGE_CACHE_CHECK_INTERVAL', '2'))
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+CONTENT_CATEGORIES = ('pages', 'areas')
+
+
+def _template_stamp():
+    entries = []
+    for root, dirs, files in os.walk(TEMPLATE_DIR):
+        for name in files:
+            stat = os.stat(os.path.join(root, name))
+            entries.append((os.path.relpath(os.path.join(root, name), TEMPLATE_DIR), stat.st_mtime_ns, stat.st_size))
+    return sorted(entries)
+
+
+class PageCache:
+    """Rendered pages for one content version; a new version empties it"""
+
+    def __init__(self, content=content_manager, enabled=PAGE_CACHE_ENABLED, check_interval=PAGE_CACHE_CHECK_INTERVAL):
+        self.content = content
+        self.enabled = enabled
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.pages = {}   # (template, edit_mode) -> (body, etag)
+        self.version = None
+        self.checked_at = 0.0
+        self.writes_seen = None
+        self.hits = 0
+        self.misses = 0
+
+    def content_version(self):
+        """Hash of the content files and templates, re-checked on the interval or after a write"""
+        now = time.monotonic()
+        if (self.version is not None and self.writes_seen == self.content.writes
+                and now - self.checked_at < self.check_interval):
+            return self.version
+        writes = self.content.writes
+        stamp = repr((self.content.stamp(CONTENT_CATEGORIES), _template_stamp()))
+        version = hashlib.sha1(stamp.encode()).hexdigest()[:16]
+        with self.lock:
+            if version != self.version:
+                if self.version is not None:
+                    print(f"[PageCache] Content changed, dropping {len(self.pages)} rendered page(s)")
+                self.pages = {}
+                self.version = version
+            self.checked_at = now
+            self.writes_seen = writes
+        return version
+
+    def get(self, template, edit_mode, render):
+        """(body, etag, hit) for a page; render() produces its HTML on a miss"""
+        version = self.content_version()
+        key = (template, bool(edit_mode))
+        with self.lock:
+            cached = self.pages.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached[0], cached[1], True
+            self.misses += 1
+        body = render().encode('utf-8')
+        etag = f'{version}-{hashlib.sha1(body).hexdigest()[:16]}'
+        with self.lock:
+            if self.version == version:
+                self.pages[key] = (body, etag)
+        return body, etag, False
+
+    def respond(self, template, edit_mode, render):
+        """
+        Flask response for a cached page, answering If-None-Match with 304.
+        Renders straight through when disabled or while the static builder
+        records which content files a page reads.
+        """
+        if not self.enabled or self.content.read_log is not None:
+            return render()
+        body, etag, hit = self.get(template, edit_mode, render)
+        response = Response(body, mimetype='text/html')
+        response.set_etag(etag)
+        response.headers['X-Page-Cache'] = 'hit' if hit else 'miss'
+        return response.make_conditional(request)
+
+    def stats(self):
+        with self.lock:
+            return {'enabled': self.enabled, 'pages': len(self.pages), 'version': self.version,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+# Create global instance
+page_cache = PageCache()
@@ -0,0 +1,161 @@
+"""
+Page routes: the site's HTML pages
+The content-driven pages (/, /existing, /compare) are served through the
+page cache; the rest render their template directly.
+"""
+import os
+
+from flask import Blueprint, render_template, request, jsonify, send_file, redirect, url_for
+
+from content_manager import content_manager
+from extensions import GOOGLE_API_KEY, is_edit_allowed
+from page_cache import page_cache
+
+pages_bp = Blueprint('pages', __name__)
+
+@pages_bp.route('/')
+def index():
+    edit_mode = request.args.get('edit') == 'true' and is_edit_allowed()
+
+    def render():
+        page_content = content_manager.load_page_content('home') or {}
+        areas = {
+            'a': content_manager.load_area_content('area-a') or {},
+            'b': content_manager.load_area_content('area-b') or {},
+            'c': content_manager.load_area_content('area-c') or {},
+            'd': content_manager.load_area_content('area-d') or {},
+        }
+        return render_template('index_unified.html', edit_mode=edit_mode, content=page_content, areas=areas)
+    return page_cache.respond('index_unified.html', edit_mode, render)
+
+@pages_bp.route('/street-view-designer')
+def street_view_designer():
+    # Redirect to new visualization studio
+    return redirect('/visualization-studio')
+
+@pages_bp.route('/design-brief')
+def design_brief():
+    # Design Brief Generator - Data-driven recommendations for eco-cultural corridor transformation
+    return render_template('design_brief.html')
+
+@pages_bp.route('/design-workspace')
+def design_workspace():
+    # Co-Design Studio - Canvas-based design workspace with real-time collaboration
+    return render_template('design_workspace.html')
+
+@pages_bp.route('/scenarios')
+def scenarios():
+    # Scenario management dashboard
+    return render_template('scenarios.html')
+
+@pages_bp.route('/plant-library')
+def plant_library():
+    # Climate-appropriate plant library
+    return render_template('plant_library.html')
+
+@pages_bp.route('/visualization-studio')
+def visualization_studio():
+    # Street View visualization studio
+    return render_template('visualization_studio.html')
+
+@pages_bp.route('/before-after')
+def before_after():
+    # Before and after scenario comparison (legacy route)
+    return render_template('before_after.html')
+
+@pages_bp.route('/existing')
+def existing():
+    # Existing conditions page with Figma-style layout
+    google_api_key = GOOGLE_API_KEY if GOOGLE_API_KEY else ''
+    edit_mode = request.args.get('edit') == 'true' and is_edit_allowed()
+
+    def render():
+        page_content = content_manager.load_page_content('existing') or {}
+        return render_template('existing_new.html', google_api_key=google_api_key, edit_mode=edit_mode,
+                               content=page_content)
+    return page_cache.respond('existing_new.html', edit_mode, render)
+
+@pages_bp.route('/compare')
+def compare():
+    # Compare before/after with intervention toggles
+    edit_mode = request.args.get('edit') == 'true' and is_edit_allowed()
+
+    def render():
+        page_content = content_manager.load_page_content('compare') or {}
+        return render_template('compare.html', edit_mode=edit_mode, content=page_content)
+    return page_cache.respond('compare.html', edit_mode, render)
+
+@pages_bp.route('/urban-farming')
+def urban_farming():
+    # Urban Farming education and Digital Twin integration page
+    return render_template('urban_farming.html')
+
+@pages_bp.route('/solar-shades')
+def solar_shades():
+    # Solar Shades intervention page for Alley 3
+    return render_template('solar_shades.html')
+
+@pages_bp.route('/murals')
+def murals():
+    # Community Murals intervention page for Alley 3
+    return render_template('murals.html')
+
+@pages_bp.route('/trellises')
+def trellises():
+    # Redirect to solar-shades - trellises and medallions are part of the integrated shade structure system
+    return redirect(url_for('.solar_shades'))
+
+@pages_bp.route('/fence-map')
+def fence_map():
+    # Redirect to new interactive fence map
+    return redirect('/interactive-fence-map')
+
+@pages_bp.route('/interactive-fence-map')
+def interactive_fence_map():
+    # Serve the standalone interactive fence map with medallion customization
+    return send_file('interactive-fence-map.html')
+
+@pages_bp.route('/rhino-viewer')
+def rhino_viewer():
+    # 3DM file viewer using Three.js + rhino3dm.js
+    return send_file('rhino-viewer.html')
+
+@pages_bp.route('/rhino-file/<path:filename>')
+def serve_rhino_file(filename):
+    # Serve .3dm files from the user's Desktop for viewing
+    desktop_path = os.path.expanduser('~/Desktop')
+    file_path = os.path.join(desktop_path, filename)
+    if os.path.exists(file_path) and filename.endswith('.3dm'):
+        return send_file(file_path, mimetype='application/octet-stream')
+    return jsonify({'error': 'File not found'}), 404
+
+@pages_bp.route('/customize/<project_id>')
+def customize_project(project_id):
+    # Placeholder route for project customization page
+    return render_template('fence_map.html')
+
+@pages_bp.route('/design-library')
+def design_library():
+    # Searchable design element library for Alley 3
+    return render_template('design_library.html')
+
+@pages_bp.route('/innovation-alleys-map')
+def innovation_alleys_map():
+    # 12 Innovation Alleys themed map
+    return render_template('innovation_alleys_map.html')
+
+@pages_bp.route('/live-dashboard')
+def live_dashboard():
+    # Live data tracking dashboard
+    return render_template('live_dashboard.html')
+
+@pages_bp.route('/digital-twin')
+@pages_bp.route('/unreal-viewer')  # Legacy route for compatibility
+def digital_twin():
+    # Digital Twin - Unreal Engine Pixel Streaming viewer
+    return render_template('unreal_viewer.html')
+
+@pages_bp.route('/explore-alleys')
+def explore_alleys():
+    """Legacy route - redirect to visualization studio"""
+    return redirect('/visualization-studio')
@@ -0,0 +1,270 @@
+"""
+Parameter sweeps over alley designs
+A sweep takes value ranges for design parameters (canopy width, tree
+count, permeable-pavement share, ...), runs the impact model over their
+Cartesian product in a process pool and streams results back chunk by
+chunk as they finish. Workers receive flat index ranges into the product,
+not expanded designs, so the work units stay tiny. The Pareto-optimal
+designs can be saved as Scenario rows.
+"""
+import json
+import math
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from impact_model import simulate, layer_spec, LAYER_TYPES, MAX_FEATURES
+from comparison_engine import METRIC_DIRECTIONS
+
+SWEEP_WORKERS = int(os.environ.get('SWEEP_WORKERS', str(os.cpu_count() or 1)))
+SWEEP_CHUNK_SIZE = int(os.environ.get('SWEEP_CHUNK_SIZE', '64'))
+SWEEP_MAX_COMBINATIONS = int(os.environ.get('SWEEP_MAX_COMBINATIONS', '20000'))
+
+PARAMETER_ALIASES = {
+    'canopy_width': 'canopy.width',
+    'trellis_width': 'trellis.width',
+    'tree_count': 'trees.count',
+    'tree_canopy_diameter': 'trees.canopy_diameter',
+    'permeable_share': 'permeable_pavement.share',
+    'bioswale_share': 'bioswales.share',
+    'rain_garden_count': 'rain_gardens.count'
+}
+# A layer drops out of the design when one of these is swept to zero
+PRESENCE_ATTRIBUTES = ('width', 'count', 'share')
+
+OBJECTIVE_DIRECTIONS = dict(METRIC_DIRECTIONS, water_capture=1, surface_temperature=-1)
+SIMULATED_METRICS = ('temperature', 'shade_coverage', 'green_space', 'water_runoff', 'water_capture',
+                     'surface_temperature')
+DEFAULT_OBJECTIVES = ('temperature', 'water_runoff', 'shade_coverage')
+
+
+class SweepError(ValueError):
+    """Raised for a sweep request that cannot run"""
+
+
+def _values(name, spec):
+    """[v, ...], {'values': [...]} or {'start', 'stop', 'step'} (stop inclusive)"""
+    if isinstance(spec, dict) and 'values' in spec:
+        spec = spec['values']
+    if isinstance(spec, dict):
+        try:
+            start, stop, step = float(spec['start']), float(spec['stop']), float(spec.get('step', 1))
+        except (KeyError, TypeError, ValueError):
+            raise SweepError(f"{name}: a range needs numeric start, stop and step")
+        if step <= 0 or stop < start:
+            raise SweepError(f'{name}: step must be positive and stop at least start')
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        values = [round(start + i * step, 6) for i in range(count)]
+    elif isinstance(spec, list):
+        values = spec
+    else:
+        raise SweepError(f'{name}: give a list of values or a start/stop/step range')
+    if not values or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        raise SweepError(f'{name}: values must be a non-empty list of numbers')
+    return [int(v) if float(v).is_integer() else float(v) for v in values]
+
+
+def parse_parameters(spec):
+    """{name: values} -> ordered [(name, 'layer.attribute', [values])]"""
+    if not isinstance(spec, dict) or not spec:
+        raise SweepError('parameters must be an object of name -> values')
+    parameters = []
+    for name, values in spec.items():
+        target = PARAMETER_ALIASES.get(name, name)
+        layer, _, attribute = target.partition('.')
+        if layer not in LAYER_TYPES or not attribute:
+            raise SweepError(
+                f"Unknown parameter '{name}' (use {', '.join(PARAMETER_ALIASES)} or <layer>.<attribute>)"
+            )
+        values = _values(name, values)
+        if attribute == 'count' and not all(0 <= v <= MAX_FEATURES for v in values):
+            raise SweepError(f'{name}: counts must be between 0 and {MAX_FEATURES}')
+        parameters.append((name, target, values))
+    total = math.prod(len(values) for _, _, values in parameters)
+    if total > SWEEP_MAX_COMBINATIONS:
+        raise SweepError(f'{total} combinations exceeds the limit of {SWEEP_MAX_COMBINATIONS}')
+    return parameters
+
+
+def parse_objectives(spec):
+    objectives = [o.strip() for o in spec.split(',')] if isinstance(spec, str) else list(spec or DEFAULT_OBJECTIVES)
+    for objective in objectives:
+        if objective not in OBJECTIVE_DIRECTIONS or objective not in SIMULATED_METRICS:
+            raise SweepError(f"Unknown objective '{objective}' (use {', '.join(SIMULATED_METRICS)})")
+    if not objectives:
+        raise SweepError('At least one objective is required')
+    return objectives
+
+
+def design_layers(base_layers, targets, combination):
+    """Base layers with the swept attributes applied; swept layers override base ones of the same type"""
+    overrides = {}
+    for target, value in zip(targets, combination):
+        layer, _, attribute = target.partition('.')
+        overrides.setdefault(layer, {})[attribute] = value
+
+    layers = []
+    for layer in base_layers or []:
+        spec = layer_spec(layer)
+        if spec['type'] not in overrides:
+            layers.append(layer)
+        elif not isinstance(layer, str):
+            overrides[spec['type']] = {**{k: v for k, v in spec.items() if k != 'type'}, **overrides[spec['type']]}
+    for kind, attributes in overrides.items():
+        if any(attributes.get(a) == 0 for a in PRESENCE_ATTRIBUTES):
+            continue
+        layers.append({'type': kind, **attributes})
+    return layers
+
+
+def run_chunk(base, targets, value_lists, start, stop):
+    """Worker entry point: simulate the designs at flat indexes [start, stop) of the product"""
+    shape = tuple(len(values) for values in value_lists)
+    results = []
+    for index in range(start, stop):
+        position = np.unravel_index(index, shape)
+        combination = [values[i] for values, i in zip(value_lists, position)]
+        layers = design_layers(base['layers'], targets, combination)
+        impact = simulate(base['dimensions'], layers, base['environmental_data'])
+        results.append({'index': index, 'values': combination, 'metrics': impact['metrics']})
+    return results
+
+
+def pareto_front(matrix, directions):
+    """
+    Indexes of non-dominated rows. matrix is (designs, objectives); a design
+    is dominated when another is at least as good everywhere and better somewhere.
+    """
+    oriented = np.asarray(matrix, dtype=float) * np.asarray(directions, dtype=float)
+    n = len(oriented)
+    dominated = np.zeros(n, dtype=bool)
+    block = max(1, 4_000_000 // max(n * oriented.shape[1], 1))
+    for start in range(0, n, block):
+        rows = oriented[start:start + block]
+        at_least = (oriented[None, :, :] >= rows[:, None, :]).all(axis=2)
+        better = (oriented[None, :, :] > rows[:, None, :]).any(axis=2)
+        dominated[start:start + block] = (at_least & better).any(axis=1)
+    # Keep one of each set of identical designs
+    front = np.flatnonzero(~dominated)
+    _, first = np.unique(oriented[front], axis=0, return_index=True)
+    return front[np.sort(first)]
+
+
+class ParameterSweep:
+    """Runs sweeps on a process pool shared by every request of this worker"""
+
+    def __init__(self, workers=SWEEP_WORKERS, chunk_size=SWEEP_CHUNK_SIZE):
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def _executor(self):
+        with self.lock:
+            if self.pool is None:
+                # spawn: forking a process that runs eventlet and the SQLAlchemy pool is not safe
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self.pool
+
+    def shutdown(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+                self.pool = None
+
+    def chunks(self, total):
+        # Several chunks per worker so a slow chunk does not leave cores idle
+        size = max(1, min(self.chunk_size, math.ceil(total / (self.workers * 4))))
+        return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+    def run(self, base, parameters):
+        """Yield lists of results as chunks finish, in completion order"""
+        targets = [target for _, target, _ in parameters]
+        value_lists = [values for _, _, values in parameters]
+        total = math.prod(len(values) for values in value_lists)
+        chunks = self.chunks(total)
+        if self.workers == 1 or len(chunks) == 1:
+            for start, stop in chunks:
+                yield run_chunk(base, targets, value_lists, start, stop)
+            return
+        executor = self._executor()
+        futures = [executor.submit(run_chunk, base, targets, value_lists, start, stop) for start, stop in chunks]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def stream(self, base, parameters, objectives, persist=True, user_id=None):
+        """
+        NDJSON events: 'start', one 'results' per finished chunk, then
+        'pareto' with the non-dominated designs (and their scenario ids when persisted)
+        """
+        names = [name for name, _, _ in parameters]
+        total = math.prod(len(values) for _, _, values in parameters)
+        sweep_id = f"sweep-{base['alley_id']}-{uuid.uuid4().hex[:8]}"
+        yield json.dumps({
+            'event': 'start', 'sweep_id': sweep_id, 'combinations': total,
+            'parameters': {name: values for name, _, values in parameters},
+            'objectives': objectives, 'workers': self.workers
+        }) + '\n'
+
+        results = []
+        try:
+            for chunk in self.run(base, parameters):
+                for result in chunk:
+                    result['parameters'] = dict(zip(names, result.pop('values')))
+                results.extend(chunk)
+                yield json.dumps({'event': 'results', 'results': chunk}) + '\n'
+
+            results.sort(key=lambda r: r['index'])
+            matrix = [[r['metrics'][o] for o in objectives] for r in results]
+            front = [results[i] for i in pareto_front(matrix, [OBJECTIVE_DIRECTIONS[o] for o in objectives])]
+            report = None
+            if persist:
+                report = self.persist(sweep_id, base, parameters, front, user_id)
+            print(f"[Sweep] {sweep_id}: {total} designs, {len(front)} on the Pareto front")
+            yield json.dumps({'event': 'pareto', 'sweep_id': sweep_id, 'pareto': front, 'persisted': report}) + '\n'
+        except Exception as e:
+            print(f"[Sweep] {sweep_id} failed: {e}")
+            yield json.dumps({'event': 'error', 'sweep_id': sweep_id, 'error': str(e)}) + '\n'
+
+    def persist(self, sweep_id, base, parameters, front, user_id=None):
+        """Save the Pareto designs as scenarios in one bulk import"""
+        from scenario_bulk import BulkImport
+
+        targets = [target for _, target, _ in parameters]
+        importer = BulkImport(user_id=user_id)
+        for line_number, result in enumerate(front, start=1):
+            scenario_id = f"{sweep_id}-{result['index']}"
+            settings = ', '.join(f'{k}={v}' for k, v in result['parameters'].items())
+            importer.feed(line_number, json.dumps({
+                'id': scenario_id,
+                'name': f"{base['name']} ({settings})",
+                'description': f'Pareto-optimal design from parameter sweep {sweep_id}',
+                'type': 'concept',
+                'alley_id': base['alley_id'],
+                'location': base['location'],
+                'dimensions': base['dimensions'],
+                'phase': 'Planning',
+                'layers': design_layers(base['layers'], targets, list(result['parameters'].values())),
+                'environmental_data': {
+                    **(base['environmental_data'] or {}),
+                    **{k: v for k, v in result['metrics'].items() if k != 'surface_temperature'},
+                    'data_source': 'Parameter sweep impact simulation',
+                    'sweep': {'id': sweep_id, 'parameters': result['parameters']}
+                },
+                'is_public': False
+            }))
+            result['scenario_id'] = scenario_id
+        importer.flush()
+        return importer.report()
+
+
+# Create global instance
+parameter_sweep = ParameterSweep()
@@ -0,0 +1,267 @@
+"""
+Presence and cursor tracking for the co-design rooms
+Cursor and status updates are kept in memory, broadcast to each room at a
+throttled rate, and flushed to the collaborations table in periodic batches.
+When a batch fails it is retried row by row: rows the database rejects
+(a scenario_id with no scenarios row, for instance) are dropped, so one
+bad client cannot stop everyone else's presence from being written.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Collaboration
+from backpressure import flow_control
+
+BROADCAST_INTERVAL = float(os.environ.get('PRESENCE_BROADCAST_INTERVAL', '0.1'))  # seconds
+FLUSH_INTERVAL = float(os.environ.get('PRESENCE_FLUSH_INTERVAL', '5'))
+IDLE_AFTER = float(os.environ.get('PRESENCE_IDLE_AFTER', '30'))
+EXPIRE_AFTER = float(os.environ.get('PRESENCE_EXPIRE_AFTER', '120'))
+
+STATUSES = ('viewing', 'editing', 'idle')
+
+
+class PresenceTracker:
+    """In-memory presence for every collaboration connection on this worker"""
+
+    def __init__(self):
+        self.sessions = {}        # sid -> presence entry
+        self.dirty_rooms = {}     # alley_id -> set of sids changed since last broadcast
+        self.left_rooms = {}      # alley_id -> set of sids that left since last broadcast
+        self.dirty_rows = set()   # sids whose collaborations row needs writing
+        self.removed_rows = set() # sids whose collaborations row should be deleted
+        self.rejected = set()     # sids whose row the database refused; not retried until they rejoin
+        self.lock = threading.Lock()
+        self.started = False
+        self.last_flush = time.monotonic()
+
+    def _entry_dict(self, sid, entry):
+        return {
+            'session_id': sid,
+            'user_id': entry['user_id'],
+            'username': entry['username'],
+            'scenario_id': entry['scenario_id'],
+            'status': entry['status'],
+            'cursor_position': entry['cursor'],
+            'last_activity': datetime.utcfromtimestamp(entry['last_activity']).isoformat()
+        }
+
+    def _mark(self, sid, entry):
+        self.dirty_rooms.setdefault(entry['alley_id'], set()).add(sid)
+        if entry['user_id'] and entry['scenario_id'] and sid not in self.rejected:
+            self.dirty_rows.add(sid)
+
+    def join(self, sid, alley_id, scenario_id=None, user_id=None, username=None):
+        with self.lock:
+            entry = {
+                'alley_id': alley_id,
+                'scenario_id': scenario_id,
+                'user_id': user_id,
+                'username': username,
+                'status': 'viewing',
+                'cursor': None,
+                'last_activity': time.time()
+            }
+            self.sessions[sid] = entry
+            self.removed_rows.discard(sid)
+            self.rejected.discard(sid)
+            self._mark(sid, entry)
+
+    def update(self, sid, cursor=None, status=None):
+        """Record a cursor move or status change; returns False for unknown sessions"""
+        with self.lock:
+            entry = self.sessions.get(sid)
+            if entry is None:
+                return False
+            if cursor is not None:
+                entry['cursor'] = cursor
+            if status in STATUSES:
+                entry['status'] = status
+            elif entry['status'] == 'idle':
+                entry['status'] = 'viewing'
+            entry['last_activity'] = time.time()
+            self._mark(sid, entry)
+            return True
+
+    def touch(self, sid, status='editing'):
+        return self.update(sid, status=status)
+
+    def leave(self, sid):
+        with self.lock:
+            self._drop(sid)
+
+    def _drop(self, sid):
+        entry = self.sessions.pop(sid, None)
+        if entry is None:
+            return
+        self.left_rooms.setdefault(entry['alley_id'], set()).add(sid)
+        self.dirty_rooms.get(entry['alley_id'], set()).discard(sid)
+        self.dirty_rows.discard(sid)
+        if entry['user_id'] and entry['scenario_id'] and sid not in self.rejected:
+            self.removed_rows.add(sid)
+        self.rejected.discard(sid)
+
+    def room_state(self, alley_id):
+        with self.lock:
+            return [
+                self._entry_dict(sid, entry)
+                for sid, entry in self.sessions.items()
+                if entry['alley_id'] == alley_id
+            ]
+
+    def active_in_scenario(self, scenario_id):
+        with self.lock:
+            return [
+                self._entry_dict(sid, entry)
+                for sid, entry in self.sessions.items()
+                if entry['scenario_id'] == scenario_id
+            ]
+
+    def expire_idle(self, now=None):
+        """Mark quiet sessions idle and drop the ones past the expiry window"""
+        now = now or time.time()
+        with self.lock:
+            for sid, entry in list(self.sessions.items()):
+                quiet = now - entry['last_activity']
+                if quiet >= EXPIRE_AFTER:
+                    self._drop(sid)
+                elif quiet >= IDLE_AFTER and entry['status'] != 'idle':
+                    entry['status'] = 'idle'
+                    self._mark(sid, entry)
+
+    def drain_broadcasts(self):
+        """Changed and departed sessions per room since the last broadcast"""
+        with self.lock:
+            updates = {}
+            for alley_id in set(self.dirty_rooms) | set(self.left_rooms):
+                users = [
+                    self._entry_dict(sid, self.sessions[sid])
+                    for sid in self.dirty_rooms.get(alley_id, ())
+                    if sid in self.sessions
+                ]
+                left = sorted(self.left_rooms.get(alley_id, ()))
+                if users or left:
+                    updates[alley_id] = {'alley_id': alley_id, 'users': users, 'left': left}
+            self.dirty_rooms = {}
+            self.left_rooms = {}
+            return updates
+
+    def _write(self, pending, removed):
+        sids = list(pending) + list(removed)
+        rows = {row.session_id: row for row in Collaboration.query.filter(Collaboration.session_id.in_(sids))}
+        for sid in removed:
+            if sid in rows:
+                db.session.delete(rows[sid])
+        for sid, entry in pending.items():
+            row = rows.get(sid)
+            if row is None:
+                row = Collaboration(session_id=sid)
+                db.session.add(row)
+            row.scenario_id = entry['scenario_id']
+            row.user_id = entry['user_id']
+            row.status = entry['status']
+            row.cursor_position = entry['cursor']
+            row.last_activity = datetime.utcfromtimestamp(entry['last_activity'])
+        db.session.commit()
+
+    def _requeue(self, pending, removed):
+        with self.lock:
+            self.dirty_rows |= {sid for sid in pending if sid in self.sessions}
+            self.removed_rows |= set(removed)
+
+    def flush(self):
+        """Write all pending presence changes to the collaborations table in one transaction"""
+        with self.lock:
+            pending = {sid: dict(self.sessions[sid]) for sid in self.dirty_rows if sid in self.sessions}
+            removed = set(self.removed_rows)
+            self.dirty_rows = set()
+            self.removed_rows = set()
+        if not pending and not removed:
+            return 0
+
+        try:
+            self._write(pending, removed)
+            return len(pending) + len(removed)
+        except IntegrityError as e:
+            db.session.rollback()
+            print(f"[Presence] Batch flush rejected, retrying row by row: {e.orig}")
+        except Exception as e:
+            db.session.rollback()
+            print(f"[Presence] Flush failed, retrying next cycle: {e}")
+            self._requeue(pending, removed)
+            return 0
+
+        written = 0
+        for sid in dict.fromkeys(list(removed) + list(pending)):
+            one_pending = {sid: pending[sid]} if sid in pending else {}
+            one_removed = {sid} if sid in removed else set()
+            try:
+                self._write(one_pending, one_removed)
+                written += 1
+            except IntegrityError as e:
+                db.session.rollback()
+                with self.lock:
+                    self.rejected.add(sid)
+                entry = pending.get(sid, {})
+                print(f"[Presence] Dropping presence row for {sid} (scenario {entry.get('scenario_id')}): {e.orig}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"[Presence] Flush failed for {sid}, retrying next cycle: {e}")
+                self._requeue(one_pending, one_removed)
+        return written
+
+    def start(self, app, socketio):
+        """Start the broadcast/flush loop once per worker"""
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        socketio.start_background_task(self._run, app, socketio)
+
+    def _run(self, app, socketio):
+        while True:
+            socketio.sleep(BROADCAST_INTERVAL)
+            try:
+                self.expire_idle()
+                for alley_id, payload in self.drain_broadcasts().items():
+                    # Held-back clients get the full room state when they resync
+                    socketio.emit('presence_state', payload, room=alley_id,
+                                  skip_sid=flow_control.held_sids(alley_id) or None)
+                if time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+                    self.last_flush = time.monotonic()
+                    with app.app_context():
+                        self.flush()
+            except Exception as e:
+                print(f"[Presence] Loop error: {e}")
+
+
+def active_collaborators(scenario_id):
+    """
+    Everyone active in a scenario: this worker's live sessions plus rows
+    other workers flushed recently.
+    """
+    users = {entry['session_id']: entry for entry in presence_tracker.active_in_scenario(scenario_id)}
+    cutoff = datetime.utcnow() - timedelta(seconds=EXPIRE_AFTER)
+    rows = Collaboration.query.filter(
+        Collaboration.scenario_id == scenario_id,
+        Collaboration.last_activity >= cutoff
+    ).all()
+    for row in rows:
+        if row.session_id not in users:
+            users[row.session_id] = {
+                'session_id': row.session_id,
+                'user_id': row.user_id,
+                'username': None,
+                'scenario_id': row.scenario_id,
+                'status': row.status,
+                'cursor_position': row.cursor_position,
+                'last_activity': row.last_activity.isoformat()
+            }
+    return list(users.values())
+
+
+# Create global instance
+presence_tracker = PresenceTracker()
@@ -0,0 +1,175 @@
+"""
+Room registry for peer streaming room codes
+Rooms live in a small SQLite file so every gunicorn worker sees the same
+codes. Each room expires unless its creator sends heartbeats, and codes come
+from a counter pushed through a permutation of the code space, so handing
+one out never needs a retry loop.
+"""
+import os
+import random
+import sqlite3
+import string
+import time
+from datetime import datetime
+
+REGISTRY_PATH = os.environ.get(
+    'ROOM_REGISTRY_PATH',
+    os.path.join(os.path.dirname(__file__), 'instance', 'rooms.db')
+)
+ROOM_TTL = int(os.environ.get('ROOM_TTL', '900'))  # seconds without a heartbeat
+MAX_PAGE_SIZE = 100
+
+CODE_PREFIX = 'ALLEY-'
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+CODE_LENGTH = 4
+CODE_SPACE = len(CODE_ALPHABET) ** CODE_LENGTH
+# Coprime with CODE_SPACE (36^4 = 2^8 * 3^8), so n -> n * STEP + offset visits every code once
+CODE_STEP = 1_299_721
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rooms (
+    code TEXT PRIMARY KEY,
+    ip TEXT NOT NULL,
+    creator_ip TEXT,
+    created TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rooms_expires_at ON rooms (expires_at);
+CREATE TABLE IF NOT EXISTS room_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class RoomRegistry:
+    """Worker-shared streaming rooms with TTL expiry"""
+
+    def __init__(self, path=REGISTRY_PATH, ttl=ROOM_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.initialized = False
+
+    def _connect(self):
+        if not self.initialized:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self.initialized:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            conn.execute(
+                "INSERT OR IGNORE INTO room_meta (key, value) VALUES ('code_offset', ?)",
+                (random.randrange(CODE_SPACE),)
+            )
+            conn.execute("INSERT OR IGNORE INTO room_meta (key, value) VALUES ('code_counter', 0)")
+            self.initialized = True
+        return conn
+
+    def _code_for(self, counter, offset):
+        index = (counter * CODE_STEP + offset) % CODE_SPACE
+        chars = []
+        for _ in range(CODE_LENGTH):
+            index, digit = divmod(index, len(CODE_ALPHABET))
+            chars.append(CODE_ALPHABET[digit])
+        return CODE_PREFIX + ''.join(chars)
+
+    def _room_dict(self, row):
+        return {
+            'code': row['code'],
+            'ip': row['ip'],
+            'created': row['created'],
+            'expires_at': datetime.utcfromtimestamp(row['expires_at']).isoformat()
+        }
+
+    def create(self, ip, creator_ip=None):
+        """Register a room and return it with its new code"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM rooms WHERE expires_at <= ?', (now,))
+            offset = conn.execute("SELECT value FROM room_meta WHERE key = 'code_offset'").fetchone()[0]
+            counter = conn.execute("SELECT value FROM room_meta WHERE key = 'code_counter'").fetchone()[0]
+            # The permutation only repeats after CODE_SPACE rooms; skip codes still live from a previous lap
+            while True:
+                code = self._code_for(counter, offset)
+                counter += 1
+                if conn.execute('SELECT 1 FROM rooms WHERE code = ?', (code,)).fetchone() is None:
+                    break
+            conn.execute("UPDATE room_meta SET value = ? WHERE key = 'code_counter'", (counter,))
+            conn.execute(
+                'INSERT INTO rooms (code, ip, creator_ip, created, expires_at) VALUES (?, ?, ?, ?, ?)',
+                (code, ip, creator_ip, datetime.now().isoformat(), now + self.ttl)
+            )
+            row = conn.execute('SELECT * FROM rooms WHERE code = ?', (code,)).fetchone()
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return self._room_dict(row)
+
+    def get(self, code):
+        """Live room by code, or None"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT * FROM rooms WHERE code = ? AND expires_at > ?', (code, time.time())
+            ).fetchone()
+        finally:
+            conn.close()
+        return self._room_dict(row) if row else None
+
+    def heartbeat(self, code):
+        """Push a live room's expiry out by another TTL; returns the room or None"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            updated = conn.execute(
+                'UPDATE rooms SET expires_at = ? WHERE code = ? AND expires_at > ?',
+                (now + self.ttl, code, now)
+            ).rowcount
+            row = conn.execute('SELECT * FROM rooms WHERE code = ?', (code,)).fetchone() if updated else None
+        finally:
+            conn.close()
+        return self._room_dict(row) if row else None
+
+    def delete(self, code):
+        conn = self._connect()
+        try:
+            deleted = conn.execute('DELETE FROM rooms WHERE code = ?', (code,)).rowcount
+        finally:
+            conn.close()
+        return deleted > 0
+
+    def list_live(self, after=None, limit=50):
+        """
+        One page of live rooms ordered by code. Pass the returned `next_after`
+        back as `after` for the following page.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT * FROM rooms WHERE expires_at > ? AND code > ? ORDER BY code LIMIT ?',
+                (time.time(), after or '', limit + 1)
+            ).fetchall()
+        finally:
+            conn.close()
+        rooms = [self._room_dict(row) for row in rows[:limit]]
+        next_after = rooms[-1]['code'] if len(rows) > limit else None
+        return rooms, next_after
+
+    def purge_expired(self):
+        conn = self._connect()
+        try:
+            return conn.execute('DELETE FROM rooms WHERE expires_at <= ?', (time.time(),)).rowcount
+        finally:
+            conn.close()
+
+
+# Create global instance
+room_registry = RoomRegistry()
@@ -0,0 +1,266 @@
+"""
+Bulk scenario import and export
+Import reads an NDJSON body line by line and upserts it in batched
+transactions, reporting errors per line instead of failing the whole file.
+Export streams every matching scenario as NDJSON or CSV in keyset batches
+by id, so memory stays flat however many rows match and the connection
+goes back to the pool between batches instead of staying checked out
+for the whole download.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import insert, select, text, update
+
+from models import db, Scenario, ScenarioVersion, SCENARIO_FIELDS, normalize_metrics
+from scenario_listing import filter_scenarios
+from scenario_history import VERSIONED_FIELDS, KIND_KEYFRAME
+
+IMPORT_BATCH_SIZE = int(os.environ.get('SCENARIO_IMPORT_BATCH_SIZE', '200'))
+EXPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+JSON_COLUMNS = ('location', 'dimensions', 'layers', 'environmental_data')
+STRING_FIELDS = ('name', 'description', 'type', 'alley_id', 'phase', 'notes')
+
+
+class ImportRowError(ValueError):
+    """Raised for one NDJSON line that cannot be imported"""
+
+    def __init__(self, message, scenario_id=None):
+        super().__init__(message)
+        self.scenario_id = scenario_id
+
+
+def _parse_row(line):
+    try:
+        data = json.loads(line)
+    except ValueError as e:
+        raise ImportRowError(f'Invalid JSON: {e}')
+    if not isinstance(data, dict):
+        raise ImportRowError('Each line must be a JSON object')
+    scenario_id = data.get('id')
+    if not scenario_id or not isinstance(scenario_id, str):
+        raise ImportRowError('Scenario id (string) required')
+    for field in STRING_FIELDS:
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise ImportRowError(f'{field} must be a string', scenario_id)
+    if 'is_public' in data and not isinstance(data['is_public'], bool):
+        raise ImportRowError('is_public must be a boolean', scenario_id)
+    if 'layers' in data and not isinstance(data['layers'], list):
+        raise ImportRowError('layers must be a list', scenario_id)
+    return data
+
+
+class BulkImport:
+    """One NDJSON import: feed it lines, then read the report"""
+
+    def __init__(self, user_id=None, batch_size=IMPORT_BATCH_SIZE):
+        self.user_id = user_id
+        self.batch_size = max(1, batch_size)
+        self.batch = []   # (line number, row)
+        self.inserted = 0
+        self.updated = 0
+        self.processed = 0
+        self.error_count = 0
+        self.errors = []
+
+    def _error(self, line_number, scenario_id, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'id': scenario_id, 'error': message})
+
+    def feed(self, line_number, line):
+        line = line.strip()
+        if not line:
+            return
+        self.processed += 1
+        try:
+            row = _parse_row(line)
+        except ImportRowError as e:
+            self._error(line_number, e.scenario_id, str(e))
+            return
+        self.batch.append((line_number, row))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def run(self, lines):
+        for line_number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                try:
+                    line = line.decode('utf-8')
+                except UnicodeDecodeError as e:
+                    self.processed += 1
+                    self._error(line_number, None, f'Invalid UTF-8: {e}')
+                    continue
+            self.feed(line_number, line)
+        self.flush()
+        return self.report()
+
+    def flush(self):
+        """Upsert the pending batch in one transaction, falling back to row by row on failure"""
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, []
+        # The last occurrence of an id within a batch wins
+        rows = {}
+        for line_number, row in batch:
+            rows[row['id']] = (line_number, row)
+        try:
+            inserted, updated = self._upsert(list(rows.values()))
+            db.session.commit()
+            self.inserted += inserted
+            self.updated += updated
+        except Exception:
+            db.session.rollback()
+            for entry in rows.values():
+                try:
+                    inserted, updated = self._upsert([entry])
+                    db.session.commit()
+                    self.inserted += inserted
+                    self.updated += updated
+                except Exception as e:
+                    db.session.rollback()
+                    self._error(entry[0], entry[1]['id'], (str(e).splitlines() or [type(e).__name__])[0])
+
+    def _upsert(self, entries):
+        now = datetime.utcnow()
+        ids = [row['id'] for _, row in entries]
+        existing = {
+            sid: version for sid, version in db.session.execute(
+                select(Scenario.id, Scenario.version).where(Scenario.id.in_(ids))
+            )
+        }
+
+        inserts, updates, keyframes, stale = [], [], [], []
+        for _, row in entries:
+            values = {field: row[field] for field in VERSIONED_FIELDS if field in row}
+            if row['id'] in existing:
+                version = (existing[row['id']] or 1) + 1
+                values.update({'id': row['id'], 'version': version, 'updated_at': now})
+                # Bulk statements skip mapper events, so the metric columns are filled here
+                if 'environmental_data' in row:
+                    values.update(normalize_metrics(row['environmental_data']))
+                updates.append(values)
+                stale.append({'scenario_id': row['id'], 'version_number': version - 1})
+            else:
+                version = 1
+                values = {
+                    'id': row['id'],
+                    'name': row.get('name') or 'Imported Scenario',
+                    'description': row.get('description', ''),
+                    'type': row.get('type') or 'baseline',
+                    'alley_id': row.get('alley_id') or 'unknown',
+                    'location': row.get('location'),
+                    'dimensions': row.get('dimensions'),
+                    'phase': row.get('phase', 'Planning'),
+                    'layers': row.get('layers', []),
+                    'environmental_data': row.get('environmental_data'),
+                    'notes': row.get('notes', ''),
+                    'is_public': row.get('is_public', False),
+                    'created_by': self.user_id,
+                    'created_at': now,
+                    'updated_at': now,
+                    'version': version,
+                    **normalize_metrics(row.get('environmental_data'))
+                }
+                inserts.append(values)
+            keyframes.append((row['id'], version))
+
+        if inserts:
+            db.session.execute(insert(Scenario), inserts)
+        if updates:
+            # Imported versions start a new branch of history, like any other edit
+            db.session.execute(
+                text('DELETE FROM scenario_versions WHERE scenario_id = :scenario_id '
+                     'AND version_number > :version_number'),
+                stale
+            )
+            db.session.execute(update(Scenario), updates)
+
+        # Each imported row is recorded as a keyframe of its full state
+        states = {
+            row.id: {field: getattr(row, field) for field in VERSIONED_FIELDS}
+            for row in db.session.execute(
+                select(*[getattr(Scenario, f) for f in ('id',) + VERSIONED_FIELDS]).where(Scenario.id.in_(ids))
+            )
+        }
+        db.session.execute(insert(ScenarioVersion), [
+            {
+                'scenario_id': sid,
+                'version_number': version,
+                'data': {'kind': KIND_KEYFRAME, 'state': states[sid]},
+                'change_description': 'Bulk import',
+                'created_at': now,
+                'created_by': self.user_id
+            }
+            for sid, version in keyframes
+        ])
+        return len(inserts), len(updates)
+
+    def report(self):
+        return {
+            'processed': self.processed,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors
+        }
+
+
+def _export_rows(args):
+    """Matching scenarios as plain dicts, fetched in batches without touching the ORM identity map"""
+    columns = [getattr(Scenario, field) for field in SCENARIO_FIELDS]
+    last_id = None
+    while True:
+        query = filter_scenarios(select(*columns), args)
+        if last_id is not None:
+            query = query.where(Scenario.id > last_id)
+        rows = db.session.execute(query.order_by(Scenario.id).limit(EXPORT_BATCH_SIZE)).all()
+        # Release the connection before the batch is written to a possibly slow client
+        db.session.close()
+        for row in rows:
+            yield _export_record(row)
+        if len(rows) < EXPORT_BATCH_SIZE:
+            return
+        last_id = rows[-1].id
+
+
+def _export_record(row):
+    record = dict(zip(SCENARIO_FIELDS, row))
+    for field in ('created_at', 'updated_at'):
+        if record[field] is not None:
+            record[field] = record[field].isoformat()
+    if record['layers'] is None:
+        record['layers'] = []
+    return record
+
+
+def export_ndjson(args):
+    for record in _export_rows(args):
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def export_csv(args):
+    """One CSV line per scenario; JSON columns are embedded as JSON text"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(SCENARIO_FIELDS)
+    yield drain()
+    for record in _export_rows(args):
+        writer.writerow([
+            json.dumps(record[field], separators=(',', ':')) if field in JSON_COLUMNS else record[field]
+            for field in SCENARIO_FIELDS
+        ])
+        yield drain()
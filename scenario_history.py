@@ -0,0 +1,204 @@
+"""
+Version history for database scenarios
+Each edit is stored in scenario_versions as a compact JSON diff against the
+previous version, with a full keyframe every KEYFRAME_INTERVAL versions, so
+history grows with the size of the edits instead of the size of the scenario.
+Any version is rebuilt from its nearest keyframe plus at most
+KEYFRAME_INTERVAL - 1 diffs.
+
+Undo and redo move scenario.version along the stored history. A new edit
+made after an undo discards the versions that could have been redone.
+"""
+import json
+import os
+
+from models import db, ScenarioVersion
+
+KEYFRAME_INTERVAL = int(os.environ.get('SCENARIO_KEYFRAME_INTERVAL', '20'))
+
+VERSIONED_FIELDS = ('name', 'description', 'type', 'alley_id', 'location', 'dimensions',
+                    'phase', 'layers', 'environmental_data', 'notes', 'is_public')
+
+KIND_KEYFRAME = 'keyframe'
+KIND_DELTA = 'delta'
+
+# Diff ops: ['s', path, value] set, ['d', path] delete key, ['t', path, length] truncate list
+
+
+def diff_states(old, new, path=None):
+    """Ops that turn `old` into `new`, descending into dicts and lists"""
+    path = path or []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key, value in new.items():
+            if key not in old:
+                ops.append(['s', path + [key], value])
+            else:
+                ops.extend(diff_states(old[key], value, path + [key]))
+        for key in old:
+            if key not in new:
+                ops.append(['d', path + [key]])
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        for index in range(min(len(old), len(new))):
+            ops.extend(diff_states(old[index], new[index], path + [index]))
+        for index in range(len(old), len(new)):
+            ops.append(['s', path + [index], new[index]])
+        if len(new) < len(old):
+            ops.append(['t', path, len(new)])
+        return ops
+    if old == new and type(old) is type(new):
+        return []
+    return [['s', path, new]]
+
+
+def apply_diff(state, ops):
+    """Apply diff ops to a state (in place where possible); returns the new state"""
+    for op in ops:
+        kind, path = op[0], op[1]
+        if not path:
+            if kind == 's':
+                state = op[2]
+            continue
+        parent = state
+        for key in path[:-1]:
+            parent = parent[key]
+        key = path[-1]
+        if kind == 's':
+            if isinstance(parent, list) and key == len(parent):
+                parent.append(op[2])
+            else:
+                parent[key] = op[2]
+        elif kind == 'd':
+            parent.pop(key, None)
+        elif kind == 't':
+            target = parent[key]
+            del target[op[2]:]
+    return state
+
+
+class ScenarioHistory:
+    """Delta-encoded scenario_versions rows"""
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self.keyframe_interval = max(1, keyframe_interval)
+
+    def state_of(self, scenario):
+        """Detached copy of the versioned fields"""
+        return json.loads(json.dumps({field: getattr(scenario, field) for field in VERSIONED_FIELDS}))
+
+    def _is_keyframe_slot(self, version_number):
+        return (version_number - 1) % self.keyframe_interval == 0
+
+    def _row(self, scenario_id, version_number):
+        return ScenarioVersion.query.filter_by(
+            scenario_id=scenario_id, version_number=version_number
+        ).first()
+
+    def _add_row(self, scenario_id, version_number, data, description, user_id):
+        db.session.add(ScenarioVersion(
+            scenario_id=scenario_id,
+            version_number=version_number,
+            data=data,
+            change_description=description,
+            created_by=user_id
+        ))
+
+    def record_initial(self, scenario, description='Created', user_id=None):
+        """Keyframe for a newly created scenario"""
+        self._add_row(scenario.id, scenario.version or 1,
+                      {'kind': KIND_KEYFRAME, 'state': self.state_of(scenario)}, description, user_id)
+
+    def record_edit(self, scenario, before, description=None, user_id=None):
+        """
+        Store the edit already applied to `scenario`, where `before` is
+        state_of(scenario) taken before the change. Bumps scenario.version.
+        Returns False (and leaves the version alone) when nothing changed.
+        """
+        after = self.state_of(scenario)
+        ops = diff_states(before, after)
+        if not ops:
+            return False
+
+        head = scenario.version or 1
+        # Scenarios saved before history existed get their current state as a base keyframe
+        if self._row(scenario.id, head) is None:
+            self._add_row(scenario.id, head, {'kind': KIND_KEYFRAME, 'state': before}, 'Baseline', user_id)
+        # A fresh edit after undo drops the redo branch
+        ScenarioVersion.query.filter(
+            ScenarioVersion.scenario_id == scenario.id,
+            ScenarioVersion.version_number > head
+        ).delete(synchronize_session=False)
+
+        version_number = head + 1
+        if self._is_keyframe_slot(version_number):
+            data = {'kind': KIND_KEYFRAME, 'state': after}
+        else:
+            data = {'kind': KIND_DELTA, 'ops': ops}
+        self._add_row(scenario.id, version_number, data, description, user_id)
+        scenario.version = version_number
+        return True
+
+    def state_at(self, scenario_id, version_number):
+        """Rebuild a version from its nearest keyframe, or None if it is not stored"""
+        rows = ScenarioVersion.query.filter(
+            ScenarioVersion.scenario_id == scenario_id,
+            ScenarioVersion.version_number <= version_number
+        ).order_by(ScenarioVersion.version_number.desc()).limit(self.keyframe_interval + 1).all()
+        if not rows or rows[0].version_number != version_number:
+            return None
+
+        chain = []
+        for row in rows:
+            chain.append(row)
+            if row.data.get('kind') == KIND_KEYFRAME:
+                break
+        else:
+            return None
+
+        state = json.loads(json.dumps(chain[-1].data['state']))
+        for row in reversed(chain[:-1]):
+            state = apply_diff(state, row.data['ops'])
+        return state
+
+    def _move_to(self, scenario, version_number):
+        state = self.state_at(scenario.id, version_number)
+        if state is None:
+            return False
+        for field in VERSIONED_FIELDS:
+            if field in state:
+                setattr(scenario, field, state[field])
+        scenario.version = version_number
+        return True
+
+    def undo(self, scenario):
+        """Step back one version; returns False when there is nothing to undo"""
+        if (scenario.version or 1) <= 1:
+            return False
+        return self._move_to(scenario, scenario.version - 1)
+
+    def redo(self, scenario):
+        """Step forward to a version undone earlier; returns False when there is none"""
+        return self._move_to(scenario, (scenario.version or 1) + 1)
+
+    def versions(self, scenario_id):
+        """History metadata, oldest first, with the stored size of each row"""
+        rows = ScenarioVersion.query.filter_by(scenario_id=scenario_id).order_by(
+            ScenarioVersion.version_number
+        ).all()
+        return [
+            {
+                'version_number': row.version_number,
+                'kind': row.data.get('kind'),
+                'size': len(json.dumps(row.data, separators=(',', ':'))),
+                'change_description': row.change_description,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'created_by': row.created_by
+            }
+            for row in rows
+        ]
+
+
+# Create global instance
+scenario_history = ScenarioHistory()
@@ -0,0 +1,153 @@
+"""
+Paginated scenario listing for /api/scenarios/db
+Pages are fetched by keyset on (created_at, id), newest first, so each page
+costs the same no matter how deep the client has scrolled. Only the
+requested columns are loaded, which keeps the large JSON columns
+(layers, environmental_data, location) out of list views.
+
+Databases created before the keyset indexes existed get them, and legacy
+rows without a created_at get one, from ensure_listing_indexes() at startup.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_, func, inspect
+from sqlalchemy.orm import load_only
+
+from models import db, Scenario, SCENARIO_FIELDS, SCENARIO_SUMMARY_FIELDS
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+FILTERS = ('alley_id', 'type', 'phase', 'is_public', 'created_by')
+# Stand-in for rows saved without a created_at; they sort as the oldest
+LEGACY_CREATED_AT = datetime(1970, 1, 1)
+
+VIEWS = {
+    'summary': SCENARIO_SUMMARY_FIELDS,
+    'full': SCENARIO_FIELDS
+}
+
+
+class ListingError(ValueError):
+    """Raised for query parameters the listing cannot serve"""
+
+
+def ensure_listing_indexes():
+    """
+    Create the scenarios indexes an older database is missing and give rows
+    without a created_at the legacy timestamp, so keyset pages stay indexed
+    and every row has a cursor. Returns the names of the indexes created.
+    """
+    inspector = inspect(db.engine)
+    if not inspector.has_table(Scenario.__tablename__):
+        return []
+    existing = {index['name'] for index in inspector.get_indexes(Scenario.__tablename__)}
+    created = []
+    for index in Scenario.__table__.indexes:
+        if index.name in existing:
+            continue
+        try:
+            index.create(bind=db.engine, checkfirst=True)
+            created.append(index.name)
+        except Exception as e:
+            print(f"[Scenarios] Could not create index {index.name}: {e}")
+    if created:
+        print(f"[Scenarios] Created indexes {', '.join(created)}")
+
+    filled = Scenario.query.filter(Scenario.created_at.is_(None)).update(
+        {Scenario.created_at: func.coalesce(Scenario.updated_at, LEGACY_CREATED_AT)},
+        synchronize_session=False
+    )
+    db.session.commit()
+    if filled:
+        print(f"[Scenarios] Set created_at on {filled} legacy rows")
+    return created
+
+
+def encode_cursor(scenario):
+    created_at = scenario.created_at or LEGACY_CREATED_AT
+    raw = json.dumps([created_at.isoformat(), scenario.id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, scenario_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(created_at), scenario_id
+    except (ValueError, TypeError) as e:
+        raise ListingError(f'Invalid cursor: {e}')
+
+
+def _parse_bool(value):
+    lowered = value.lower()
+    if lowered in ('1', 'true', 'yes'):
+        return True
+    if lowered in ('0', 'false', 'no'):
+        return False
+    raise ListingError(f'Invalid boolean: {value}')
+
+
+def _requested_fields(args):
+    """Explicit ?fields= wins over ?view=; the primary key is always included"""
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in SCENARIO_FIELDS]
+        if unknown:
+            raise ListingError(f"Unknown fields: {', '.join(unknown)}")
+        return ['id'] + [f for f in dict.fromkeys(fields) if f != 'id']
+    view = args.get('view', 'full')
+    if view not in VIEWS:
+        raise ListingError(f"Unknown view '{view}' (use {', '.join(VIEWS)})")
+    return list(VIEWS[view])
+
+
+def filter_scenarios(query, args):
+    """Apply the equality filters in `args` to a Scenario query or select()"""
+    for name in FILTERS:
+        value = args.get(name)
+        if value is None or value == '':
+            continue
+        if name == 'is_public':
+            value = _parse_bool(value)
+        elif name == 'created_by':
+            try:
+                value = int(value)
+            except ValueError:
+                raise ListingError('created_by must be an integer')
+        query = query.filter(getattr(Scenario, name) == value)
+    return query
+
+
+def list_scenarios(args):
+    """
+    One page of scenarios for the request's query args:
+    limit, cursor, fields or view, plus equality filters on FILTERS.
+    """
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ListingError('limit must be an integer')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    fields = _requested_fields(args)
+
+    # created_at is always loaded because the next cursor is built from it
+    columns = set(fields) | {'id', 'created_at'}
+    query = Scenario.query.options(load_only(*[getattr(Scenario, c) for c in columns]))
+    query = filter_scenarios(query, args)
+
+    if args.get('cursor'):
+        created_at, scenario_id = decode_cursor(args['cursor'])
+        query = query.filter(or_(
+            Scenario.created_at < created_at,
+            and_(Scenario.created_at == created_at, Scenario.id < scenario_id)
+        ))
+
+    rows = query.order_by(Scenario.created_at.desc(), Scenario.id.desc()).limit(limit + 1).all()
+    page = rows[:limit]
+    return {
+        'scenarios': [s.to_dict(fields) for s in page],
+        'count': len(page),
+        'next_cursor': encode_cursor(page[-1]) if len(rows) > limit else None
+    }
@@ -0,0 +1,117 @@
+"""
+SQL range filters and sorting on scenario environmental metrics
+The metrics live in indexed Float columns on the scenarios table, filled
+from environmental_data whenever a scenario is written, so queries like
+"temperature above 90, coolest first" never load the JSON into Python.
+"""
+from sqlalchemy import inspect, text
+
+from models import db, Scenario, SCENARIO_METRICS, normalize_metrics
+from scenario_listing import filter_scenarios, ListingError
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+BACKFILL_BATCH_SIZE = 500
+
+RESULT_FIELDS = ('id', 'name', 'type', 'alley_id', 'phase')
+
+
+def ensure_metric_columns():
+    """
+    Add the metric columns and indexes to a scenarios table created before
+    they existed, then fill them from environmental_data. Returns the
+    number of rows backfilled; does nothing once the columns are present.
+    """
+    inspector = inspect(db.engine)
+    if not inspector.has_table(Scenario.__tablename__):
+        return 0
+    existing = {column['name'] for column in inspector.get_columns(Scenario.__tablename__)}
+    missing = [name for name in SCENARIO_METRICS if name not in existing]
+    if not missing:
+        return 0
+
+    with db.engine.begin() as connection:
+        for name in missing:
+            connection.execute(text(f'ALTER TABLE scenarios ADD COLUMN {name} FLOAT'))
+            connection.execute(text(f'CREATE INDEX IF NOT EXISTS ix_scenarios_{name} ON scenarios ({name})'))
+
+    backfilled = 0
+    last_id = ''
+    while True:
+        rows = db.session.query(Scenario.id, Scenario.environmental_data).filter(
+            Scenario.id > last_id
+        ).order_by(Scenario.id).limit(BACKFILL_BATCH_SIZE).all()
+        if not rows:
+            break
+        db.session.execute(
+            text('UPDATE scenarios SET ' + ', '.join(f'{m} = :{m}' for m in SCENARIO_METRICS) +
+                 ' WHERE id = :id'),
+            [{'id': sid, **normalize_metrics(env)} for sid, env in rows]
+        )
+        db.session.commit()
+        backfilled += len(rows)
+        last_id = rows[-1][0]
+    print(f"[Scenarios] Added metric columns {', '.join(missing)}; backfilled {backfilled} rows")
+    return backfilled
+
+
+def _float_arg(args, name):
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ListingError(f'{name} must be a number')
+
+
+def query_by_metrics(args):
+    """
+    Scenarios matching <metric>_min / <metric>_max ranges plus the listing
+    filters, ordered by ?sort=<metric> (prefix '-' for descending).
+    Rows without a value for the sort metric come last.
+    """
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        offset = int(args.get('offset', 0))
+    except ValueError:
+        raise ListingError('limit and offset must be integers')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = max(0, offset)
+
+    columns = [getattr(Scenario, f) for f in RESULT_FIELDS + SCENARIO_METRICS]
+    query = filter_scenarios(db.session.query(*columns), args)
+    for name in SCENARIO_METRICS:
+        column = getattr(Scenario, name)
+        low = _float_arg(args, f'{name}_min')
+        high = _float_arg(args, f'{name}_max')
+        if low is not None:
+            query = query.filter(column >= low)
+        if high is not None:
+            query = query.filter(column <= high)
+
+    sort = args.get('sort')
+    if sort:
+        name = sort.lstrip('-')
+        if name not in SCENARIO_METRICS:
+            raise ListingError(f"Cannot sort by '{name}' (use one of {', '.join(SCENARIO_METRICS)})")
+        column = getattr(Scenario, name)
+        ordering = column.desc() if sort.startswith('-') else column.asc()
+        query = query.order_by(column.is_(None), ordering, Scenario.id)
+    else:
+        query = query.order_by(Scenario.id)
+
+    rows = query.offset(offset).limit(limit + 1).all()
+    results = []
+    for row in rows[:limit]:
+        values = dict(zip(RESULT_FIELDS + SCENARIO_METRICS, row))
+        results.append({
+            **{f: values[f] for f in RESULT_FIELDS},
+            'metrics': {m: values[m] for m in SCENARIO_METRICS}
+        })
+    return {
+        'scenarios': results,
+        'count': len(results),
+        'offset': offset,
+        'next_offset': offset + limit if len(rows) > limit else None
+    }
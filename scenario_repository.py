@@ -0,0 +1,252 @@
+"""
+One scenario repository over the JSON file and the database
+Reads go through a shared cache and check the database first, then
+data/scenarios.json. Writes go to whichever backend already holds the
+scenario and invalidate the cache. Edits to the JSON file are picked up
+from its modification time; database rows changed by other workers are
+picked up when their cache entries expire. Callers get their own copies
+of the cached dicts, so a route that adds fields before jsonify does not
+change what other requests see.
+"""
+import copy
+import json
+import os
+import threading
+import time
+
+from models import db, Scenario
+from data_manager import data_manager
+from scenario_history import scenario_history, VERSIONED_FIELDS
+
+CACHE_TTL = float(os.environ.get('SCENARIO_CACHE_TTL', '30'))  # seconds
+DEFAULT_BACKEND = os.environ.get('SCENARIO_BACKEND', 'json')
+
+_MISSING = object()
+
+
+class JsonScenarioBackend:
+    """data/scenarios.json through DataManager, parsed once per file change"""
+
+    name = 'json'
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.loaded_stamp = _MISSING
+        self.scenarios = []
+        self.by_id = {}
+
+    def stamp(self):
+        try:
+            stat = os.stat(self.manager.scenarios_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _load(self):
+        stamp = self.stamp()
+        if stamp != self.loaded_stamp:
+            self.scenarios = self.manager.load_scenarios()
+            self.by_id = {s['id']: s for s in self.scenarios if 'id' in s}
+            self.loaded_stamp = stamp
+        return self.scenarios
+
+    def get(self, scenario_id):
+        self._load()
+        return self.by_id.get(scenario_id)
+
+    def list(self):
+        return self._load()
+
+    def save(self, scenario):
+        return self.manager.save_scenario(scenario)
+
+    def delete(self, scenario_id):
+        return self.manager.delete_scenario(scenario_id)
+
+
+class DatabaseScenarioBackend:
+    """The scenarios table"""
+
+    name = 'db'
+
+    def stamp(self):
+        return None
+
+    def get(self, scenario_id):
+        scenario = db.session.get(Scenario, scenario_id)
+        return scenario.to_dict() if scenario else None
+
+    def list(self):
+        return [s.to_dict() for s in Scenario.query.order_by(Scenario.created_at, Scenario.id)]
+
+    def save(self, data):
+        scenario = db.session.get(Scenario, data['id'])
+        try:
+            if scenario:
+                before = scenario_history.state_of(scenario)
+                for field in VERSIONED_FIELDS:
+                    if field in data:
+                        setattr(scenario, field, data[field])
+                scenario_history.record_edit(scenario, before, data.get('change_description'))
+            else:
+                scenario = Scenario(
+                    id=data['id'],
+                    name=data.get('name', 'Untitled Scenario'),
+                    description=data.get('description', ''),
+                    type=data.get('type', 'baseline'),
+                    alley_id=data.get('alley_id', 'unknown'),
+                    location=data.get('location'),
+                    dimensions=data.get('dimensions'),
+                    phase=data.get('phase', 'Planning'),
+                    layers=data.get('layers', []),
+                    environmental_data=data.get('environmental_data'),
+                    notes=data.get('notes', ''),
+                    is_public=data.get('is_public', False),
+                    version=1
+                )
+                scenario_history.record_initial(scenario)
+                db.session.add(scenario)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return True
+
+    def delete(self, scenario_id):
+        scenario = db.session.get(Scenario, scenario_id)
+        if scenario is None:
+            return False
+        try:
+            db.session.delete(scenario)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return True
+
+
+class ScenarioRepository:
+    """Cached lookups across backends, in priority order"""
+
+    def __init__(self, backends, default_backend=DEFAULT_BACKEND, ttl=CACHE_TTL):
+        self.backends = backends
+        self.default_backend = default_backend
+        self.ttl = ttl
+        self.cache = {}       # scenario id -> (expires_at, scenario dict or _MISSING)
+        self.listing = None   # (expires_at, [scenario dicts])
+        self.stamps = {}
+        self.lock = threading.Lock()
+
+    def _backend(self, name):
+        for backend in self.backends:
+            if backend.name == name:
+                return backend
+        raise ValueError(f'Unknown scenario backend: {name}')
+
+    def _check_stamps(self):
+        """Drop everything cached when a backend's source changed underneath us"""
+        stamps = {backend.name: backend.stamp() for backend in self.backends}
+        if stamps != self.stamps:
+            self.cache = {}
+            self.listing = None
+            self.stamps = stamps
+
+    def get(self, scenario_id):
+        """Scenario dict from the first backend that has it, or None"""
+        now = time.monotonic()
+        with self.lock:
+            self._check_stamps()
+            cached = self.cache.get(scenario_id)
+            if cached and cached[0] > now:
+                return None if cached[1] is _MISSING else copy.deepcopy(cached[1])
+
+        found = _MISSING
+        for backend in self.backends:
+            scenario = backend.get(scenario_id)
+            if scenario is not None:
+                found = scenario
+                break
+        with self.lock:
+            self.cache[scenario_id] = (now + self.ttl, found)
+        return None if found is _MISSING else copy.deepcopy(found)
+
+    def list(self):
+        """Every scenario; a database row shadows a file entry with the same id"""
+        now = time.monotonic()
+        with self.lock:
+            self._check_stamps()
+            if self.listing and self.listing[0] > now:
+                return copy.deepcopy(self.listing[1])
+
+        merged = {}
+        for backend in reversed(self.backends):
+            for scenario in backend.list():
+                merged[scenario['id']] = scenario
+        scenarios = list(merged.values())
+        with self.lock:
+            self.listing = (now + self.ttl, scenarios)
+        return copy.deepcopy(scenarios)
+
+    def owner(self, scenario_id):
+        """Backend currently holding a scenario, or None"""
+        for backend in self.backends:
+            if backend.get(scenario_id) is not None:
+                return backend
+        return None
+
+    def save(self, scenario):
+        """Write to the backend that holds the scenario (new ones go to the default backend)"""
+        backend = self.owner(scenario['id']) or self._backend(self.default_backend)
+        try:
+            return backend.save(scenario)
+        finally:
+            self.invalidate(scenario['id'])
+
+    def delete(self, scenario_id):
+        deleted = False
+        try:
+            for backend in self.backends:
+                if backend.get(scenario_id) is not None:
+                    deleted = backend.delete(scenario_id) or deleted
+        finally:
+            self.invalidate(scenario_id)
+        return deleted
+
+    def invalidate(self, scenario_id=None):
+        """Forget one cached scenario (or all of them) after a write"""
+        with self.lock:
+            if scenario_id is None:
+                self.cache = {}
+            else:
+                self.cache.pop(scenario_id, None)
+            self.listing = None
+
+    def migrate_json_to_db(self, user_id=None):
+        """
+        Copy every file scenario the database does not have yet into it.
+        Safe to run again: scenarios already in the database are skipped.
+        """
+        from scenario_bulk import BulkImport
+
+        json_backend = self._backend('json')
+        existing = {
+            sid for (sid,) in db.session.query(Scenario.id).filter(
+                Scenario.id.in_([s['id'] for s in json_backend.list()])
+            )
+        }
+        importer = BulkImport(user_id=user_id)
+        skipped = 0
+        for line_number, scenario in enumerate(json_backend.list(), start=1):
+            if scenario['id'] in existing:
+                skipped += 1
+                continue
+            importer.feed(line_number, json.dumps(scenario))
+        importer.flush()
+        self.invalidate()
+        report = importer.report()
+        report['skipped'] = skipped
+        return report
+
+
+# Create global instance (database first, then the JSON file)
+scenario_repository = ScenarioRepository([DatabaseScenarioBackend(), JsonScenarioBackend(data_manager)])
@@ -0,0 +1,211 @@
+"""
+Session table for the integrated Pixel Streaming signaling server
+Every player is assigned to one streamer, so offers, answers and ICE
+candidates are routed point-to-point with dictionary lookups instead of
+being broadcast to every connected peer.
+
+Players are scheduled onto the least-loaded streamer with free capacity;
+when every streamer is full, viewers wait in a FIFO queue.
+"""
+import math
+import os
+from datetime import datetime
+
+MAX_PLAYERS_PER_STREAMER = int(os.environ.get('PIXEL_STREAMING_MAX_PLAYERS', '4'))
+
+
+class SignalingTable:
+    """Streamer/player assignments for the /pixelstreaming namespace"""
+
+    def __init__(self):
+        self.streamers = {}   # streamer sid -> {'connected_at', 'players': set, 'awaiting_offer': ordered dict}
+        self.players = {}     # player sid -> {'connected_at', 'streamer': sid or None}
+        self.queue = {}       # player sids waiting for capacity, oldest first
+        self.queue_positions = {}  # player sid -> position last reported to it
+
+    def _has_capacity(self, streamer):
+        return not streamer['draining'] and len(streamer['players']) < streamer['max_players']
+
+    def _score(self, sid):
+        """Lower is better: share of player slots used plus the load the streamer reports"""
+        streamer = self.streamers[sid]
+        return (len(streamer['players']) / streamer['max_players'] + streamer['load'], len(streamer['players']))
+
+    def _pick_streamer(self):
+        """Least-loaded streamer with a free player slot, or None"""
+        candidates = [sid for sid, s in self.streamers.items() if self._has_capacity(s)]
+        if not candidates:
+            return None
+        return min(candidates, key=self._score)
+
+    def _assign(self, player_sid, streamer_sid):
+        self.players[player_sid]['streamer'] = streamer_sid
+        streamer = self.streamers[streamer_sid]
+        streamer['players'].add(player_sid)
+        streamer['awaiting_offer'][player_sid] = True
+
+    def add_streamer(self, sid, max_players=None):
+        """
+        Register a streamer; call schedule() afterwards to hand it queued players.
+        Raises ValueError when max_players is given but is not a positive whole number.
+        """
+        try:
+            max_players = max(1, int(max_players or MAX_PLAYERS_PER_STREAMER))
+        except (TypeError, ValueError):
+            raise ValueError(f'maxPlayers must be a positive whole number, got {max_players!r}')
+        self.streamers[sid] = {
+            'connected_at': datetime.utcnow().isoformat(),
+            'players': set(),
+            'awaiting_offer': {},
+            'last_offered': None,
+            'max_players': max_players,
+            'load': 0.0,
+            'draining': False
+        }
+
+    def remove_streamer(self, sid):
+        """
+        Drop a streamer. Its players go to the front of the queue, since they
+        were already watching; schedule() then moves them to other streamers.
+        Returns the displaced players.
+        """
+        streamer = self.streamers.pop(sid, None)
+        if streamer is None:
+            return []
+        displaced = [p for p in streamer['players'] if p in self.players]
+        for player_sid in displaced:
+            self.players[player_sid]['streamer'] = None
+        self.queue = {**dict.fromkeys(displaced, True), **self.queue}
+        return displaced
+
+    def report_load(self, sid, load):
+        """
+        Record a streamer's self-reported load (0.0 idle .. 1.0 saturated).
+        Raises ValueError for anything but a finite number.
+        """
+        if isinstance(load, bool) or not isinstance(load, (int, float)) or not math.isfinite(load):
+            raise ValueError(f'load must be a number between 0.0 and 1.0, got {load!r}')
+        streamer = self.streamers.get(sid)
+        if streamer is None:
+            return False
+        streamer['load'] = min(max(float(load), 0.0), 1.0)
+        return True
+
+    def drain(self, sid):
+        """Stop giving a streamer new players; existing sessions run until they end"""
+        streamer = self.streamers.get(sid)
+        if streamer is None:
+            return False
+        streamer['draining'] = True
+        return True
+
+    def take_drained(self):
+        """Draining streamers whose last player has left (reported once each)"""
+        drained = [
+            sid for sid, s in self.streamers.items()
+            if s['draining'] and not s['players'] and not s.get('drain_reported')
+        ]
+        for sid in drained:
+            self.streamers[sid]['drain_reported'] = True
+        return drained
+
+    def add_player(self, sid):
+        """Register a player and queue it; call schedule() to assign it a streamer"""
+        self.players[sid] = {'connected_at': datetime.utcnow().isoformat(), 'streamer': None}
+        self.queue[sid] = True
+
+    def schedule(self):
+        """
+        Move queued players onto streamers with free capacity, least-loaded
+        first. Returns ([(player, streamer), ...], {player: new queue position})
+        where positions only include players whose position changed.
+        """
+        assigned = []
+        while self.queue:
+            target = self._pick_streamer()
+            if target is None:
+                break
+            player_sid = next(iter(self.queue))
+            del self.queue[player_sid]
+            self._assign(player_sid, target)
+            assigned.append((player_sid, target))
+
+        positions = {}
+        current = {}
+        for position, player_sid in enumerate(self.queue, start=1):
+            current[player_sid] = position
+            if self.queue_positions.get(player_sid) != position:
+                positions[player_sid] = position
+        self.queue_positions = current
+        return assigned, positions
+
+    def remove_player(self, sid):
+        """Drop a player; returns the streamer it was assigned to, if any"""
+        info = self.players.pop(sid, None)
+        self.queue.pop(sid, None)
+        self.queue_positions.pop(sid, None)
+        if info is None or info['streamer'] is None:
+            return None
+        streamer = self.streamers.get(info['streamer'])
+        if streamer is not None:
+            streamer['players'].discard(sid)
+            streamer['awaiting_offer'].pop(sid, None)
+        return info['streamer']
+
+    def is_streamer(self, sid):
+        return sid in self.streamers
+
+    def streamer_for(self, player_sid):
+        info = self.players.get(player_sid)
+        return info['streamer'] if info else None
+
+    def owns(self, streamer_sid, player_sid):
+        return self.streamer_for(player_sid) == streamer_sid and streamer_sid is not None
+
+    def offer_target(self, streamer_sid, player_sid=None):
+        """
+        Player an offer from this streamer goes to. Offers without a playerId
+        go to the oldest of its players still waiting for one.
+        """
+        streamer = self.streamers.get(streamer_sid)
+        if streamer is None:
+            return None
+        if player_sid is None:
+            if not streamer['awaiting_offer']:
+                return None
+            player_sid = next(iter(streamer['awaiting_offer']))
+        if player_sid not in streamer['players']:
+            return None
+        streamer['awaiting_offer'].pop(player_sid, None)
+        streamer['last_offered'] = player_sid
+        return player_sid
+
+    def last_offered(self, streamer_sid):
+        """Player this streamer most recently negotiated with (for id-less ICE candidates)"""
+        streamer = self.streamers.get(streamer_sid)
+        if streamer is None:
+            return None
+        candidate = streamer['last_offered']
+        return candidate if candidate in streamer['players'] else None
+
+    def status(self):
+        return {
+            'streamers_connected': len(self.streamers),
+            'players_connected': len(self.players),
+            'players_queued': len(self.queue),
+            'streamers': [
+                {
+                    'id': sid,
+                    'connected_at': s['connected_at'],
+                    'players': len(s['players']),
+                    'max_players': s['max_players'],
+                    'load': s['load'],
+                    'draining': s['draining']
+                }
+                for sid, s in self.streamers.items()
+            ]
+        }
+
+
+# Create global instance
+signaling_table = SignalingTable()
@@ -0,0 +1,228 @@
+"""
+Signaling: Pixel Streaming signaling server and peer-streaming room codes
+Unreal Engine connects directly to this Flask server on /pixelstreaming;
+no separate signaling server is needed.
+"""
+from flask import Blueprint, request, jsonify
+from flask_socketio import emit
+
+from extensions import socketio, is_edit_allowed
+from signaling import signaling_table
+from room_registry import room_registry
+
+signaling_bp = Blueprint('signaling', __name__)
+
+# ============================================================================
+# PIXEL STREAMING - Integrated Signaling Server
+# ============================================================================
+# This allows Unreal Engine to connect directly to this Flask server
+# No need for a separate signaling server!
+
+# Connected Pixel Streaming peers and player -> streamer assignments
+# live in signaling.signaling_table
+
+PS_NAMESPACE = '/pixelstreaming'
+
+def _notify_player_assignment(player_sid, streamer_sid):
+    """Tell a player it has a streamer, and tell that streamer about the player"""
+    socketio.emit('streamerConnected', to=player_sid, namespace=PS_NAMESPACE)
+    socketio.emit('playerConnected', {'playerId': player_sid}, to=streamer_sid, namespace=PS_NAMESPACE)
+
+def _run_streamer_schedule():
+    """Assign queued players to free capacity and tell waiting viewers where they stand"""
+    assigned, positions = signaling_table.schedule()
+    for player_sid, streamer_sid in assigned:
+        _notify_player_assignment(player_sid, streamer_sid)
+    queue_length = len(signaling_table.queue)
+    for player_sid, position in positions.items():
+        socketio.emit('queuePosition', {'position': position, 'queueLength': queue_length},
+                      to=player_sid, namespace=PS_NAMESPACE)
+    for streamer_sid in signaling_table.take_drained():
+        socketio.emit('streamerDrained', to=streamer_sid, namespace=PS_NAMESPACE)
+
+@socketio.on('connect', namespace='/pixelstreaming')
+def pixel_streaming_connect():
+    """Handle new Pixel Streaming connection"""
+    print(f"[Pixel Streaming] New connection: {request.sid}")
+    emit('config', {
+        'peerConnectionOptions': {
+            'iceServers': [{'urls': 'stun:stun.l.google.com:19302'}]
+        }
+    })
+
+@socketio.on('disconnect', namespace='/pixelstreaming')
+def pixel_streaming_disconnect():
+    """Handle Pixel Streaming disconnection"""
+    sid = request.sid
+    print(f"[Pixel Streaming] Disconnected: {sid}")
+    
+    if signaling_table.is_streamer(sid):
+        # Only this streamer's players are affected; they move to the front of the queue
+        for player_sid in signaling_table.remove_streamer(sid):
+            emit('streamerDisconnected', to=player_sid, namespace=PS_NAMESPACE)
+    else:
+        streamer_sid = signaling_table.remove_player(sid)
+        if streamer_sid:
+            emit('playerDisconnected', {'playerId': sid}, to=streamer_sid, namespace=PS_NAMESPACE)
+    _run_streamer_schedule()
+
+@socketio.on('streamerConnect', namespace='/pixelstreaming')
+def streamer_connect(data=None):
+    """Unreal Engine streamer connects, optionally announcing its player capacity"""
+    sid = request.sid
+    try:
+        signaling_table.add_streamer(sid, max_players=(data if isinstance(data, dict) else {}).get('maxPlayers'))
+    except ValueError as e:
+        emit('error', {'message': str(e)}, room=sid)
+        return
+    print(f"[Pixel Streaming] Streamer registered: {sid}")
+    
+    # Hand the new capacity to queued players only
+    _run_streamer_schedule()
+
+@socketio.on('streamerLoad', namespace='/pixelstreaming')
+def streamer_load(data=None):
+    """Streamer reports its load (0.0-1.0) so new players go to the least busy instance"""
+    try:
+        reported = signaling_table.report_load(request.sid, data.get('load') if isinstance(data, dict) else None)
+    except ValueError as e:
+        emit('error', {'message': str(e)}, room=request.sid)
+        return
+    if reported:
+        _run_streamer_schedule()
+
+@socketio.on('streamerDrain', namespace='/pixelstreaming')
+def streamer_drain():
+    """Streamer asks to stop receiving new players before shutting down"""
+    if signaling_table.drain(request.sid):
+        _run_streamer_schedule()
+
+@socketio.on('playerConnect', namespace='/pixelstreaming')  
+def player_connect():
+    """Web browser player connects"""
+    sid = request.sid
+    signaling_table.add_player(sid)
+    _run_streamer_schedule()
+    streamer_sid = signaling_table.streamer_for(sid)
+    print(f"[Pixel Streaming] Player registered: {sid} -> {streamer_sid or 'queued'}")
+    if streamer_sid is None and not signaling_table.streamers:
+        emit('streamerDisconnected')
+
+def _reject_payload(data):
+    """Tell the sender its signaling message was not an object; returns True when rejected"""
+    if isinstance(data, dict):
+        return False
+    emit('error', {'message': 'Signaling messages must be JSON objects'}, room=request.sid)
+    return True
+
+@socketio.on('offer', namespace='/pixelstreaming')
+def handle_offer(data):
+    """Forward WebRTC offer from streamer to its player"""
+    if _reject_payload(data):
+        return
+    player_id = signaling_table.offer_target(request.sid, data.get('playerId'))
+    if player_id:
+        emit('offer', data, to=player_id, namespace=PS_NAMESPACE)
+
+@socketio.on('answer', namespace='/pixelstreaming')
+def handle_answer(data):
+    """Forward WebRTC answer from player to its assigned streamer"""
+    if _reject_payload(data):
+        return
+    streamer_id = signaling_table.streamer_for(request.sid)
+    if streamer_id:
+        data = dict(data, playerId=request.sid)
+        emit('answer', data, to=streamer_id, namespace=PS_NAMESPACE)
+
+@socketio.on('iceCandidate', namespace='/pixelstreaming')
+def handle_ice_candidate(data):
+    """Forward ICE candidates between a player and its assigned streamer"""
+    if _reject_payload(data):
+        return
+    sid = request.sid
+    if signaling_table.is_streamer(sid):
+        player_id = data.get('playerId') or signaling_table.last_offered(sid)
+        if player_id and signaling_table.owns(sid, player_id):
+            emit('iceCandidate', data, to=player_id, namespace=PS_NAMESPACE)
+    else:
+        streamer_id = signaling_table.streamer_for(sid)
+        if streamer_id:
+            emit('iceCandidate', dict(data, playerId=sid), to=streamer_id, namespace=PS_NAMESPACE)
+
+@signaling_bp.route('/api/pixel-streaming/status')
+def pixel_streaming_status():
+    """Get Pixel Streaming connection status"""
+    status = signaling_table.status()
+    status.update({
+        'server_url': f"ws://localhost:5000/pixelstreaming",
+        'status': 'ready' if status['streamers_connected'] else 'waiting_for_streamer'
+    })
+    return jsonify(status)
+
+@signaling_bp.route('/api/pixel-streaming/streamers/<streamer_id>/drain', methods=['POST'])
+def drain_pixel_streamer(streamer_id):
+    """Stop scheduling new players onto a streamer. Localhost only."""
+    if not is_edit_allowed():
+        return jsonify({'error': 'Streamer control is only available on localhost'}), 403
+    if not signaling_table.drain(streamer_id):
+        return jsonify({'error': 'Streamer not found'}), 404
+    _run_streamer_schedule()
+    return jsonify({'success': True, 'streamer_id': streamer_id})
+
+# ============================================================================
+# ROOM CODE SYSTEM FOR PEER STREAMING
+# ============================================================================
+
+@signaling_bp.route('/api/rooms/create', methods=['POST'])
+def create_room():
+    """Create a new streaming room with a unique code"""
+    # Get creator's IP (for network streaming)
+    creator_ip = request.remote_addr
+    if creator_ip == '127.0.0.1':
+        creator_ip = 'localhost'
+    
+    room = room_registry.create(creator_ip, creator_ip=request.remote_addr)
+    code = room['code']
+    
+    print(f"[Rooms] Created room {code} for IP {creator_ip}")
+    
+    return jsonify({
+        'code': code,
+        'ip': creator_ip,
+        'expires_at': room['expires_at'],
+        'ttl': room_registry.ttl,
+        'share_url': f"/digital-twin?room={code}"
+    })
+
+@signaling_bp.route('/api/rooms/<code>')
+def get_room(code):
+    """Get room info by code"""
+    room = room_registry.get(code.upper())
+    if room is None:
+        return jsonify({'error': 'Room not found'}), 404
+    return jsonify(room)
+
+@signaling_bp.route('/api/rooms/<code>/heartbeat', methods=['POST'])
+def room_heartbeat(code):
+    """Keep a room alive for another TTL"""
+    room = room_registry.heartbeat(code.upper())
+    if room is None:
+        return jsonify({'error': 'Room not found'}), 404
+    return jsonify(room)
+
+@signaling_bp.route('/api/rooms/list')
+def list_rooms():
+    """List live rooms, one page at a time (?limit=&after=<code>)"""
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    rooms, next_after = room_registry.list_live(after=request.args.get('after'), limit=limit)
+    return jsonify({'rooms': rooms, 'next_after': next_after})
+
+@signaling_bp.route('/api/rooms/<code>', methods=['DELETE'])
+def delete_room(code):
+    """Delete a room"""
+    if room_registry.delete(code.upper()):
+        return jsonify({'success': True})
+    return jsonify({'error': 'Room not found'}), 404
@@ -0,0 +1,283 @@
+"""
+Solar-position shade engine
+Computes the sun's position for every timestep of a year (NOAA general
+solar position equations) and ray-casts canopy, trellis and tree
+footprints, plus optional side walls, onto the alley floor grid. All
+timesteps of a chunk and all grid cells are evaluated in one NumPy
+broadcast; chunks hold at most SOLAR_SHADE_BUDGET_CELLS timestep-cells,
+so memory stays bounded whatever the grid size. Year-level results are
+cached by a hash of the geometry.
+
+Times are local standard time from the longitude (UTC-8 in Los Angeles,
+no daylight saving), so hour 12 is close to solar noon.
+"""
+import calendar
+import datetime
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from impact_model import (AlleyGrid, DesignTooLarge, layer_spec, feature_count, check_layers,
+                          STRUCTURE_DENSITY, TREE_CANOPY_DENSITY)
+
+CACHE_SIZE = int(os.environ.get('SOLAR_CACHE_SIZE', '64'))
+DEFAULT_STEP_MINUTES = 60
+# Timesteps x grid cells per broadcast chunk (each float32 array is 4 bytes per cell)
+SHADE_BUDGET_CELLS = int(os.environ.get('SOLAR_SHADE_BUDGET_CELLS', '2000000'))
+# Largest floor grid the shade engine accepts; every cell is ray-cast for each hour of a year
+MAX_CELLS = int(os.environ.get('SOLAR_MAX_CELLS', '25000'))
+
+STRUCTURE_ELEVATION_FT = {'canopy': 12.0, 'solar_shades': 12.0, 'shade_structure': 12.0, 'trellis': 9.0}
+TREE_ELEVATION_FT = 15.0
+
+
+def sun_positions(lat, lng, days, hours_utc):
+    """
+    Sun elevation and azimuth (radians, azimuth clockwise from north) for
+    day-of-year and UTC hour arrays of the same shape
+    """
+    gamma = 2 * np.pi / 365 * (days - 1 + (hours_utc - 12) / 24)
+    eqtime = 229.18 * (0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+                       - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma))
+    decl = (0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+            - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+            - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma))
+    true_solar_minutes = hours_utc * 60 + eqtime + 4 * lng
+    hour_angle = np.radians(true_solar_minutes / 4 - 180)
+    phi = math.radians(lat)
+
+    cos_zenith = np.sin(phi) * np.sin(decl) + np.cos(phi) * np.cos(decl) * np.cos(hour_angle)
+    elevation = np.pi / 2 - np.arccos(np.clip(cos_zenith, -1, 1))
+    azimuth = np.arctan2(np.sin(hour_angle), np.cos(hour_angle) * np.sin(phi) - np.tan(decl) * np.cos(phi)) + np.pi
+    return elevation, azimuth
+
+
+def shade_casters(grid, layers):
+    """Overhead shapes (feet, alley coordinates) for the shading layers of a design"""
+    casters = []
+    for layer in layers or []:
+        spec = layer_spec(layer)
+        kind = spec['type']
+        if kind in STRUCTURE_DENSITY:
+            if all(k in spec for k in ('x', 'y', 'width', 'height')):
+                x0, y0 = float(spec['x']), float(spec['y'])
+                x1, y1 = x0 + float(spec['width']), y0 + float(spec['height'])
+            else:
+                width = float(spec.get('width', 6.0))
+                x0, x1 = 0.0, grid.length * float(spec.get('share', 1.0))
+                y0, y1 = (grid.width - width) / 2, (grid.width + width) / 2
+            casters.append({
+                'shape': 'rect', 'x0': x0, 'x1': x1, 'y0': y0, 'y1': y1,
+                'elevation': float(spec.get('elevation', STRUCTURE_ELEVATION_FT[kind])),
+                'density': float(spec.get('density', STRUCTURE_DENSITY[kind]))
+            })
+        elif kind == 'trees':
+            count = feature_count(spec, max(1, grid.length // 25))
+            radius = float(spec.get('canopy_diameter', 15.0)) / 2
+            for i in range(count):
+                casters.append({
+                    'shape': 'disc',
+                    'cx': (i + 0.5) * grid.length / count,
+                    'cy': 0.0 if i % 2 == 0 else grid.width,
+                    'radius': radius,
+                    'elevation': float(spec.get('elevation', TREE_ELEVATION_FT)),
+                    'density': float(spec.get('density', TREE_CANOPY_DENSITY))
+                })
+    return casters
+
+
+def normalize_geometry(lat, lng, dimensions, layers, orientation=0.0, wall_height=0.0):
+    """Plain-data description of everything that affects the shade result"""
+    check_layers(layers)
+    grid = AlleyGrid(dimensions)
+    cells = grid.shape[0] * grid.shape[1]
+    if cells > MAX_CELLS:
+        raise DesignTooLarge(
+            f'{grid.length:g} x {grid.width:g} ft is {cells} grid cells, over the shade limit of {MAX_CELLS}'
+        )
+    return {
+        'lat': round(float(lat), 6),
+        'lng': round(float(lng), 6),
+        'length': grid.length,
+        'width': grid.width,
+        'cell_ft': grid.cell_ft,
+        'orientation': float(orientation or 0.0) % 360,
+        'wall_height': float(wall_height or 0.0),
+        'casters': shade_casters(grid, layers)
+    }
+
+
+def geometry_hash(geometry, year, step_minutes):
+    payload = json.dumps([geometry, year, step_minutes], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class SolarShadeEngine:
+    """Year-long shade maps per alley geometry, cached by geometry hash"""
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def timezone_offset(lng):
+        return int(round(lng / 15))
+
+    def _timesteps(self, geometry, year, step_minutes, day=None):
+        """(day-of-year, local hour, UTC hour) arrays for a year, or for one day"""
+        steps_per_day = int(24 * 60 // step_minutes)
+        n_days = 366 if calendar.isleap(year) else 365
+        day_numbers = np.arange(1, n_days + 1) if day is None else np.array([day])
+        local_hours = (np.arange(steps_per_day) + 0.5) * step_minutes / 60
+        days = np.repeat(day_numbers, steps_per_day).astype(float)
+        hours = np.tile(local_hours, len(day_numbers))
+        utc = hours - self.timezone_offset(geometry['lng'])
+        return days, hours, utc, steps_per_day
+
+    def _shade(self, geometry, elevation, azimuth):
+        """
+        Shade density (0-1) on every floor cell for each timestep with the sun
+        up: shape (timesteps, rows, columns)
+        """
+        grid = AlleyGrid({'length': geometry['length'], 'width': geometry['width']}, geometry['cell_ft'])
+        relative = azimuth - math.radians(geometry['orientation'])
+        # Horizontal offset per foot of height toward the sun, along and across the alley
+        reach = 1 / np.tan(elevation)
+        ux = (reach * np.cos(relative)).astype(np.float32)[:, None, None]
+        uy = (reach * np.sin(relative)).astype(np.float32)[:, None, None]
+        x = grid.x[None].astype(np.float32)
+        y = grid.y[None].astype(np.float32)
+
+        light = np.ones((len(elevation),) + grid.shape, dtype=np.float32)
+        for caster in geometry['casters']:
+            # Where the ray from each floor cell toward the sun meets the caster's plane.
+            # hx only varies along the alley and hy across it, so both stay small until combined.
+            hx = x + np.float32(caster['elevation']) * ux
+            hy = y + np.float32(caster['elevation']) * uy
+            if caster['shape'] == 'rect':
+                hit = ((hx >= caster['x0']) & (hx < caster['x1'])) & ((hy >= caster['y0']) & (hy < caster['y1']))
+            else:
+                hit = (hx - np.float32(caster['cx'])) ** 2 + (hy - np.float32(caster['cy'])) ** 2 <= caster['radius'] ** 2
+            np.multiply(light, np.float32(1 - caster['density']), out=light, where=hit)
+
+        wall = geometry['wall_height']
+        if wall > 0:
+            crossing = y + wall * uy
+            light[np.broadcast_to((crossing < 0) | (crossing > geometry['width']), light.shape)] = 0
+        return 1 - light
+
+    def _compute(self, geometry, year, step_minutes):
+        days, hours, utc, steps_per_day = self._timesteps(geometry, year, step_minutes)
+        elevation, azimuth = sun_positions(geometry['lat'], geometry['lng'], days, utc)
+        daylight = np.flatnonzero(elevation > 0)
+
+        rows = int(math.ceil(geometry['width'] / geometry['cell_ft']))
+        cols = int(math.ceil(geometry['length'] / geometry['cell_ft']))
+        chunk_steps = max(1, SHADE_BUDGET_CELLS // max(rows * cols, 1))
+
+        coverage = np.full(len(days), np.nan)
+        shaded_total = None
+        for start in range(0, len(daylight), chunk_steps):
+            steps = daylight[start:start + chunk_steps]
+            shade = self._shade(geometry, elevation[steps], azimuth[steps])
+            coverage[steps] = shade.mean(axis=(1, 2))
+            chunk_total = shade.sum(axis=0, dtype=np.float64)
+            shaded_total = chunk_total if shaded_total is None else shaded_total + chunk_total
+
+        coverage = coverage.reshape(-1, steps_per_day)
+        return {
+            'annual_map': shaded_total / max(len(daylight), 1) if shaded_total is not None else None,
+            'coverage': coverage,
+            'elevation': np.degrees(elevation).reshape(-1, steps_per_day),
+            'daylight_steps': int(len(daylight)),
+            'local_hours': hours[:steps_per_day]
+        }
+
+    def year(self, geometry, year, step_minutes=DEFAULT_STEP_MINUTES):
+        """Cached year result for a geometry; returns (key, result, was_cached)"""
+        key = geometry_hash(geometry, year, step_minutes)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return key, self.cache[key], True
+        result = self._compute(geometry, year, step_minutes)
+        with self.lock:
+            self.misses += 1
+            self.cache[key] = result
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return key, result, False
+
+    def day_maps(self, geometry, date, step_minutes=DEFAULT_STEP_MINUTES):
+        """Shade map for every daylight timestep of one date: (local hours, maps)"""
+        day = date.timetuple().tm_yday
+        days, hours, utc, _ = self._timesteps(geometry, date.year, step_minutes, day=day)
+        elevation, azimuth = sun_positions(geometry['lat'], geometry['lng'], days, utc)
+        up = elevation > 0
+        return hours[up], self._shade(geometry, elevation[up], azimuth[up])
+
+    def report(self, geometry, year=None, date=None, step_minutes=DEFAULT_STEP_MINUTES, maps=False):
+        """
+        Annual coverage (and floor map), daily coverage for every day of the
+        year and the hourly coverage for one date. Coverage is the percent of
+        the floor shaded while the sun is up.
+        """
+        date = date or datetime.date(year or datetime.date.today().year, 6, 21)
+        year = year or date.year
+        if date.year != year:
+            raise ValueError('date must fall in the requested year')
+        key, result, cached = self.year(geometry, year, step_minutes)
+        coverage = result['coverage']
+        day_index = date.timetuple().tm_yday - 1
+
+        with np.errstate(all='ignore'):
+            daily = np.nanmean(coverage, axis=1)
+        annual_map = result['annual_map']
+        report = {
+            'geometry_hash': key,
+            'cached': cached,
+            'year': year,
+            'step_minutes': step_minutes,
+            'timezone': f"UTC{self.timezone_offset(geometry['lng']):+d} (standard time)",
+            'annual': {
+                'coverage': round(float(annual_map.mean()) * 100, 1) if annual_map is not None else 0.0,
+                'daylight_steps': result['daylight_steps']
+            },
+            'daily': {
+                'start': datetime.date(year, 1, 1).isoformat(),
+                'coverage': [None if np.isnan(v) else round(float(v) * 100, 1) for v in daily]
+            },
+            'hourly': {
+                'date': date.isoformat(),
+                'local_hours': [round(float(h), 2) for h in result['local_hours']],
+                'coverage': [None if np.isnan(v) else round(float(v) * 100, 1) for v in coverage[day_index]],
+                'sun_elevation': [round(float(e), 1) for e in result['elevation'][day_index]]
+            }
+        }
+        if maps:
+            if annual_map is not None:
+                report['annual']['map'] = np.round(annual_map, 3).tolist()
+            hours, day_shade = self.day_maps(geometry, date, step_minutes)
+            report['hourly']['maps'] = [
+                {'local_hour': round(float(h), 2), 'map': np.round(m, 3).tolist()}
+                for h, m in zip(hours, day_shade)
+            ]
+        return report
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.cache), 'capacity': self.cache_size, 'hits': self.hits, 'misses': self.misses}
+
+
+# Create global instance
+solar_shade_engine = SolarShadeEngine()
@@ -0,0 +1,88 @@
+"""
+Startup import-cost report
+ImportTimer wraps the import statement while the application starts and
+records how long each module took to load, both in total and excluding
+the modules it imported in turn (like `python -X importtime`, but inside
+a gunicorn worker). app.py starts it before importing anything else and
+create_app() stops it, so the report covers exactly the cold start.
+"""
+import builtins
+import os
+import sys
+import time
+
+STARTUP_REPORT = os.environ.get('STARTUP_REPORT', 'off').lower() in ('on', '1', 'true')
+STARTUP_REPORT_TOP = int(os.environ.get('STARTUP_REPORT_TOP', '15'))
+
+
+class ImportTimer:
+    """Times first imports by absolute module name between start() and stop()"""
+
+    def __init__(self):
+        self.original = None
+        self.stack = []        # child time accumulated by each import in progress
+        self.modules = {}      # name -> {'total': s, 'self': s}
+        self.started = None
+        self.elapsed = None
+
+    def start(self):
+        if self.original is None:
+            self.original = builtins.__import__
+            builtins.__import__ = self._import
+            self.started = time.perf_counter()
+
+    def stop(self):
+        if self.original is not None:
+            builtins.__import__ = self.original
+            self.original = None
+            self.elapsed = time.perf_counter() - self.started
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self.original or builtins.__import__
+        if level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+        self.stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - start
+            children = self.stack.pop()
+            entry = self.modules.setdefault(name, {'total': 0.0, 'self': 0.0})
+            entry['total'] += total
+            entry['self'] += total - children
+            if self.stack:
+                self.stack[-1] += total
+
+    def report(self, top=STARTUP_REPORT_TOP):
+        """Import time per top-level package and the slowest modules, in ms"""
+        packages = {}
+        for name, entry in self.modules.items():
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0.0) + entry['self']
+        slowest = sorted(self.modules.items(), key=lambda item: item[1]['total'], reverse=True)[:top]
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - (self.started or 0)
+        return {
+            'startup_ms': round(elapsed * 1000, 1),
+            'imports_ms': round(sum(packages.values()) * 1000, 1),
+            'packages': [
+                {'package': name, 'ms': round(seconds * 1000, 1)}
+                for name, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+            ],
+            'modules': [
+                {'module': name, 'total_ms': round(entry['total'] * 1000, 1), 'self_ms': round(entry['self'] * 1000, 1)}
+                for name, entry in slowest
+            ]
+        }
+
+    def print_report(self, report):
+        print(f"[Startup] Import cost by package ({report['imports_ms']:.0f} ms of {report['startup_ms']:.0f} ms):")
+        for row in report['packages']:
+            print(f"[Startup]   {row['package']:<28}{row['ms']:>8.1f} ms")
+        print("[Startup] Slowest modules (total including what they import / own):")
+        for row in report['modules']:
+            print(f"[Startup]   {row['module']:<28}{row['total_ms']:>8.1f} ms{row['self_ms']:>8.1f} ms")
+
+
+# Create global instance
+import_timer = ImportTimer()
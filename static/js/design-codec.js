@@ -0,0 +1,219 @@
+// Reference codec for the compact binary design frames (see design_codec.py)
+// Turns each frame back into the same payload shape the JSON events use,
+// and encodes item frames for add_item/update_item. No bundled page loads
+// it yet; clients that opt into the binary wire do.
+const DesignCodec = (() => {
+    const VERSION = 2;
+    const KIND_ITEM = 1;
+    const KIND_REMOVE = 2;
+    const KIND_SNAPSHOT = 3;
+    const EXTRAS_BIT = 0x80;
+    const SNAPSHOT_RESET = 0x01;
+
+    // [field, byte size, DataView getter, scale] in mask-bit order
+    const FIELDS = [
+        ['x', 4, 'getInt32', 10],
+        ['y', 4, 'getInt32', 10],
+        ['width', 4, 'getInt32', 10],
+        ['height', 4, 'getInt32', 10],
+        ['rotation', 2, 'getInt16', 100],
+        ['zIndex', 2, 'getInt16', 1],
+        ['opacity', 1, 'getUint8', 255]
+    ];
+    const KNOWN_FIELDS = new Set(FIELDS.map(([name]) => name));
+    const RANGES = {
+        getInt32: [-2147483648, 2147483647],
+        getInt16: [-32768, 32767],
+        getUint8: [0, 255]
+    };
+
+    const textDecoder = new TextDecoder();
+    const textEncoder = new TextEncoder();
+    const tables = {};  // alley id -> { itemIds: short -> full id, shortIds: full -> short id }
+
+    // Short ids are assigned per alley on the server, so keep one table per alley
+    function tableFor(alleyId) {
+        if (!tables[alleyId]) tables[alleyId] = { itemIds: {}, shortIds: {} };
+        return tables[alleyId];
+    }
+
+    function readRecord(view, offset, table) {
+        const shortId = view.getUint32(offset, true);
+        const mask = view.getUint8(offset + 4);
+        offset += 5;
+        const fields = {};
+        FIELDS.forEach(([name, size, getter, scale], bit) => {
+            if (mask & (1 << bit)) {
+                const raw = view[getter](offset, true);
+                fields[name] = scale === 1 ? raw : Math.round(raw / scale * 1000) / 1000;
+                offset += size;
+            }
+        });
+        if (mask & EXTRAS_BIT) {
+            const length = view.getUint32(offset, true);
+            offset += 4;
+            const bytes = new Uint8Array(view.buffer, view.byteOffset + offset, length);
+            Object.assign(fields, JSON.parse(textDecoder.decode(bytes)));
+            offset += length;
+        }
+        if (fields.id !== undefined) {
+            table.itemIds[shortId] = fields.id;
+            table.shortIds[fields.id] = shortId;
+        } else {
+            fields.id = table.itemIds[shortId];
+        }
+        return { fields, offset };
+    }
+
+    function readStamp(view, offset) {
+        const counter = view.getUint32(offset, true);
+        const length = view.getUint8(offset + 4);
+        const bytes = new Uint8Array(view.buffer, view.byteOffset + offset + 5, length);
+        return { stamp: [counter, textDecoder.decode(bytes)], offset: offset + 5 + length };
+    }
+
+    function readTable(view, offset, lengthSize) {
+        const values = [];
+        const count = view.getUint16(offset, true);
+        offset += 2;
+        for (let i = 0; i < count; i++) {
+            const length = lengthSize === 1 ? view.getUint8(offset) : view.getUint16(offset, true);
+            offset += lengthSize;
+            values.push(textDecoder.decode(new Uint8Array(view.buffer, view.byteOffset + offset, length)));
+            offset += length;
+        }
+        return { values, offset };
+    }
+
+    function decode(buffer, alleyId) {
+        const table = tableFor(alleyId);
+        const view = buffer instanceof ArrayBuffer
+            ? new DataView(buffer)
+            : new DataView(buffer.buffer, buffer.byteOffset, buffer.byteLength);
+        const kind = view.getUint8(1);
+        const clock = view.getUint32(2, true);
+        let offset = 6;
+
+        if (kind === KIND_ITEM) {
+            const stamped = readStamp(view, offset);
+            const record = readRecord(view, stamped.offset, table);
+            const stamps = {};
+            Object.keys(record.fields).forEach(field => {
+                if (field !== 'id') stamps[field] = stamped.stamp;
+            });
+            return { item: record.fields, stamps, clock };
+        }
+        if (kind === KIND_REMOVE) {
+            const stamped = readStamp(view, offset);
+            return { item_id: table.itemIds[view.getUint32(stamped.offset, true)], clock };
+        }
+        if (kind === KIND_SNAPSHOT) {
+            const reset = Boolean(view.getUint8(offset) & SNAPSHOT_RESET);
+            const replicas = readTable(view, offset + 1, 1);
+            const names = readTable(view, replicas.offset, 2);
+            offset = names.offset;
+            const items = [];
+            const stamps = {};
+            const count = view.getUint32(offset, true);
+            offset += 4;
+            for (let i = 0; i < count; i++) {
+                const record = readRecord(view, offset, table);
+                offset = record.offset;
+                const itemStamps = {};
+                const stampCount = view.getUint16(offset, true);
+                offset += 2;
+                for (let j = 0; j < stampCount; j++) {
+                    const field = names.values[view.getUint16(offset, true)];
+                    itemStamps[field] = [view.getUint32(offset + 2, true), replicas.values[view.getUint16(offset + 6, true)]];
+                    offset += 8;
+                }
+                items.push(record.fields);
+                stamps[record.fields.id] = itemStamps;
+            }
+            const removed = [];
+            const removedCount = view.getUint32(offset, true);
+            offset += 4;
+            for (let i = 0; i < removedCount; i++) {
+                removed.push(table.itemIds[view.getUint32(offset, true)]);
+                offset += 4;
+            }
+            return { items, stamps, removed, reset, clock };
+        }
+        throw new Error(`Unknown design frame kind ${kind}`);
+    }
+
+    // Same quantization as the server; null sends the value as JSON extras instead
+    function quantize(name, value, scale, getter) {
+        if (typeof value !== 'number' || !isFinite(value)) return null;
+        if (name === 'rotation') value = (((value + 180) % 360) + 360) % 360 - 180;
+        const quantized = Math.round(value * scale);
+        const [min, max] = RANGES[getter];
+        return quantized >= min && quantized <= max ? quantized : null;
+    }
+
+    // The item as the server and peers will store it once quantized; senders
+    // apply this locally so they do not keep values nobody else has
+    function canonical(item) {
+        const result = Object.assign({}, item);
+        FIELDS.forEach(([name, , getter, scale]) => {
+            if (!(name in item)) return;
+            const quantized = quantize(name, item[name], scale, getter);
+            if (quantized !== null) {
+                result[name] = scale === 1 ? quantized : Math.round(quantized / scale * 1000) / 1000;
+            }
+        });
+        return result;
+    }
+
+    // Item frame for an add or update: the given fields under one [counter, replica] stamp
+    function encodeItem(item, stamp, alleyId) {
+        const shortId = tableFor(alleyId).shortIds[item.id] || 0;
+        const replica = textEncoder.encode(String(stamp[1] || '')).slice(0, 255);
+        let mask = 0;
+        const numbers = [];
+        const extras = {};
+        FIELDS.forEach(([name, size, getter, scale], bit) => {
+            if (!(name in item)) return;
+            const quantized = quantize(name, item[name], scale, getter);
+            if (quantized === null) {
+                extras[name] = item[name];
+                return;
+            }
+            numbers.push([size, getter.replace('get', 'set'), quantized]);
+            mask |= 1 << bit;
+        });
+        Object.keys(item).forEach(name => {
+            // Items without a short id yet are named by their full id
+            if (!KNOWN_FIELDS.has(name) && (name !== 'id' || !shortId)) extras[name] = item[name];
+        });
+        const blob = Object.keys(extras).length ? textEncoder.encode(JSON.stringify(extras)) : null;
+        if (blob) mask |= EXTRAS_BIT;
+
+        const size = 6 + 5 + replica.length + 5
+            + numbers.reduce((total, [bytes]) => total + bytes, 0)
+            + (blob ? 4 + blob.length : 0);
+        const buffer = new ArrayBuffer(size);
+        const view = new DataView(buffer);
+        view.setUint8(0, VERSION);
+        view.setUint8(1, KIND_ITEM);
+        view.setUint32(2, stamp[0], true);
+        view.setUint32(6, stamp[0], true);
+        view.setUint8(10, replica.length);
+        new Uint8Array(buffer, 11, replica.length).set(replica);
+        let offset = 11 + replica.length;
+        view.setUint32(offset, shortId, true);
+        view.setUint8(offset + 4, mask);
+        offset += 5;
+        numbers.forEach(([bytes, setter, value]) => {
+            view[setter](offset, value, true);
+            offset += bytes;
+        });
+        if (blob) {
+            view.setUint32(offset, blob.length, true);
+            new Uint8Array(buffer, offset + 4, blob.length).set(blob);
+        }
+        return buffer;
+    }
+
+    return { decode, encodeItem, canonical };
+})();
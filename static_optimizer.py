@@ -0,0 +1,379 @@
+"""
+Post-build optimization for the static site (build_static.py --optimize)
+Minifies the built HTML (including inline <style> and <script> blocks),
+CSS and JS, writes .gz and .br siblings for text files, generates
+narrower variants of large images and lists them in each <img> srcset,
+and reports every page's transfer size against a byte budget.
+
+The minifiers are deliberately conservative: they drop comments and
+collapse whitespace but never rename or reorder code, so they cannot
+change what a page does. Brotli output needs the optional `brotli`
+package; without it only .gz siblings are written.
+"""
+import gzip
+import os
+import re
+from urllib.parse import quote, unquote, urlsplit
+
+RESPONSIVE_WIDTHS = (480, 960, 1600)
+RESPONSIVE_QUALITY = 82
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+MINIFY_EXTENSIONS = ('.css', '.js')
+COMPRESS_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg')
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+# Transfer budget per page (HTML + CSS + JS + eagerly loaded images); unset means report only
+PAGE_BUDGET_KB = os.environ.get('STATIC_PAGE_BUDGET_KB')
+
+_VARIANT = re.compile(r'\.w\d+\.[^./]+$')
+
+_HTML = re.compile(
+    r'(?P<comment><!--(?!\[if).*?-->)'
+    r'|(?P<raw><(?P<tag>pre|textarea|script|style)\b[^>]*>)(?P<body>.*?)(?P<close></(?P=tag)\s*>)'
+    r'|(?P<space>\s{2,}|\n\s*)',
+    re.DOTALL | re.IGNORECASE
+)
+_CSS_COMMENT = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.DOTALL)
+_CSS_SPACE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|\s*([{};,])\s*|\s+')
+_IMG = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+_ASSET_TAG = re.compile(r'<(?P<tag>link|script|img)\b[^>]*>', re.IGNORECASE)
+_TAG_ATTRIBUTE = re.compile(r'(?<=[\s"\'])(?P<name>[a-zA-Z][\w:-]*)\s*=\s*(?P<quote>["\'])(?P<value>.*?)(?P=quote)',
+                            re.DOTALL)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class BudgetExceeded(Exception):
+    """Raised after the report when pages transfer more than the budget"""
+
+
+def minify_css(text):
+    text = _CSS_COMMENT.sub(lambda m: m.group(1) or '', text)
+    text = _CSS_SPACE.sub(lambda m: m.group(1) or m.group(2) or ' ', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    """Drop indentation and blank lines; line breaks stay so automatic semicolons still work"""
+    return '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def minify_html(html):
+    def token(match):
+        if match.group('comment'):
+            return ''
+        if match.group('raw'):
+            tag = match.group('tag').lower()
+            body = match.group('body')
+            if tag == 'style':
+                body = minify_css(body)
+            elif tag == 'script':
+                body = minify_js(body)
+            return f"{match.group('raw')}{body}{match.group('close')}"
+        # Whitespace between inline elements is significant, so keep one character of it
+        return '\n' if '\n' in match.group('space') else ' '
+    return _HTML.sub(token, html).strip()
+
+
+def _attributes(tag):
+    return {m.group('name').lower(): m.group('value') for m in _TAG_ATTRIBUTE.finditer(tag)}
+
+
+def add_srcsets(html, responsive):
+    """
+    Give <img> tags whose src has generated variants a srcset of them
+    (responsive maps 'static/images/a.jpg' to [[width, path], ...] ending
+    with the original). Tags that already have a srcset are left alone.
+    """
+    def tag(match):
+        text = match.group(0)
+        attributes = _attributes(text)
+        if 'srcset' in attributes:
+            return text
+        candidates = responsive.get(unquote(urlsplit(attributes.get('src', '')).path))
+        if not candidates:
+            return text
+        srcset = ', '.join(f'{quote(path)} {width}w' for width, path in candidates)
+        sizes = '' if 'sizes' in attributes else ' sizes="100vw"'
+        end = -2 if text.endswith('/>') else -1
+        return f'{text[:end].rstrip()} srcset="{srcset}"{sizes}{text[end:]}'
+    return _IMG.sub(tag, html)
+
+
+def _pick(srcset, viewport=max(RESPONSIVE_WIDTHS)):
+    """The candidate a browser this wide picks from a srcset of width descriptors"""
+    candidates = []
+    for candidate in srcset.split(','):
+        pieces = candidate.split()
+        if len(pieces) == 2 and pieces[1].endswith('w') and pieces[1][:-1].isdigit():
+            candidates.append((int(pieces[1][:-1]), pieces[0]))
+        elif pieces:
+            candidates.append((0, pieces[0]))
+    candidates.sort()
+    wide_enough = [url for width, url in candidates if width >= viewport]
+    return wide_enough[0] if wide_enough else candidates[-1][1]
+
+
+def optimize_page(html, responsive):
+    return minify_html(add_srcsets(html, responsive))
+
+
+def is_generated(path):
+    """Files this stage writes next to the mirrored assets"""
+    return path.endswith(COMPRESSED_SUFFIXES) or bool(_VARIANT.search(path))
+
+
+def owns(path):
+    """Mirrored files this stage writes itself (minified), so the asset sync must leave them alone"""
+    return path.endswith(MINIFY_EXTENSIONS) or is_generated(path)
+
+
+def _write(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _stale(path, sibling):
+    try:
+        return os.stat(sibling).st_mtime_ns < os.stat(path).st_mtime_ns
+    except OSError:
+        return True
+
+
+def precompress(path, force=False):
+    """Write path.gz (and path.br with brotli installed) if missing or older than path"""
+    written = 0
+    if force or _stale(path, path + '.gz'):
+        with open(path, 'rb') as f:
+            data = f.read()
+        # mtime=0 keeps the output identical between builds
+        _write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        written += 1
+        if brotli is not None:
+            _write(path + '.br', brotli.compress(data))
+    elif brotli is not None and _stale(path, path + '.br'):
+        with open(path, 'rb') as f:
+            _write(path + '.br', brotli.compress(f.read()))
+        written += 1
+    return written
+
+
+def transfer_size(path):
+    """Bytes sent for a file: its smallest precompressed sibling, else the file itself"""
+    sizes = []
+    for candidate in (path, path + '.gz', path + '.br'):
+        try:
+            sizes.append(os.path.getsize(candidate))
+        except OSError:
+            pass
+    return min(sizes) if sizes else 0
+
+
+def make_variants(source, dest, widths=RESPONSIVE_WIDTHS, quality=RESPONSIVE_QUALITY):
+    """
+    Resize an image to each width narrower than it (runs in a pool worker).
+    Returns (original width, [(width, variant path), ...]).
+    """
+    from PIL import Image
+
+    variants = []
+    stem, extension = os.path.splitext(dest)
+    try:
+        with Image.open(source) as image:
+            original = image.width
+            image_format = image.format
+            if image.mode == 'P':
+                image = image.convert('RGBA')   # palette images only resize with nearest-neighbour
+            for width in widths:
+                if width >= original * 0.9:
+                    break   # a variant barely narrower than the original saves little
+                height = max(1, round(image.height * width / original))
+                path = f'{stem}.w{width}{extension}'
+                resized = image.resize((width, height), Image.LANCZOS)
+                if image_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+                    resized = resized.convert('RGB')
+                options = {'quality': quality, 'progressive': True} if image_format == 'JPEG' else (
+                    {'quality': quality} if image_format == 'WEBP' else {})
+                resized.save(path + '.tmp', format=image_format, **options)
+                os.replace(path + '.tmp', path)
+                variants.append((width, path))
+    except (OSError, ValueError) as e:
+        print(f"[Optimize] Skipped {os.path.basename(source)}: {e}")
+        return None, []
+    return original, variants
+
+
+class StaticOptimizer:
+    """Optimizes one output folder; `state` is kept in the build manifest between builds"""
+
+    def __init__(self, base_dir, output_dir, state=None):
+        self.base_dir = base_dir
+        self.output_dir = output_dir
+        self.state = dict(state or {})   # relative path -> {'stamp', ...} of the source it was made from
+        self.seen = set()
+
+    def _stamp(self, path):
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _current(self, rel, stamp, dest, outputs=()):
+        entry = self.state.get(rel)
+        return (entry is not None and entry.get('stamp') == stamp and os.path.exists(dest)
+                and all(os.path.exists(os.path.join(self.output_dir, p)) for p in outputs))
+
+    def minify_assets(self, asset_dirs):
+        """Write minified copies of every CSS and JS file; returns how many changed"""
+        changed = 0
+        for rel, source in self._sources(asset_dirs, MINIFY_EXTENSIONS):
+            dest = os.path.join(self.output_dir, rel)
+            stamp = self._stamp(source)
+            self.seen.add(rel)
+            if self._current(rel, stamp, dest):
+                continue
+            with open(source, 'r', encoding='utf-8') as f:
+                text = f.read()
+            minified = minify_css(text) if rel.endswith('.css') else minify_js(text)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            _write(dest, minified.encode('utf-8'))
+            self.state[rel] = {'stamp': stamp}
+            changed += 1
+        return changed
+
+    def image_variants(self, asset_dirs, pool=None):
+        """Generate responsive variants of changed images; returns how many were processed"""
+        pending = []
+        for rel, source in self._sources(asset_dirs, IMAGE_EXTENSIONS):
+            self.seen.add(rel)
+            stamp = self._stamp(source)
+            entry = self.state.get(rel)
+            if entry and self._current(rel, stamp, os.path.join(self.output_dir, rel),
+                                       [path for _, path in entry['variants']]):
+                continue
+            pending.append((rel, source, stamp))
+
+        if pool is not None and len(pending) > 1:
+            futures = [pool.submit(make_variants, source, os.path.join(self.output_dir, rel))
+                       for rel, source, _ in pending]
+            results = [future.result() for future in futures]
+        else:
+            results = [make_variants(source, os.path.join(self.output_dir, rel)) for rel, source, _ in pending]
+
+        for (rel, source, stamp), (width, variants) in zip(pending, results):
+            self.state[rel] = {
+                'stamp': stamp,
+                'width': width,
+                'variants': [[w, os.path.relpath(path, self.output_dir).replace(os.sep, '/')] for w, path in variants]
+            }
+        return len(pending)
+
+    def responsive(self):
+        """srcset candidates for every image that has variants, as add_srcsets takes them"""
+        return {
+            rel: entry['variants'] + [[entry['width'], rel]]
+            for rel, entry in sorted(self.state.items())
+            if entry.get('variants')
+        }
+
+    def _sources(self, asset_dirs, extensions):
+        for name in asset_dirs:
+            for root, dirs, files in os.walk(os.path.join(self.base_dir, name)):
+                dirs.sort()
+                for file in sorted(files):
+                    if file.lower().endswith(extensions) and not is_generated(file):
+                        source = os.path.join(root, file)
+                        yield os.path.relpath(source, self.base_dir).replace(os.sep, '/'), source
+
+    def compress_tree(self, paths):
+        """Precompress text files under the given output-relative folders and files"""
+        written = 0
+        for rel in paths:
+            path = os.path.join(self.output_dir, rel)
+            if os.path.isfile(path):
+                written += precompress(path)
+                continue
+            for root, dirs, files in os.walk(path):
+                for file in files:
+                    if file.endswith(COMPRESS_EXTENSIONS):
+                        written += precompress(os.path.join(root, file))
+        return written
+
+    def remove_orphans(self, asset_dirs):
+        """Delete generated and minified files whose source is gone; returns how many were removed"""
+        removed = 0
+        for rel in [rel for rel in self.state if rel not in self.seen]:
+            self.state.pop(rel)
+            path = os.path.join(self.output_dir, rel)
+            if rel.endswith(MINIFY_EXTENSIONS) and os.path.exists(path):
+                os.remove(path)
+                removed += 1
+        keep = {os.path.normpath(os.path.join(self.output_dir, path)) for entry in self.state.values()
+                for _, path in entry.get('variants', [])}
+        for name in asset_dirs:
+            for root, dirs, files in os.walk(os.path.join(self.output_dir, name)):
+                for file in files:
+                    path = os.path.normpath(os.path.join(root, file))
+                    if file.endswith(COMPRESSED_SUFFIXES):
+                        orphan = not os.path.exists(path[:-3])
+                    else:
+                        orphan = bool(_VARIANT.search(file)) and path not in keep
+                    if orphan:
+                        os.remove(path)
+                        removed += 1
+        return removed
+
+    def page_report(self, filename):
+        """Transfer bytes of one page and the local files it loads"""
+        path = os.path.join(self.output_dir, filename)
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        report = {'page': filename, 'html': transfer_size(path), 'css_js': 0, 'images': 0, 'lazy_images': 0}
+        seen = set()
+        for match in _ASSET_TAG.finditer(html):
+            tag = match.group('tag').lower()
+            attributes = _attributes(match.group(0))
+            if tag == 'link' and 'stylesheet' not in attributes.get('rel', '').lower():
+                continue
+            url = attributes.get('href' if tag == 'link' else 'src', '')
+            if tag == 'img' and attributes.get('srcset'):
+                url = _pick(attributes['srcset'])
+            parts = urlsplit(url)
+            if not url or parts.scheme or url.startswith('//') or url.startswith('data:'):
+                continue
+            rel = unquote(parts.path)
+            if rel in seen:
+                continue
+            seen.add(rel)
+            size = transfer_size(os.path.join(self.output_dir, rel))
+            if tag != 'img':
+                report['css_js'] += size
+            elif attributes.get('loading', '').lower() == 'lazy':
+                report['lazy_images'] += size
+            else:
+                report['images'] += size
+        report['total'] = report['html'] + report['css_js'] + report['images']
+        return report
+
+    def budget_report(self, pages, budget_kb=None):
+        """Print each page's transfer size; returns the pages over budget"""
+        budget = float(budget_kb) * 1024 if budget_kb else None
+        reports = [self.page_report(page) for page in pages if os.path.exists(os.path.join(self.output_dir, page))]
+
+        def kb(value):
+            return f'{value / 1024:,.1f}'
+
+        print(f"\n{'page':<32}{'html':>10}{'css+js':>10}{'images':>12}{'lazy':>12}{'total KB':>12}")
+        over = []
+        for report in reports:
+            flag = ''
+            if budget is not None and report['total'] > budget:
+                over.append(report)
+                flag = '  ✗ over budget'
+            print(f"{report['page']:<32}{kb(report['html']):>10}{kb(report['css_js']):>10}"
+                  f"{kb(report['images']):>12}{kb(report['lazy_images']):>12}{kb(report['total']):>12}{flag}")
+        if budget is not None:
+            print(f"Budget: {kb(budget)} KB per page (lazy-loaded images not counted)")
+        return over
@@ -0,0 +1,86 @@
+"""
+Template bytecode cache and worker warm-up
+Compiled templates are written to a FileSystemBytecodeCache that every
+gunicorn worker (and every restart) shares, so a template is compiled
+once per change instead of once per worker. At worker boot, warm_up()
+loads every template and renders each page route once through the test
+client, so the first visitor after a deploy gets the same response time
+as later ones (the page cache is filled on the way).
+"""
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', os.path.join(BASE_DIR, '.template_cache'))
+TEMPLATE_WARMUP = os.environ.get('TEMPLATE_WARMUP', 'on').lower() not in ('off', '0', 'false')
+
+
+class TemplateCache:
+    """Installs the shared bytecode cache and warms a worker's templates"""
+
+    def __init__(self, directory=TEMPLATE_CACHE_DIR):
+        self.directory = directory
+        self.report = None
+
+    def install(self, app):
+        """Point the app's Jinja environment at the shared bytecode cache"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            print(f"[Templates] Bytecode cache disabled, cannot create {self.directory}: {e}")
+            return
+        # Bucket keys include a checksum of each template's source, so edits invalidate themselves
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(self.directory, pattern='alley-bloom-%s.cache')
+
+    def page_routes(self, app):
+        """GET routes without arguments outside /api and /static: the site's pages"""
+        routes = []
+        for rule in app.url_map.iter_rules():
+            if ('GET' in rule.methods and not rule.arguments and rule.endpoint != 'static'
+                    and not rule.rule.startswith('/api/')):
+                routes.append(rule.rule)
+        return sorted(set(routes))
+
+    def warm_up(self, app, render=True):
+        """Compile every template and render every page route once; returns a timing report"""
+        start = time.perf_counter()
+        compiled, failed = 0, []
+        for name in app.jinja_env.list_templates():
+            try:
+                app.jinja_env.get_template(name)
+                compiled += 1
+            except Exception as e:
+                failed.append(name)
+                print(f"[Templates] Could not compile {name}: {e}")
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        rendered, errors = 0, []
+        render_start = time.perf_counter()
+        if render:
+            client = app.test_client()
+            for route in self.page_routes(app):
+                try:
+                    status = client.get(route).status_code
+                except Exception as e:
+                    status = str(e)
+                if status in (200, 301, 302, 308):
+                    rendered += 1
+                else:
+                    errors.append(f'{route} ({status})')
+        render_ms = (time.perf_counter() - render_start) * 1000
+
+        self.report = {
+            'templates': compiled, 'template_errors': failed, 'routes': rendered, 'route_errors': errors,
+            'compile_ms': round(compile_ms, 1), 'render_ms': round(render_ms, 1)
+        }
+        print(f"[Templates] Warmed {compiled} templates ({compile_ms:.0f} ms) and {rendered} page routes "
+              f"({render_ms:.0f} ms) in worker {os.getpid()}")
+        if errors:
+            print(f"[Templates] Warm-up requests failed: {', '.join(errors)}")
+        return self.report
+
+
+# Create global instance
+template_cache = TemplateCache()
@@ -1,7 +1,15 @@
 """
 WSGI entry point for production deployment
 """
-from app import app, socketio
+from app import create_app
+from extensions import socketio
+from template_cache import template_cache, TEMPLATE_WARMUP
+
+app = create_app()
+
+# Each worker imports this module at boot: compile templates and render the pages before taking traffic
+if TEMPLATE_WARMUP:
+    template_cache.warm_up(app)
 
 if __name__ == "__main__":
     socketio.run(app)